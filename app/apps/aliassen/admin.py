@@ -24,9 +24,7 @@ def action_link_meldingen_aan_valide_onderwerp(modeladmin, request, queryset):
             bron_url = urllib.parse.urljoin(
                 instelling.onderwerpen_basis_url, url_obj.path
             )
-            valide_onderwerp, _ = OnderwerpAlias.objects.get_or_create(
-                bron_url=bron_url
-            )
+            valide_onderwerp, _ = OnderwerpAlias.objects.ophalen_of_aanmaken(bron_url)
 
             onderwerp.meldingen_voor_onderwerpen.remove(*melding_ids)
             onderwerp.signalen_voor_onderwerpen.remove(*signal_ids)
@@ -41,6 +39,7 @@ class OnderwerpAliasAdmin(admin.ModelAdmin):
         "bron_url",
         "naam",
         "aangemaakt_op",
+        "vernieuwd_op",
         "aantal_meldingen",
         "aantal_signalen",
     )
@@ -54,6 +53,9 @@ class OnderwerpAliasAdmin(admin.ModelAdmin):
         "uuid",
         "aangemaakt_op",
         "aangepast_op",
+        "bron_etag",
+        "bron_last_modified",
+        "vernieuwd_op",
     )
 
     actions = (action_link_meldingen_aan_valide_onderwerp,)
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class OnderwerpCatalogus:
+    """
+    Lokale catalogus van onderwerpen, zodat het aanmaken van signalen en aggregaties
+    de naam en prioriteit van een onderwerp kunnen opvragen zonder netwerk verkeer.
+
+    Opvragen gebeurt in deze volgorde:
+    - een LRU cache in het proces, met een korte levensduur per onderwerp
+    - redis, gevuld door de periodieke taak 'task_onderwerp_catalogus_vernieuwen'
+    - OnderwerpAlias.response_json in de database
+
+    Alleen 'vernieuwen' doet http requests naar de onderwerpen bron, via
+    OnderwerpAlias.objects.vernieuwen.
+    """
+
+    _cache_key_prefix = "onderwerp_catalogus"
+
+    def __init__(
+        self,
+        max_grootte=settings.ONDERWERP_CATALOGUS_LOKAAL_MAX_GROOTTE,
+        lokale_timeout=settings.ONDERWERP_CATALOGUS_LOKAAL_TIMEOUT,
+        cache_timeout=settings.ONDERWERP_CATALOGUS_CACHE_TIMEOUT,
+    ):
+        self._max_grootte = max_grootte
+        self._lokale_timeout = lokale_timeout
+        self._cache_timeout = cache_timeout
+        self._lokaal = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_key(self, onderwerp_alias_id):
+        return f"{self._cache_key_prefix}:{onderwerp_alias_id}"
+
+    def _lokaal_ophalen(self, onderwerp_alias_id):
+        with self._lock:
+            item = self._lokaal.get(onderwerp_alias_id)
+            if not item:
+                return None
+            verloopt_op, onderwerp = item
+            if verloopt_op < time.monotonic():
+                del self._lokaal[onderwerp_alias_id]
+                return None
+            self._lokaal.move_to_end(onderwerp_alias_id)
+            return onderwerp
+
+    def _lokaal_opslaan(self, onderwerp_alias_id, onderwerp):
+        with self._lock:
+            self._lokaal[onderwerp_alias_id] = (
+                time.monotonic() + self._lokale_timeout,
+                onderwerp,
+            )
+            self._lokaal.move_to_end(onderwerp_alias_id)
+            while len(self._lokaal) > self._max_grootte:
+                self._lokaal.popitem(last=False)
+
+    def lokaal_legen(self):
+        with self._lock:
+            self._lokaal.clear()
+
+    @staticmethod
+    def document_naar_onderwerp(onderwerp_alias_id, bron_url, document):
+        document = document if isinstance(document, dict) else {}
+        return {
+            "id": onderwerp_alias_id,
+            "bron_url": bron_url,
+            "naam": document.get("name"),
+            "prioriteit": document.get("priority"),
+        }
+
+    def _uit_database(self, onderwerp_alias_ids):
+        from apps.aliassen.models import OnderwerpAlias
+
+        return {
+            onderwerp_alias["id"]: self.document_naar_onderwerp(
+                onderwerp_alias["id"],
+                onderwerp_alias["bron_url"],
+                onderwerp_alias["response_json"],
+            )
+            for onderwerp_alias in OnderwerpAlias.objects.filter(
+                pk__in=onderwerp_alias_ids
+            ).values("id", "bron_url", "response_json")
+        }
+
+    def get_many(self, onderwerp_alias_ids) -> dict:
+        onderwerpen = {}
+        niet_lokaal = []
+        for onderwerp_alias_id in set(onderwerp_alias_ids):
+            onderwerp = self._lokaal_ophalen(onderwerp_alias_id)
+            if onderwerp is None:
+                niet_lokaal.append(onderwerp_alias_id)
+            else:
+                onderwerpen[onderwerp_alias_id] = onderwerp
+        if not niet_lokaal:
+            return onderwerpen
+
+        uit_cache = cache.get_many([self._cache_key(id) for id in niet_lokaal])
+        niet_in_cache = []
+        for onderwerp_alias_id in niet_lokaal:
+            onderwerp = uit_cache.get(self._cache_key(onderwerp_alias_id))
+            if onderwerp is None:
+                niet_in_cache.append(onderwerp_alias_id)
+            else:
+                onderwerpen[onderwerp_alias_id] = onderwerp
+
+        if niet_in_cache:
+            uit_database = self._uit_database(niet_in_cache)
+            cache.set_many(
+                {self._cache_key(id): o for id, o in uit_database.items()},
+                self._cache_timeout,
+            )
+            onderwerpen.update(uit_database)
+
+        for onderwerp_alias_id in niet_lokaal:
+            if onderwerp_alias_id in onderwerpen:
+                self._lokaal_opslaan(
+                    onderwerp_alias_id, onderwerpen[onderwerp_alias_id]
+                )
+        return onderwerpen
+
+    def get(self, onderwerp_alias_id) -> dict:
+        return self.get_many([onderwerp_alias_id]).get(onderwerp_alias_id, {})
+
+    def naam(self, onderwerp_alias_id):
+        return self.get(onderwerp_alias_id).get("naam")
+
+    def prioriteit(self, onderwerp_alias_id):
+        return self.get(onderwerp_alias_id).get("prioriteit")
+
+    def verwijderen(self, onderwerp_alias_id):
+        cache.delete(self._cache_key(onderwerp_alias_id))
+        with self._lock:
+            self._lokaal.pop(onderwerp_alias_id, None)
+
+    def vernieuwen(self):
+        from apps.aliassen.models import OnderwerpAlias
+
+        resultaat = OnderwerpAlias.objects.vernieuwen()
+        cache.set_many(
+            {
+                self._cache_key(onderwerp_alias["id"]): self.document_naar_onderwerp(
+                    onderwerp_alias["id"],
+                    onderwerp_alias["bron_url"],
+                    onderwerp_alias["response_json"],
+                )
+                for onderwerp_alias in OnderwerpAlias.objects.values(
+                    "id", "bron_url", "response_json"
+                )
+            },
+            self._cache_timeout,
+        )
+        self.lokaal_legen()
+        return resultaat
+
+
+onderwerp_catalogus = OnderwerpCatalogus()
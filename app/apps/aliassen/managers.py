@@ -0,0 +1,108 @@
+import logging
+
+import requests
+import urllib3
+from django.contrib.gis.db import models
+from django.db import transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_sessie = None
+
+
+def get_sessie():
+    """
+    Eén requests sessie per proces, zodat verbindingen naar de onderwerpen bron
+    worden hergebruikt.
+    """
+    global _sessie
+    if _sessie is None:
+        _sessie = requests.Session()
+        _sessie.mount("http://", HTTPAdapter(pool_maxsize=10))
+        _sessie.mount("https://", HTTPAdapter(pool_maxsize=10))
+        _sessie.headers.update({"user-agent": urllib3.util.SKIP_HEADER})
+    return _sessie
+
+
+class OnderwerpAliasManager(models.Manager):
+    _timeout = (5, 10)
+
+    def bron_url_ophalen(self, bron_url, etag=None, last_modified=None):
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return get_sessie().get(bron_url, headers=headers, timeout=self._timeout)
+
+    def ophalen_of_aanmaken(self, bron_url):
+        """
+        Een nieuwe alias wordt zonder request naar de onderwerpen bron aangemaakt, zodat
+        er geen http verzoek binnen een database transactie plaatsvindt.
+        Na de commit haalt 'vernieuwen' de response_json van de nieuwe alias op.
+        """
+        from apps.aliassen.tasks import task_onderwerp_catalogus_vernieuwen
+
+        onderwerp_alias, aangemaakt = self.get_or_create(bron_url=bron_url)
+        if aangemaakt:
+            transaction.on_commit(lambda: task_onderwerp_catalogus_vernieuwen.delay())
+        return onderwerp_alias, aangemaakt
+
+    def vernieuwen(self, batch_grootte=100):
+        """
+        Ververst response_json van alle aliassen met conditionele requests.
+        Een 304 antwoord zet alleen 'vernieuwd_op', wijzigingen worden per batch
+        met bulk_update weggeschreven.
+        """
+        resultaat = {"aantal": 0, "gewijzigd": 0, "ongewijzigd": 0, "fouten": 0}
+        vernieuwd = []
+        velden = ["response_json", "bron_etag", "bron_last_modified", "vernieuwd_op"]
+
+        for onderwerp_alias in self.only("id", "bron_url", *velden).iterator(
+            chunk_size=batch_grootte
+        ):
+            resultaat["aantal"] += 1
+            try:
+                response = self.bron_url_ophalen(
+                    onderwerp_alias.bron_url,
+                    etag=onderwerp_alias.bron_etag,
+                    last_modified=onderwerp_alias.bron_last_modified,
+                )
+            except requests.RequestException as e:
+                logger.warning(
+                    f"OnderwerpAlias vernieuwen: bron_url={onderwerp_alias.bron_url}, fout={e}"
+                )
+                resultaat["fouten"] += 1
+                continue
+
+            if response.status_code == 304:
+                resultaat["ongewijzigd"] += 1
+            elif response.status_code == 200:
+                try:
+                    onderwerp_alias.response_json = response.json()
+                except ValueError:
+                    resultaat["fouten"] += 1
+                    continue
+                onderwerp_alias.bron_etag = response.headers.get("ETag")
+                onderwerp_alias.bron_last_modified = response.headers.get(
+                    "Last-Modified"
+                )
+                resultaat["gewijzigd"] += 1
+            else:
+                logger.warning(
+                    f"OnderwerpAlias vernieuwen: bron_url={onderwerp_alias.bron_url}, status code={response.status_code}"
+                )
+                resultaat["fouten"] += 1
+                continue
+
+            onderwerp_alias.vernieuwd_op = timezone.now()
+            vernieuwd.append(onderwerp_alias)
+            if len(vernieuwd) >= batch_grootte:
+                self.bulk_update(vernieuwd, velden)
+                vernieuwd = []
+
+        if vernieuwd:
+            self.bulk_update(vernieuwd, velden)
+        return resultaat
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("aliassen", "0002_alter_onderwerpalias_response_json"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="onderwerpalias",
+            name="bron_etag",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="onderwerpalias",
+            name="bron_last_modified",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name="onderwerpalias",
+            name="vernieuwd_op",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
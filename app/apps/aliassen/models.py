@@ -1,5 +1,4 @@
-import requests
-import urllib3
+from apps.aliassen.managers import OnderwerpAliasManager
 from django.contrib.gis.db import models
 from utils.fields import DictJSONField
 from utils.models import BasisModel
@@ -12,6 +11,11 @@ class OnderwerpAlias(BasisModel):
         blank=True,
         null=True,
     )
+    bron_etag = models.CharField(max_length=255, null=True, blank=True)
+    bron_last_modified = models.CharField(max_length=100, null=True, blank=True)
+    vernieuwd_op = models.DateTimeField(null=True, blank=True)
+
+    objects = OnderwerpAliasManager()
 
     class Meta:
         verbose_name = "Onderwerp alias"
@@ -20,21 +24,6 @@ class OnderwerpAlias(BasisModel):
     class OnderwerpNietValide(Exception):
         pass
 
-    def _valideer_bron_url(self, bron_url: str):
-        response = requests.get(
-            bron_url,
-            headers={
-                "user-agent": urllib3.util.SKIP_HEADER,
-            },
-        )
-        if response.status_code != 200:
-            raise OnderwerpAlias.OnderwerpNietValide
-        return response.json()
-
-    def save(self, *args, **kwargs):
-        self.response_json = self._valideer_bron_url(self.bron_url)
-        super().save(*args, **kwargs)
-
     def __str__(self) -> str:
         try:
             return self.response_json.get("name", self.bron_url)
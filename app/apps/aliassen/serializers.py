@@ -49,8 +49,8 @@ class OnderwerpAliasSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        onderwerpalias, aangemaakt = OnderwerpAlias.objects.get_or_create(
-            **validated_data
+        onderwerpalias, aangemaakt = OnderwerpAlias.objects.ophalen_of_aanmaken(
+            validated_data["bron_url"]
         )
         return onderwerpalias
 
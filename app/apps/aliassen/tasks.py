@@ -0,0 +1,11 @@
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(bind=True)
+def task_onderwerp_catalogus_vernieuwen(self):
+    from apps.aliassen.catalogus import onderwerp_catalogus
+
+    return onderwerp_catalogus.vernieuwen()
@@ -89,6 +89,13 @@ class Locatie(BasisModel):
             return f"{self.grafnummer or ''} {self.vak or ''}".strip()
         return ""
 
+    def get_referentie_punt(self):
+        if not self.geometrie:
+            return None
+        if self.geometrie.geom_type == "Point":
+            return self.geometrie
+        return self.geometrie.centroid
+
     def bereken_gewicht(self):
         return self.gewicht
 
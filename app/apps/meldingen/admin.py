@@ -15,6 +15,7 @@ from apps.meldingen.tasks import (
     task_bijlages_voor_geselecteerde_meldingen_opruimen,
     task_notificatie_voor_signaal_melding_afgesloten,
     task_set_melding_thumbnail_afbeelding_voor_melding_reeks,
+    task_vernieuw_melding_afgeleide_velden_voor_melding_reeks,
     task_vernieuw_melding_zoek_tekst_voor_melding_reeks,
 )
 from apps.status.models import Status
@@ -67,6 +68,17 @@ def action_vernieuw_melding_zoek_tekst_voor_melding_reeks(
     )
 
 
+@admin.action(
+    description="Vernieuw melding.referentie_punt en sorteer velden voor meldingen"
+)
+def action_vernieuw_melding_afgeleide_velden_voor_melding_reeks(
+    modeladmin, request, queryset
+):
+    task_vernieuw_melding_afgeleide_velden_voor_melding_reeks.delay(
+        melding_ids=list(queryset.values_list("id", flat=True))
+    )
+
+
 class SpecificatieAdmin(admin.ModelAdmin):
     list_display = (
         "uuid",
@@ -177,6 +189,7 @@ class MeldingAdmin(admin.ModelAdmin):
         action_melding_bijlages_opruimen,
         action_set_melding_thumbnail_afbeelding_voor_melding_reeks,
         action_vernieuw_melding_zoek_tekst_voor_melding_reeks,
+        action_vernieuw_melding_afgeleide_velden_voor_melding_reeks,
     )
 
     def bijlage_aantal(self, obj):
@@ -0,0 +1,85 @@
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class MeldingDetailCache:
+    """
+    Cache voor het gerenderde melding detail document.
+
+    Per melding uuid is er een willekeurige versie in de cache, die wordt vervangen door
+    de manager signals (zie signal_receivers). Een document wordt opgeslagen met de
+    versie waarmee het is opgebouwd, en is alleen geldig zolang die gelijk is aan de
+    versie in de cache. Een document dat wordt opgebouwd terwijl de melding verandert,
+    wordt daardoor nooit als actueel teruggegeven. Ook als de versie uit de cache is
+    verdwenen, b.v. door LRU eviction, krijgt de melding een nieuwe versie die niet
+    overeenkomt met een eerder opgeslagen document.
+
+    Documenten bevatten absolute urls, daarom maakt de host deel uit van de sleutel.
+    Versie en document worden samen met één get_many opgehaald.
+    """
+
+    _versie_key_prefix = "melding_detail_versie"
+    _document_key_prefix = "melding_detail"
+
+    def __init__(self, timeout=settings.MELDING_DETAIL_CACHE_TIMEOUT):
+        self._timeout = timeout
+
+    def _versie_key(self, melding_uuid):
+        return f"{self._versie_key_prefix}:{str(melding_uuid).lower()}"
+
+    def _nieuwe_versie(self):
+        return uuid.uuid4().hex
+
+    def _document_key(self, melding_uuid, request):
+        return f"{self._document_key_prefix}:{str(melding_uuid).lower()}:{request.get_host()}"
+
+    def ophalen(self, melding_uuid, request):
+        """
+        Geeft de actuele versie en, als die er is, het geldige document terug.
+        """
+        versie_key = self._versie_key(melding_uuid)
+        document_key = self._document_key(melding_uuid, request)
+        try:
+            resultaat = cache.get_many([versie_key, document_key])
+        except Exception as e:
+            logger.warning(f"MeldingDetailCache ophalen: fout={e}")
+            return None, None
+        versie = resultaat.get(versie_key)
+        if versie is None:
+            try:
+                cache.add(versie_key, self._nieuwe_versie(), None)
+                versie = cache.get(versie_key)
+            except Exception as e:
+                logger.warning(f"MeldingDetailCache versie aanmaken: fout={e}")
+            return versie, None
+        opgeslagen = resultaat.get(document_key)
+        if opgeslagen and opgeslagen["versie"] == versie:
+            return versie, opgeslagen["document"]
+        return versie, None
+
+    def opslaan(self, melding_uuid, request, versie, document):
+        if versie is None:
+            return
+        try:
+            cache.set(
+                self._document_key(melding_uuid, request),
+                {"versie": versie, "document": document},
+                self._timeout,
+            )
+        except Exception as e:
+            logger.warning(f"MeldingDetailCache opslaan: fout={e}")
+
+    def ongeldig_maken(self, melding_uuid):
+        versie_key = self._versie_key(melding_uuid)
+        try:
+            cache.set(versie_key, self._nieuwe_versie(), None)
+        except Exception as e:
+            logger.warning(f"MeldingDetailCache ongeldig maken: fout={e}")
+
+
+melding_detail_cache = MeldingDetailCache()
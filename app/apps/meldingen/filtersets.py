@@ -5,9 +5,9 @@ from typing import List, Tuple
 from apps.aliassen.models import OnderwerpAlias
 from apps.locatie.models import Locatie
 from apps.meldingen.models import Melding
-from django.contrib.gis.geos import Point
+from django.contrib.gis.geos import Point, Polygon
 from django.contrib.gis.measure import D
-from django.contrib.postgres.search import TrigramSimilarity
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
 from django.db import models
 from django.db.models import OuterRef, Q, Subquery
 from django.db.models.functions import Greatest
@@ -163,6 +163,7 @@ class MeldingFilter(filters.FilterSet):
         method="get_begraafplaats_grafnummer"
     )
     within = filters.CharFilter(method="get_within")
+    bbox = filters.CharFilter(method="get_bbox")
     urgentie = filters.NumberFilter(
         field_name="urgentie",
     )
@@ -183,17 +184,26 @@ class MeldingFilter(filters.FilterSet):
         except Exception:
             logger.warning(f"Warning: within syntax not ok: {value}")
             return queryset
-        locaties = Locatie.objects.filter(
-            melding=OuterRef("pk"),
-            geometrie__isnull=False,
-        ).order_by("-gewicht")
-        return queryset.annotate(geometrie=locaties.values("geometrie")[:1]).filter(
-            geometrie__distance_lt=(
-                Point(d["lon"], d["lat"]),
+        # ST_DWithin op de geography kolom gebruikt de GIST index
+        return queryset.filter(
+            referentie_geografie__dwithin=(
+                Point(d["lon"], d["lat"], srid=4326),
                 D(m=d["d"]),
             )
         )
 
+    def get_bbox(self, queryset, name, value):
+        """
+        ./?bbox=4.47,51.92,4.48,51.93 (min lon, min lat, max lon, max lat)
+        """
+        try:
+            bbox = Polygon.from_bbox([float(v) for v in value.split(",")])
+        except Exception:
+            logger.warning(f"Warning: bbox syntax not ok: {value}")
+            return queryset
+        bbox.srid = 4326
+        return queryset.filter(referentie_punt__contained=bbox)
+
     def get_begraafplaats_grafnummer(self, queryset, name, value):
         if value:
             valid_lookup_expr = ["gt", "gte", "lt", "lte"]
@@ -212,38 +222,23 @@ class MeldingFilter(filters.FilterSet):
 
     def get_omschrijving(self, queryset, name, value):
         if value:
+            # Het '<%' filter gebruikt de trigram index, de similarity wordt alleen
+            # voor de gevonden meldingen berekend
             qs = (
-                queryset.annotate(
-                    similarity=TrigramSimilarity("omschrijving", str(value))
+                queryset.filter(omschrijving_melder__trigram_word_similar=str(value))
+                .annotate(
+                    similarity=TrigramWordSimilarity(str(value), "omschrijving_melder")
                 )
-                .filter(similarity__gt=0.3)
                 .order_by("-similarity")
             )
             return qs
         return queryset
 
-    # Er kan op meerdere komma separated zoektermen gezocht worden
+    # Alle woorden moeten als prefix voorkomen, komma's en spaties scheiden de
+    # zoektermen, zie zoek_query
     def get_q(self, queryset, name, value):
         if value:
-            search_terms = value.split(",")
-            cleaned_search_terms = [
-                "".join(
-                    [
-                        char
-                        for char in term.strip()
-                        if char not in ["*", "(", ")", "?", "[", "]", "{", "}", "\\"]
-                    ]
-                )
-                for term in search_terms
-            ]
-            cleaned_search_terms = [term for term in cleaned_search_terms if term]
-
-            combined_q = Q()
-            for term in cleaned_search_terms:
-                combined_q &= Q(zoek_tekst__icontains=term)
-
-            return queryset.filter(combined_q).distinct()
-
+            return queryset.zoeken(value)
         return queryset
 
     def get_buurt(self, queryset, name, value):
@@ -315,6 +310,9 @@ class RelatedOrderingFilter(rest_filters.OrderingFilter):
         ordering = self.get_ordering(request, queryset, view)
 
         if ordering:
+            ordering = self.vervang_ordering(
+                ordering, getattr(view, "ordering_vervangingen", {})
+            )
             straatnaam_ordering = ["straatnaam", "-straatnaam"]
             onderwerp_ordering = ["onderwerp", "-onderwerp"]
             if list(set(ordering) & set(onderwerp_ordering)):
@@ -336,6 +334,29 @@ class RelatedOrderingFilter(rest_filters.OrderingFilter):
 
         return queryset
 
+    @staticmethod
+    def vervang_ordering(ordering, vervangingen):
+        """
+        Vervangt ordering velden door (gedenormaliseerde) kolommen volgens de
+        'ordering_vervangingen' van de view. Na een vervanging wordt op id in dezelfde
+        richting als het eerste veld doorgesorteerd, zodat een index op (kolom, id)
+        de volgorde volledig kan leveren.
+        """
+        if not vervangingen:
+            return ordering
+        vervangen = False
+        nieuwe_ordering = []
+        for veld in ordering:
+            richting = "-" if veld.startswith("-") else ""
+            if veld.lstrip("-") in vervangingen:
+                veld = f"{richting}{vervangingen[veld.lstrip('-')]}"
+                vervangen = True
+            nieuwe_ordering.append(veld)
+        if vervangen and not {"id", "-id", "pk", "-pk"} & set(nieuwe_ordering):
+            richting = "-" if nieuwe_ordering[0].startswith("-") else ""
+            nieuwe_ordering.append(f"{richting}id")
+        return nieuwe_ordering
+
     @staticmethod
     def _get_verbose_name(field: models.Field, non_verbose_name: str) -> str:
         return (
@@ -0,0 +1,14 @@
+from apps.meldingen.models import MeldingStatusBuurtAantal
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Vergelijkt de melding status buurt aantallen met een volledige telling van de meldingen en herstelt de verschillen"
+
+    def handle(self, *args, **options):
+        gecorrigeerd = MeldingStatusBuurtAantal.objects.herbouwen()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Melding status buurt aantallen herberekend: gecorrigeerd={gecorrigeerd}"
+            )
+        )
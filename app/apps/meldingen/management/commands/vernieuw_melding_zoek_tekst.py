@@ -0,0 +1,39 @@
+from apps.meldingen.models import Melding
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Vernieuwt melding.zoek_tekst in batches, hervat een afgebroken run met --vanaf-id"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-grootte",
+            type=int,
+            default=1000,
+            help="Aantal meldingen per batch",
+        )
+        parser.add_argument(
+            "--vanaf-id",
+            type=int,
+            default=0,
+            help="Begin na deze melding id, het laatst verwerkte id uit een eerdere run",
+        )
+
+    def handle(self, *args, **options):
+        totaal = Melding.objects.filter(id__gt=options["vanaf_id"]).count()
+
+        def voortgang(resultaat):
+            self.stdout.write(
+                f"{resultaat['aantal']}/{totaal} meldingen verwerkt, gewijzigd={resultaat['gewijzigd']}, laatste_id={resultaat['laatste_id']}"
+            )
+
+        resultaat = Melding.objects.zoek_tekst_vernieuwen(
+            batch_grootte=options["batch_grootte"],
+            vanaf_id=options["vanaf_id"],
+            voortgang=voortgang,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Zoek tekst vernieuwd: aantal={resultaat['aantal']}, gewijzigd={resultaat['gewijzigd']}"
+            )
+        )
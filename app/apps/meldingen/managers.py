@@ -1,10 +1,11 @@
 import logging
 
 import nh3
+from apps.aliassen.catalogus import onderwerp_catalogus
 from apps.applicaties.models import Applicatie
-from apps.services.onderwerpen import OnderwerpenService
+from django.conf import settings
 from django.contrib.gis.db import models
-from django.db import OperationalError, transaction
+from django.db import IntegrityError, OperationalError, transaction
 from django.db.models import Max
 from django.dispatch import Signal as DjangoSignal
 from django.utils import timezone
@@ -79,22 +80,35 @@ class MeldingManager(models.Manager):
             melding = signaal.melding
             melding_gebeurtenis_data = {"gebruiker": gebruiker}
 
+            if not melding:
+                melding = self.automatisch_te_koppelen_melding(
+                    signaal.locaties_voor_signaal.order_by("pk"),
+                    signaal.onderwerpen.values_list("id", flat=True),
+                    db=db,
+                )
+                if melding:
+                    signaal.melding = melding
+                    signaal.save(update_fields=["melding"])
+
             if not melding:
                 # Als het signaal geen melding relatie heeft, wordt een nieuwe melding aangemaakt
                 melding = self.create(
                     origineel_aangemaakt=signaal.origineel_aangemaakt,
                     urgentie=signaal.urgentie,
+                    omschrijving_melder=signaal.omschrijving_melder or "",
                 )
                 onderwerpen = signaal.onderwerpen.all()
                 if onderwerpen:
                     melding.onderwerp = onderwerpen[0].bron_url
-                for onderwerp in onderwerpen:
-                    melding.onderwerpen.add(onderwerp)
-                    onderwerp_response = OnderwerpenService().get_onderwerp(
-                        onderwerp.bron_url
-                    )
-                    if onderwerp_response.get("priority") == "high":
-                        melding.urgentie = 0.5
+                    melding.onderwerpen.add(*onderwerpen)
+                onderwerpen_uit_catalogus = onderwerp_catalogus.get_many(
+                    [onderwerp.id for onderwerp in onderwerpen]
+                )
+                if any(
+                    onderwerp.get("prioriteit") == "high"
+                    for onderwerp in onderwerpen_uit_catalogus.values()
+                ):
+                    melding.urgentie = 0.5
 
                 for locatie in signaal.locaties_voor_signaal.all():
                     melding.locaties_voor_melding.add(locatie)
@@ -104,6 +118,7 @@ class MeldingManager(models.Manager):
                 )
                 if locaties:
                     melding.referentie_locatie = locaties[0]
+                    melding.referentie_punt = locaties[0].get_referentie_punt()
                     locaties[0].primair = True
                     locaties[0].gewicht = 0.25
                     locaties[0].save()
@@ -119,6 +134,9 @@ class MeldingManager(models.Manager):
                 melding.save()
                 signaal.melding = melding
                 signaal.save()
+                Melding.objects.using(db).filter(
+                    pk=melding.pk
+                ).status_buurt_aantallen_bijwerken({})
 
                 melding_gebeurtenis_data.update(
                     {
@@ -137,6 +155,9 @@ class MeldingManager(models.Manager):
                         "signaal": signaal,
                     }
                 )
+                Melding.objects.using(db).filter(
+                    pk=melding.pk
+                ).omschrijving_melder_toevoegen(signaal.omschrijving_melder)
                 if signaal.urgentie > melding.urgentie:
                     try:
                         locked_melding = (
@@ -148,8 +169,16 @@ class MeldingManager(models.Manager):
                         raise MeldingManager.MeldingInGebruik(
                             f"De melding is op dit moment in gebruik, probeer het later nog eens. melding nummer: {melding.id}, melding uuid: {melding.uuid}"
                         )
+                    status_buurt_sleutels = (
+                        Melding.objects.using(db)
+                        .filter(pk=locked_melding.pk)
+                        .status_buurt_sleutels()
+                    )
                     locked_melding.urgentie = signaal.urgentie
                     locked_melding.save()
+                    Melding.objects.using(db).filter(
+                        pk=locked_melding.pk
+                    ).status_buurt_aantallen_bijwerken(status_buurt_sleutels)
 
             melding_gebeurtenis_data.update(
                 {
@@ -158,6 +187,7 @@ class MeldingManager(models.Manager):
             )
             melding_gebeurtenis = Meldinggebeurtenis(**melding_gebeurtenis_data)
             melding_gebeurtenis.save()
+            Melding.objects.using(db).filter(pk=melding.pk).wijziging_vastleggen()
             transaction.on_commit(
                 lambda: signaal_aangemaakt.send_robust(
                     sender=self.__class__,
@@ -167,6 +197,435 @@ class MeldingManager(models.Manager):
             )
         return signaal
 
+    def dubbele_kandidaat_voor_signaal(
+        self, signaal, afstand=settings.DUBBELE_KANDIDATEN_AFSTAND, db="default"
+    ):
+        return self._dubbele_kandidaat(
+            signaal.locaties_voor_signaal.order_by("pk"),
+            signaal.onderwerpen.values_list("id", flat=True),
+            afstand=afstand,
+            db=db,
+        )
+
+    def automatisch_te_koppelen_melding(self, locaties, onderwerp_ids, db="default"):
+        """
+        Een nieuw signaal wordt een 'dubbele melding' van de dichtstbijzijnde open melding
+        met hetzelfde onderwerp, als SIGNAAL_AUTOMATISCH_KOPPELEN_AFSTAND is ingesteld.
+        Wordt gebruikt door zowel signaal_aanmaken als signalen_aanmaken.
+        """
+        if settings.SIGNAAL_AUTOMATISCH_KOPPELEN_AFSTAND <= 0:
+            return None
+        return self._dubbele_kandidaat(
+            locaties,
+            onderwerp_ids,
+            afstand=settings.SIGNAAL_AUTOMATISCH_KOPPELEN_AFSTAND,
+            db=db,
+        )
+
+    def _dubbele_kandidaat(self, locaties, onderwerp_ids, afstand, db="default"):
+        from apps.meldingen.models import Melding
+
+        locatie = next(
+            (
+                locatie
+                for locatie in locaties
+                if locatie.locatie_type in ["graf", "adres"]
+                and locatie.geometrie is not None
+            ),
+            None,
+        )
+        onderwerp_ids = list(onderwerp_ids)
+        if not locatie or not onderwerp_ids:
+            return None
+        return (
+            Melding.objects.using(db)
+            .dubbele_kandidaten(
+                locatie.get_referentie_punt(),
+                onderwerp_ids=onderwerp_ids,
+                afstand=afstand,
+                max_aantal=1,
+            )
+            .first()
+        )
+
+    @staticmethod
+    def _is_bron_sleutel_schending(fout):
+        """
+        Alleen een schending van de unique together (bron_id, bron_signaal_id) van
+        Signaal betekent dat een gelijktijdig request met dezelfde bron sleutel ons voor was.
+        """
+        oorzaak = fout.__cause__
+        if getattr(oorzaak, "pgcode", None) != "23505":
+            return False
+        detail = getattr(getattr(oorzaak, "diag", None), "message_detail", None)
+        return "(bron_id, bron_signaal_id)" in (detail or "")
+
+    def signalen_aanmaken(self, serializers, chunk_grootte=100, db="default"):
+        """
+        Verwerkt een lijst met gevalideerde SignaalSerializers in chunks.
+        Per chunk wordt één transactie gebruikt en worden de melders, signalen, locaties,
+        bijlagen, meldingen, statussen, onderwerp koppelingen en meldinggebeurtenissen
+        in bulk weggeschreven.
+        Geeft per signaal een resultaat terug in dezelfde volgorde als de input.
+        """
+        resultaten = []
+        for start in range(0, len(serializers), chunk_grootte):
+            resultaten.extend(
+                self._signalen_chunk_aanmaken(
+                    serializers[start : start + chunk_grootte], db=db
+                )
+            )
+        return resultaten
+
+    def _onderwerpen_ophalen(self, serializers):
+        """
+        Haalt de onderwerp aliassen van een chunk eenmalig op, of maakt ze aan.
+        """
+        from apps.aliassen.models import OnderwerpAlias
+
+        return {
+            bron_url: OnderwerpAlias.objects.ophalen_of_aanmaken(bron_url)[0]
+            for bron_url in {
+                onderwerp["bron_url"]
+                for serializer in serializers
+                for onderwerp in serializer.validated_data.get("onderwerpen", [])
+            }
+        }
+
+    def _signalen_bulk_opslaan(self, nieuwe_signalen, db="default"):
+        from apps.bijlagen.models import Bijlage
+        from apps.locatie.models import Locatie
+        from apps.melders.models import Melder
+        from apps.signalen.models import Signaal
+        from django.contrib.contenttypes.models import ContentType
+
+        melders = []
+        for nieuw in nieuwe_signalen:
+            nieuw["signaal"] = Signaal(**nieuw["signaal_data"])
+            if nieuw["melder_data"]:
+                nieuw["signaal"].melder = Melder(**nieuw["melder_data"])
+                melders.append(nieuw["signaal"].melder)
+        Melder.objects.using(db).bulk_create(melders)
+        Signaal.objects.using(db).bulk_create(
+            [nieuw["signaal"] for nieuw in nieuwe_signalen]
+        )
+
+        signaal_content_type = ContentType.objects.db_manager(db).get_for_model(Signaal)
+        locaties = []
+        bijlagen = []
+        onderwerp_koppelingen = []
+        for nieuw in nieuwe_signalen:
+            signaal = nieuw["signaal"]
+            for locatie in nieuw["locaties"]:
+                locatie.signaal = signaal
+                locaties.append(locatie)
+            nieuw["bijlagen"] = [
+                Bijlage(
+                    **bijlage_data,
+                    content_type=signaal_content_type,
+                    object_id=signaal.pk,
+                )
+                for bijlage_data in nieuw["bijlagen_data"]
+            ]
+            bijlagen.extend(nieuw["bijlagen"])
+            onderwerp_koppelingen.extend(
+                [
+                    Signaal.onderwerpen.through(
+                        signaal_id=signaal.pk, onderwerpalias_id=onderwerp.pk
+                    )
+                    for onderwerp in nieuw["onderwerpen"]
+                ]
+            )
+        Locatie.objects.using(db).bulk_create(locaties)
+        Bijlage.objects.using(db).bulk_create(bijlagen)
+        Signaal.onderwerpen.through.objects.using(db).bulk_create(
+            onderwerp_koppelingen, ignore_conflicts=True
+        )
+
+    def _signalen_chunk_aanmaken(self, serializers, db="default"):
+        from apps.locatie.models import Locatie
+        from apps.meldingen.models import Melding, Meldinggebeurtenis
+        from apps.signalen.models import Signaal
+        from apps.status.models import Status
+        from django.db.models import Q
+
+        resultaten = [
+            {
+                "resultaat": "fout",
+                "signaal": None,
+                "melding": None,
+                "fouten": None,
+            }
+            for _ in serializers
+        ]
+        bron_sleutels = [
+            (
+                serializer.validated_data.get("bron_id"),
+                serializer.validated_data.get("bron_signaal_id"),
+            )
+            for serializer in serializers
+        ]
+        bron_filter = Q()
+        for bron_id, bron_signaal_id in bron_sleutels:
+            if bron_signaal_id:
+                bron_filter |= Q(bron_id=bron_id, bron_signaal_id=bron_signaal_id)
+
+        onderwerpen = self._onderwerpen_ophalen(serializers)
+        locatie_typen = (
+            ("adressen", "adres"),
+            ("lichtmasten", "lichtmast"),
+            ("graven", "graf"),
+        )
+
+        with transaction.atomic(using=db):
+            bestaande_sleutels = (
+                set(
+                    Signaal.objects.using(db)
+                    .filter(bron_filter)
+                    .values_list("bron_id", "bron_signaal_id")
+                )
+                if bron_filter
+                else set()
+            )
+
+            nieuwe_signalen = []
+            for index, serializer in enumerate(serializers):
+                sleutel = bron_sleutels[index]
+                if sleutel[1] and sleutel in bestaande_sleutels:
+                    resultaten[index]["resultaat"] = "dubbel"
+                    continue
+                signaal_data = dict(serializer.validated_data)
+                bestaande_sleutels.add(sleutel)
+                nieuwe_signalen.append(
+                    {
+                        "index": index,
+                        "sleutel": sleutel,
+                        "gebruiker": signaal_data.pop("gebruiker", None),
+                        "melder_data": signaal_data.pop("melder", None),
+                        "bijlagen_data": signaal_data.pop("bijlagen", None) or [],
+                        "onderwerpen": [
+                            onderwerpen[onderwerp["bron_url"]]
+                            for onderwerp in signaal_data.pop("onderwerpen", [])
+                        ],
+                        "locaties": [
+                            Locatie(**locatie_data, locatie_type=locatie_type)
+                            for veld, locatie_type in locatie_typen
+                            for locatie_data in signaal_data.pop(veld, None) or []
+                        ],
+                        "signaal_data": signaal_data,
+                    }
+                )
+
+            while nieuwe_signalen:
+                try:
+                    with transaction.atomic(using=db):
+                        self._signalen_bulk_opslaan(nieuwe_signalen, db=db)
+                    break
+                except Exception as e:
+                    bron_sleutel_schending = isinstance(
+                        e, IntegrityError
+                    ) and self._is_bron_sleutel_schending(e)
+                    if bron_sleutel_schending:
+                        # Een gelijktijdig request met dezelfde bron sleutel was ons voor
+                        gelijktijdige_sleutels = set(
+                            Signaal.objects.using(db)
+                            .filter(bron_filter)
+                            .values_list("bron_id", "bron_signaal_id")
+                        )
+                        dubbel = [
+                            nieuw
+                            for nieuw in nieuwe_signalen
+                            if nieuw["sleutel"] in gelijktijdige_sleutels
+                        ]
+                        if dubbel:
+                            for nieuw in dubbel:
+                                resultaten[nieuw["index"]]["resultaat"] = "dubbel"
+                            nieuwe_signalen = [
+                                nieuw
+                                for nieuw in nieuwe_signalen
+                                if nieuw not in dubbel
+                            ]
+                            continue
+                    logger.error(f"signalen_aanmaken: signalen opslaan fout={e}")
+                    for nieuw in nieuwe_signalen:
+                        resultaten[nieuw["index"]]["fouten"] = str(e)
+                    nieuwe_signalen = []
+
+            automatisch_gekoppeld = []
+            for nieuw in nieuwe_signalen:
+                signaal = nieuw["signaal"]
+                if signaal.melding:
+                    continue
+                signaal.melding = self.automatisch_te_koppelen_melding(
+                    nieuw["locaties"],
+                    [onderwerp.pk for onderwerp in nieuw["onderwerpen"]],
+                    db=db,
+                )
+                if signaal.melding:
+                    automatisch_gekoppeld.append(signaal)
+
+            onderwerpen_uit_catalogus = onderwerp_catalogus.get_many(
+                [
+                    onderwerp.id
+                    for nieuw in nieuwe_signalen
+                    for onderwerp in nieuw["onderwerpen"]
+                ]
+            )
+
+            nieuwe_meldingen = []
+            toegevoegde_signalen = []
+            for nieuw in nieuwe_signalen:
+                signaal = nieuw["signaal"]
+                if signaal.melding:
+                    toegevoegde_signalen.append(nieuw)
+                    continue
+                onderwerpen = nieuw["onderwerpen"]
+                melding = Melding(
+                    origineel_aangemaakt=signaal.origineel_aangemaakt,
+                    urgentie=signaal.urgentie,
+                    onderwerp=onderwerpen[0].bron_url if onderwerpen else None,
+                    omschrijving_melder=signaal.omschrijving_melder or "",
+                )
+                if any(
+                    onderwerpen_uit_catalogus.get(onderwerp.id, {}).get("prioriteit")
+                    == "high"
+                    for onderwerp in onderwerpen
+                ):
+                    melding.urgentie = 0.5
+                if nieuw["bijlagen"]:
+                    melding.thumbnail_afbeelding = nieuw["bijlagen"][0]
+                nieuwe_meldingen.append((nieuw, melding))
+
+            Melding.objects.using(db).bulk_create(
+                [melding for _, melding in nieuwe_meldingen]
+            )
+            statussen = Status.objects.using(db).bulk_create(
+                [Status(melding=melding) for _, melding in nieuwe_meldingen]
+            )
+
+            onderwerp_koppelingen = []
+            locaties = []
+            meldinggebeurtenissen = []
+            for (nieuw, melding), status in zip(nieuwe_meldingen, statussen):
+                signaal = nieuw["signaal"]
+                melding.status = status
+                onderwerp_koppelingen.extend(
+                    [
+                        Melding.onderwerpen.through(
+                            melding_id=melding.pk, onderwerpalias_id=onderwerp.pk
+                        )
+                        for onderwerp in nieuw["onderwerpen"]
+                    ]
+                )
+                for locatie in nieuw["locaties"]:
+                    locatie.melding = melding
+                    locaties.append(locatie)
+                referentie_locaties = [
+                    locatie
+                    for locatie in nieuw["locaties"]
+                    if locatie.locatie_type in ["graf", "adres"]
+                ]
+                if referentie_locaties:
+                    referentie_locatie = referentie_locaties[0]
+                    melding.referentie_locatie = referentie_locatie
+                    melding.referentie_punt = referentie_locatie.get_referentie_punt()
+                    referentie_locatie.primair = True
+                    referentie_locatie.gewicht = 0.25
+                signaal.melding = melding
+                meldinggebeurtenissen.append(
+                    Meldinggebeurtenis(
+                        gebeurtenis_type=Meldinggebeurtenis.GebeurtenisType.MELDING_AANGEMAAKT,
+                        omschrijving_intern="Melding aangemaakt",
+                        signaal=signaal,
+                        status=status,
+                        melding=melding,
+                        gebruiker=nieuw["gebruiker"],
+                    )
+                )
+                resultaten[nieuw["index"]].update(
+                    {
+                        "resultaat": "aangemaakt",
+                        "signaal": signaal,
+                        "melding": melding,
+                    }
+                )
+
+            status_buurt_sleutels = (
+                Melding.objects.using(db)
+                .filter(
+                    pk__in=[
+                        nieuw["signaal"].melding_id for nieuw in toegevoegde_signalen
+                    ]
+                )
+                .status_buurt_sleutels()
+            )
+            for nieuw in toegevoegde_signalen:
+                signaal = nieuw["signaal"]
+                meldinggebeurtenissen.append(
+                    Meldinggebeurtenis(
+                        gebeurtenis_type=Meldinggebeurtenis.GebeurtenisType.SIGNAAL_TOEGEVOEGD,
+                        omschrijving_intern=signaal.bron_signaal_id,
+                        signaal=signaal,
+                        melding=signaal.melding,
+                        gebruiker=nieuw["gebruiker"],
+                    )
+                )
+                # Een enkele conditionele update voorkomt een expliciete lock op de melding
+                Melding.objects.using(db).filter(
+                    pk=signaal.melding_id, urgentie__lt=signaal.urgentie
+                ).update(urgentie=signaal.urgentie)
+                Melding.objects.using(db).filter(
+                    pk=signaal.melding_id
+                ).omschrijving_melder_toevoegen(signaal.omschrijving_melder)
+                resultaten[nieuw["index"]].update(
+                    {
+                        "resultaat": "toegevoegd",
+                        "signaal": signaal,
+                        "melding": signaal.melding,
+                    }
+                )
+
+            Melding.objects.using(db).bulk_update(
+                [melding for _, melding in nieuwe_meldingen],
+                ["status", "referentie_locatie", "referentie_punt"],
+            )
+            Melding.onderwerpen.through.objects.using(db).bulk_create(
+                onderwerp_koppelingen, ignore_conflicts=True
+            )
+            Locatie.objects.using(db).bulk_update(
+                locaties, ["melding", "primair", "gewicht"]
+            )
+            gewijzigde_meldingen = Melding.objects.using(db).filter(
+                pk__in=[melding.pk for _, melding in nieuwe_meldingen]
+                + [nieuw["signaal"].melding_id for nieuw in toegevoegde_signalen]
+            )
+            gewijzigde_meldingen.status_buurt_aantallen_bijwerken(status_buurt_sleutels)
+            gewijzigde_meldingen.wijziging_vastleggen()
+            Signaal.objects.using(db).bulk_update(
+                [nieuw["signaal"] for nieuw, _ in nieuwe_meldingen]
+                + automatisch_gekoppeld,
+                ["melding"],
+            )
+            Meldinggebeurtenis.objects.using(db).bulk_create(meldinggebeurtenissen)
+
+            verwerkt = [
+                (resultaat["melding"], resultaat["signaal"])
+                for resultaat in resultaten
+                if resultaat["signaal"]
+            ]
+            transaction.on_commit(
+                lambda: [
+                    signaal_aangemaakt.send_robust(
+                        sender=self.__class__,
+                        melding=melding,
+                        signaal=signaal,
+                    )
+                    for melding, signaal in verwerkt
+                ],
+                using=db,
+            )
+        return resultaten
+
     def urgentie_aanpassen(self, serializer, melding, db="default"):
         from apps.meldingen.models import Melding
 
@@ -187,10 +646,21 @@ class MeldingManager(models.Manager):
                     f"De melding is op dit moment in gebruik, probeer het later nog eens. melding nummer: {melding.id}, melding uuid: {melding.uuid}"
                 )
 
+            status_buurt_sleutels = (
+                Melding.objects.using(db)
+                .filter(pk=locked_melding.pk)
+                .status_buurt_sleutels()
+            )
             melding_gebeurtenis = serializer.save()
             vorige_urgentie = locked_melding.urgentie
             locked_melding.urgentie = melding_gebeurtenis.urgentie
             locked_melding.save()
+            Melding.objects.using(db).filter(
+                pk=locked_melding.pk
+            ).status_buurt_aantallen_bijwerken(status_buurt_sleutels)
+            Melding.objects.using(db).filter(
+                pk=locked_melding.pk
+            ).wijziging_vastleggen()
             transaction.on_commit(
                 lambda: urgentie_aangepast.send_robust(
                     sender=self.__class__,
@@ -201,6 +671,7 @@ class MeldingManager(models.Manager):
 
     def status_aanpassen(self, serializer, melding, db="default", heropen=False):
         from apps.meldingen.models import Melding, Meldinggebeurtenis
+        from apps.status.models import Status
         from apps.taken.models import Taakgebeurtenis, Taakopdracht, Taakstatus
 
         with transaction.atomic():
@@ -216,6 +687,11 @@ class MeldingManager(models.Manager):
                 )
 
             vorige_status = locked_melding.status
+            status_buurt_sleutels = (
+                Melding.objects.using(db)
+                .filter(pk=locked_melding.pk)
+                .status_buurt_sleutels()
+            )
 
             melding_gebeurtenis = serializer.save()
 
@@ -289,7 +765,16 @@ class MeldingManager(models.Manager):
                 melding_gebeurtenis.save()
 
             locked_melding.save()
-
+            Melding.objects.using(db).filter(
+                pk=locked_melding.pk
+            ).status_buurt_aantallen_bijwerken(status_buurt_sleutels)
+            Status.objects.using(db).filter(
+                melding=locked_melding
+            ).overgangen_vastleggen()
+
+            Melding.objects.using(db).filter(
+                pk=locked_melding.pk
+            ).wijziging_vastleggen()
             transaction.on_commit(
                 lambda: status_aangepast.send_robust(
                     sender=self.__class__,
@@ -346,6 +831,12 @@ class MeldingManager(models.Manager):
                         f"De melding is op dit moment in gebruik, probeer het later nog eens. melding nummer: {melding.id}, melding uuid: {melding.uuid}"
                     )
 
+                status_buurt_sleutels = (
+                    Melding.objects.using(db)
+                    .filter(pk=locked_melding.pk)
+                    .status_buurt_sleutels()
+                )
+
                 meldinggebeurtenis_bijlagen = meldinggebeurtenis.bijlagen.reverse()
                 if (
                     not locked_melding.thumbnail_afbeelding
@@ -354,8 +845,18 @@ class MeldingManager(models.Manager):
                     locked_melding.thumbnail_afbeelding = meldinggebeurtenis_bijlagen[0]
                 if meldinggebeurtenis.locatie:
                     locked_melding.referentie_locatie = meldinggebeurtenis.locatie
+                    locked_melding.referentie_punt = (
+                        meldinggebeurtenis.locatie.get_referentie_punt()
+                    )
                 locked_melding.save()
+                if meldinggebeurtenis.locatie:
+                    Melding.objects.using(db).filter(
+                        pk=locked_melding.pk
+                    ).status_buurt_aantallen_bijwerken(status_buurt_sleutels)
 
+            Melding.objects.using(db).filter(
+                pk=locked_melding.pk
+            ).wijziging_vastleggen()
             transaction.on_commit(
                 lambda: gebeurtenis_toegevoegd.send_robust(
                     sender=self.__class__,
@@ -380,7 +881,13 @@ class MeldingManager(models.Manager):
                 raise MeldingManager.MeldingInGebruik(
                     f"De melding is op dit moment in gebruik, probeer het later nog eens. melding nummer: {melding.id}, melding uuid: {melding.uuid}"
                 )
+            status_buurt_sleutels = (
+                Melding.objects.using(db)
+                .filter(pk=locked_melding.pk)
+                .status_buurt_sleutels()
+            )
             melding_url = locked_melding.get_absolute_url()
+            melding_uuid = locked_melding.uuid
 
             collector = NestedObjects(using=db)
             collector.collect([locked_melding])
@@ -392,11 +899,15 @@ class MeldingManager(models.Manager):
                 for pad in i.bijlage_paded()
             ]
             samenvatting = locked_melding.delete()
+            Melding.objects.using(db).filter(
+                pk=melding.pk
+            ).status_buurt_aantallen_bijwerken(status_buurt_sleutels)
 
             transaction.on_commit(
                 lambda: verwijderd.send_robust(
                     sender=self.__class__,
                     melding_url=melding_url,
+                    melding_uuid=melding_uuid,
                     bijlage_paden=alle_bestands_paden,
                     samenvatting=samenvatting,
                 )
@@ -471,6 +982,11 @@ class MeldingManager(models.Manager):
                     raise MeldingManager.MeldingInGebruik(
                         f"De melding is op dit moment in gebruik, probeer het later nog eens. melding nummer: {melding.id}, melding uuid: {melding.uuid}"
                     )
+                status_buurt_sleutels = (
+                    Melding.objects.using(db)
+                    .filter(pk=locked_melding.pk)
+                    .status_buurt_sleutels()
+                )
                 status_instance = Status(naam=Status.NaamOpties.IN_BEHANDELING)
                 status_instance.melding = locked_melding
                 status_instance.save()
@@ -483,8 +999,15 @@ class MeldingManager(models.Manager):
                     Meldinggebeurtenis.GebeurtenisType.STATUS_WIJZIGING
                 )
                 locked_melding.save()
+                Melding.objects.using(db).filter(
+                    pk=locked_melding.pk
+                ).status_buurt_aantallen_bijwerken(status_buurt_sleutels)
+                Status.objects.using(db).filter(
+                    melding=locked_melding
+                ).overgangen_vastleggen()
 
             melding_gebeurtenis.save()
+            Melding.objects.using(db).filter(pk=melding.pk).wijziging_vastleggen()
             transaction.on_commit(
                 lambda: taakopdracht_aangemaakt.send_robust(
                     sender=self.__class__,
@@ -543,6 +1066,11 @@ class MeldingManager(models.Manager):
                 raise MeldingManager.TaakopdrachtInGebruik(
                     f"De taak is op dit moment in gebruik, probeer het later nog eens. melding nummer: {taakopdracht.id}, melding uuid: {taakopdracht.uuid}"
                 )
+            status_buurt_sleutels = (
+                Melding.objects.using(db)
+                .filter(pk=locked_melding.pk)
+                .status_buurt_sleutels()
+            )
 
             taakgebeurtenis_aangemaakt_op = serializer.validated_data.pop(
                 "aangemaakt_op", timezone.now()
@@ -627,7 +1155,16 @@ class MeldingManager(models.Manager):
             melding_gebeurtenis.save()
             melding_gebeurtenis.aangemaakt_op = taakgebeurtenis_aangemaakt_op
             melding_gebeurtenis.save(update_fields=["aangemaakt_op"])
-
+            Melding.objects.using(db).filter(
+                pk=locked_melding.pk
+            ).status_buurt_aantallen_bijwerken(status_buurt_sleutels)
+            Status.objects.using(db).filter(
+                melding=locked_melding
+            ).overgangen_vastleggen()
+
+            Melding.objects.using(db).filter(
+                pk=locked_melding.pk
+            ).wijziging_vastleggen()
             transaction.on_commit(
                 lambda: taakopdracht_notificatie.send_robust(
                     sender=self.__class__,
@@ -700,6 +1237,11 @@ class MeldingManager(models.Manager):
                     raise MeldingManager.MeldingInGebruik(
                         f"De melding is op dit moment in gebruik, probeer het later nog eens. melding nummer: {taakopdracht.melding.id}, melding uuid: {taakopdracht.melding.uuid}"
                     )
+                status_buurt_sleutels = (
+                    Melding.objects.using(db)
+                    .filter(pk=locked_melding.pk)
+                    .status_buurt_sleutels()
+                )
                 status_instance = Status(naam=Status.NaamOpties.CONTROLE)
                 status_instance.melding = locked_melding
                 status_instance.save()
@@ -709,9 +1251,18 @@ class MeldingManager(models.Manager):
                     Meldinggebeurtenis.GebeurtenisType.STATUS_WIJZIGING
                 )
                 locked_melding.save()
+                Melding.objects.using(db).filter(
+                    pk=locked_melding.pk
+                ).status_buurt_aantallen_bijwerken(status_buurt_sleutels)
+                Status.objects.using(db).filter(
+                    melding=locked_melding
+                ).overgangen_vastleggen()
 
             melding_gebeurtenis.save()
 
+            Melding.objects.using(db).filter(
+                pk=locked_melding.pk
+            ).wijziging_vastleggen()
             transaction.on_commit(
                 lambda: taakopdracht_verwijderd.send_robust(
                     sender=self.__class__,
@@ -760,6 +1311,11 @@ class MeldingManager(models.Manager):
                 raise MeldingManager.TaakopdrachtInGebruik(
                     f"De taak is op dit moment in gebruik, probeer het later nog eens. melding nummer: {taakopdracht.id}, melding uuid: {taakopdracht.uuid}"
                 )
+            status_buurt_sleutels = (
+                Melding.objects.using(db)
+                .filter(pk=locked_melding.pk)
+                .status_buurt_sleutels()
+            )
             resolutie = serializer.validated_data.pop("resolutie", None)
             taakgebeurtenis = serializer.save(
                 taakopdracht=locked_taakopdracht,
@@ -817,6 +1373,15 @@ class MeldingManager(models.Manager):
             melding_gebeurtenis.save()
 
             locked_melding.save()
+            Melding.objects.using(db).filter(
+                pk=locked_melding.pk
+            ).status_buurt_aantallen_bijwerken(status_buurt_sleutels)
+            Status.objects.using(db).filter(
+                melding=locked_melding
+            ).overgangen_vastleggen()
+            Melding.objects.using(db).filter(
+                pk=locked_melding.pk
+            ).wijziging_vastleggen()
             transaction.on_commit(
                 lambda: taakopdracht_status_aangepast.send_robust(
                     sender=self.__class__,
@@ -1,10 +1,14 @@
+from datetime import timedelta
+
+from apps.aliassen.models import OnderwerpAlias
 from apps.applicaties.models import Applicatie
 from apps.meldingen.models import Melding
 from django.conf import settings
 from django.db import connections
-from django.db.models import Count, F, Value
+from django.db.models import Count, F, Min, Q, Value
 from django.db.models.functions import Coalesce
-from prometheus_client.core import CounterMetricFamily
+from django.utils import timezone
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
 
 
 class CustomCollector(object):
@@ -19,6 +23,7 @@ class CustomCollector(object):
         yield self.collect_melding_metrics()
         yield self.collect_taak_metrics()
         yield self.collect_celery_task_results()
+        yield from self.collect_onderwerp_alias_vernieuwd_metrics()
 
     def collect_taakopdracht_zonder_taak_url_metrics(self):
         c = CounterMetricFamily(
@@ -226,3 +231,38 @@ class CustomCollector(object):
             )
 
         return c
+
+    def collect_onderwerp_alias_vernieuwd_metrics(self):
+        aantallen = GaugeMetricFamily(
+            "morcore_onderwerp_aliassen",
+            "Aantallen onderwerp aliassen naar actualiteit van response_json",
+            labels=[
+                "actualiteit",
+            ],
+        )
+        oudste = GaugeMetricFamily(
+            "morcore_onderwerp_alias_oudste_vernieuwing_seconden",
+            "Aantal seconden sinds de minst recent vernieuwde onderwerp alias",
+        )
+        nu = timezone.now()
+        verouderd_grens = nu - timedelta(
+            seconds=settings.ONDERWERP_ALIAS_VERVERST_MAX_SECONDEN
+        )
+        actualiteit = OnderwerpAlias.objects.using(
+            settings.READONLY_DATABASE_KEY
+        ).aggregate(
+            actueel=Count("id", filter=Q(vernieuwd_op__gte=verouderd_grens)),
+            verouderd=Count("id", filter=Q(vernieuwd_op__lt=verouderd_grens)),
+            nooit_vernieuwd=Count("id", filter=Q(vernieuwd_op__isnull=True)),
+            oudste_vernieuwd_op=Min("vernieuwd_op"),
+        )
+        oudste_vernieuwd_op = actualiteit.pop("oudste_vernieuwd_op")
+
+        for label, aantal in actualiteit.items():
+            aantallen.add_metric((label,), aantal)
+        oudste.add_metric(
+            (),
+            (nu - oudste_vernieuwd_op).total_seconds() if oudste_vernieuwd_op else 0,
+        )
+        yield aantallen
+        yield oudste
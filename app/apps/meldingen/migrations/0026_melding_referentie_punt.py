@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:10
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("locatie", "0009_locatie_buurt_wijk_plaats_idx_locatie_plaatsnaam_idx"),
+        ("meldingen", "0025_alter_meldinggebeurtenis_gebeurtenis_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="melding",
+            name="referentie_punt",
+            field=django.contrib.gis.db.models.fields.PointField(
+                blank=True, null=True, srid=4326
+            ),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE "meldingen_melding" AS "m"
+                SET "referentie_punt" = ST_Centroid("l"."geometrie")
+                FROM "locatie_locatie" AS "l"
+                WHERE "l"."id" = "m"."referentie_locatie_id"
+                    AND "l"."geometrie" IS NOT NULL;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
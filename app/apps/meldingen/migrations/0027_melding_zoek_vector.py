@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("meldingen", "0026_melding_referentie_punt"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="melding",
+            name="zoek_vector",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.contrib.postgres.search.SearchVector(
+                    django.db.models.expressions.Func(
+                        models.F("zoek_tekst"),
+                        models.Value("[^[:alnum:]]+"),
+                        models.Value(" "),
+                        models.Value("g"),
+                        function="REGEXP_REPLACE",
+                    ),
+                    config="simple",
+                ),
+                output_field=django.contrib.postgres.search.SearchVectorField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["zoek_vector"], name="melding_zoek_vector_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:20
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("meldingen", "0027_melding_zoek_vector"),
+        ("signalen", "0011_signaalaanvraag"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="melding",
+            name="omschrijving_melder",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE "meldingen_melding" AS "m"
+                SET "omschrijving_melder" = "s"."omschrijving_melder"
+                FROM (
+                    SELECT "melding_id",
+                        STRING_AGG("omschrijving_melder", ' ' ORDER BY "id") AS "omschrijving_melder"
+                    FROM "signalen_signaal"
+                    WHERE "omschrijving_melder" IS NOT NULL
+                        AND "omschrijving_melder" <> ''
+                    GROUP BY "melding_id"
+                ) AS "s"
+                WHERE "s"."melding_id" = "m"."id";
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["omschrijving_melder"],
+                name="melding_omschrijving_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
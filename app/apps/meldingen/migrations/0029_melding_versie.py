@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("meldingen", "0028_melding_omschrijving_melder"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="melding",
+            name="versie",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
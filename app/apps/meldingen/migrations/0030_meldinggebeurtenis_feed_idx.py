@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("meldingen", "0029_melding_versie"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="meldinggebeurtenis",
+            index=models.Index(
+                fields=["aangemaakt_op", "id"], name="meldinggebeurtenis_feed_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:05
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("meldingen", "0030_meldinggebeurtenis_feed_idx"),
+    ]
+
+    operations = [
+        # Meldingen zonder referentie_punt krijgen het punt van de referentie locatie,
+        # of anders van de locatie met het hoogste gewicht die een geometrie heeft
+        migrations.RunSQL(
+            sql="""
+                UPDATE "meldingen_melding" AS "m"
+                SET "referentie_punt" = ST_Centroid("l"."geometrie")
+                FROM "locatie_locatie" AS "l"
+                WHERE "l"."id" = "m"."referentie_locatie_id"
+                    AND "l"."geometrie" IS NOT NULL
+                    AND "m"."referentie_punt" IS NULL;
+                UPDATE "meldingen_melding" AS "m"
+                SET "referentie_punt" = (
+                    SELECT ST_Centroid("l"."geometrie")
+                    FROM "locatie_locatie" AS "l"
+                    WHERE "l"."melding_id" = "m"."id"
+                        AND "l"."geometrie" IS NOT NULL
+                    ORDER BY "l"."gewicht" DESC, "l"."id"
+                    LIMIT 1
+                )
+                WHERE "m"."referentie_punt" IS NULL;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name="melding",
+            name="referentie_geografie",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.comparison.Cast(
+                    "referentie_punt",
+                    output_field=django.contrib.gis.db.models.fields.PointField(
+                        geography=True, srid=4326
+                    ),
+                ),
+                output_field=django.contrib.gis.db.models.fields.PointField(
+                    geography=True, srid=4326
+                ),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["referentie_geografie"], name="melding_referentie_geog_idx"
+            ),
+        ),
+    ]
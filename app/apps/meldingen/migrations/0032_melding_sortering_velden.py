@@ -0,0 +1,144 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("locatie", "0009_locatie_buurt_wijk_plaats_idx_locatie_plaatsnaam_idx"),
+        ("meldingen", "0031_melding_referentie_geografie"),
+        ("status", "0003_alter_status_naam"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="melding",
+            name="sortering_status_naam",
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name="melding",
+            name="sortering_straatnaam",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="melding",
+            name="sortering_buurtnaam",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="melding",
+            name="sortering_wijknaam",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="melding",
+            name="sortering_begraafplaats",
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name="melding",
+            name="sortering_vak",
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name="melding",
+            name="sortering_grafnummer",
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+        # Zelfde regels als MeldingQuerySet.sorteer_velden_vernieuwen: de naam van de
+        # status en de referentie locatie, of anders de locatie met het hoogste gewicht
+        migrations.RunSQL(
+            sql="""
+                UPDATE "meldingen_melding" AS "m"
+                SET
+                    "sortering_status_naam" = "s"."naam",
+                    "sortering_straatnaam" = "l"."straatnaam",
+                    "sortering_buurtnaam" = "l"."buurtnaam",
+                    "sortering_wijknaam" = "l"."wijknaam",
+                    "sortering_begraafplaats" = "l"."begraafplaats",
+                    "sortering_vak" = "l"."vak",
+                    "sortering_grafnummer" = "l"."grafnummer"
+                FROM "meldingen_melding" AS "mm"
+                LEFT JOIN "status_status" AS "s" ON "s"."id" = "mm"."status_id"
+                LEFT JOIN LATERAL (
+                    SELECT
+                        "straatnaam",
+                        "buurtnaam",
+                        "wijknaam",
+                        "begraafplaats",
+                        "vak",
+                        "grafnummer"
+                    FROM "locatie_locatie"
+                    WHERE "locatie_locatie"."melding_id" = "mm"."id"
+                    ORDER BY
+                        CASE
+                            WHEN "locatie_locatie"."id" = "mm"."referentie_locatie_id"
+                            THEN 0
+                            ELSE 1
+                        END,
+                        "locatie_locatie"."gewicht" DESC,
+                        "locatie_locatie"."id"
+                    LIMIT 1
+                ) AS "l" ON TRUE
+                WHERE "mm"."id" = "m"."id";
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=models.Index(
+                condition=models.Q(("afgesloten_op__isnull", True)),
+                fields=["sortering_status_naam", "id"],
+                name="melding_actief_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=models.Index(
+                condition=models.Q(("afgesloten_op__isnull", True)),
+                fields=["sortering_straatnaam", "id"],
+                name="melding_actief_straat_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=models.Index(
+                condition=models.Q(("afgesloten_op__isnull", True)),
+                fields=["sortering_buurtnaam", "id"],
+                name="melding_actief_buurt_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=models.Index(
+                condition=models.Q(("afgesloten_op__isnull", True)),
+                fields=["sortering_wijknaam", "id"],
+                name="melding_actief_wijk_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=models.Index(
+                condition=models.Q(("afgesloten_op__isnull", True)),
+                fields=["sortering_begraafplaats", "id"],
+                name="melding_actief_begraafpl_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=models.Index(
+                condition=models.Q(("afgesloten_op__isnull", True)),
+                fields=["sortering_vak", "id"],
+                name="melding_actief_vak_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=models.Index(
+                condition=models.Q(("afgesloten_op__isnull", True)),
+                fields=["sortering_grafnummer", "id"],
+                name="melding_actief_grafnr_idx",
+            ),
+        ),
+    ]
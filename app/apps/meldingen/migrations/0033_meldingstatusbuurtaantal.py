@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+STATUS_BUURT_AANTALLEN_VULLEN = """
+    INSERT INTO "meldingen_meldingstatusbuurtaantal"
+        ("status_naam", "wijknaam", "buurtnaam", "spoed", "aantal")
+    SELECT "status_status"."naam",
+        "locatie_locatie"."wijknaam",
+        "locatie_locatie"."buurtnaam",
+        "meldingen_melding"."urgentie" >= 0.5,
+        COUNT(*)
+    FROM "meldingen_melding"
+        JOIN "status_status" ON ("status_status"."id" = "meldingen_melding"."status_id")
+        JOIN "locatie_locatie" ON ("locatie_locatie"."id" = "meldingen_melding"."referentie_locatie_id")
+    WHERE "locatie_locatie"."locatie_type" = 'adres'
+        AND "locatie_locatie"."wijknaam" IS NOT NULL
+        AND "locatie_locatie"."buurtnaam" IS NOT NULL
+    GROUP BY 1, 2, 3, 4;
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("meldingen", "0032_melding_sortering_velden"),
+        ("locatie", "0009_locatie_buurt_wijk_plaats_idx_locatie_plaatsnaam_idx"),
+        ("status", "0003_alter_status_naam"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MeldingStatusBuurtAantal",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("status_naam", models.CharField(max_length=50)),
+                ("wijknaam", models.CharField(max_length=255)),
+                ("buurtnaam", models.CharField(max_length=255)),
+                ("spoed", models.BooleanField(default=False)),
+                ("aantal", models.IntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Melding status buurt aantal",
+                "verbose_name_plural": "Melding status buurt aantallen",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("status_naam", "wijknaam", "buurtnaam", "spoed"),
+                        name="melding_status_buurt_aantal_uniek",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(
+            STATUS_BUURT_AANTALLEN_VULLEN,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("meldingen", "0033_meldingstatusbuurtaantal"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MeldingBuurtAantal",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "interval",
+                    models.CharField(
+                        choices=[("uur", "Uur"), ("dag", "Dag")], max_length=3
+                    ),
+                ),
+                ("periode_start", models.DateTimeField()),
+                ("wijknaam", models.CharField(max_length=255)),
+                ("buurtnaam", models.CharField(max_length=255)),
+                ("aangemaakt", models.IntegerField(default=0)),
+                ("openstaand", models.IntegerField(default=0)),
+                ("afgehandeld", models.IntegerField(default=0)),
+                ("bijgewerkt_op", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Melding buurt aantal",
+                "verbose_name_plural": "Melding buurt aantallen",
+                "indexes": [
+                    models.Index(
+                        fields=["bijgewerkt_op"],
+                        name="melding_buurt_aantal_bijgew_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("interval", "periode_start", "wijknaam", "buurtnaam"),
+                        name="melding_buurt_aantal_uniek",
+                    )
+                ],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=models.Index(
+                fields=["aangemaakt_op"], name="melding_aangemaakt_op_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=models.Index(
+                fields=["afgesloten_op"], name="melding_afgesloten_op_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=models.Index(
+                fields=["aangepast_op"], name="melding_aangepast_op_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("meldingen", "0034_meldingbuurtaantal"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="meldingbuurtaantal",
+            name="openstaand",
+        ),
+        migrations.AddIndex(
+            model_name="melding",
+            index=models.Index(
+                condition=models.Q(("afgesloten_op__isnull", True)),
+                fields=["aangemaakt_op"],
+                name="melding_open_aangemaakt_idx",
+            ),
+        ),
+    ]
@@ -3,15 +3,22 @@ import uuid
 
 from apps.bijlagen.models import Bijlage
 from apps.meldingen.managers import MeldingManager
-from apps.meldingen.querysets import MeldingQuerySet
+from apps.meldingen.querysets import (
+    MeldingBuurtAantalQuerySet,
+    MeldingQuerySet,
+    MeldingStatusBuurtAantalQuerySet,
+)
 from apps.signalen.models import Signaal
 from apps.taken.models import Taakgebeurtenis
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.contrib.sites.models import Site
-from django.db.models import Q
+from django.db.models import F, Func, Q, Value
+from django.db.models.functions import Cast
 from django_extensions.db.fields import AutoSlugField
 from rest_framework.reverse import reverse
 from utils.fields import DictJSONField
@@ -123,6 +130,12 @@ class Meldinggebeurtenis(BasisModel):
         ordering = ("-aangemaakt_op",)
         verbose_name = "Melding gebeurtenis"
         verbose_name_plural = "Melding gebeurtenissen"
+        indexes = [
+            models.Index(
+                fields=["aangemaakt_op", "id"],
+                name="meldinggebeurtenis_feed_idx",
+            ),
+        ]
 
 
 class Melding(BasisModel):
@@ -188,11 +201,57 @@ class Melding(BasisModel):
         blank=True,
         null=True,
     )
+    referentie_punt = models.PointField(
+        srid=4326,
+        blank=True,
+        null=True,
+    )
+    # Geography van referentie_punt voor het within filter, met een GIST index
+    referentie_geografie = models.GeneratedField(
+        expression=Cast(
+            "referentie_punt",
+            output_field=models.PointField(srid=4326, geography=True),
+        ),
+        output_field=models.PointField(srid=4326, geography=True),
+        db_persist=True,
+    )
+    # Sorteer kolommen, afgeleid van de status en de referentie locatie (of anders de
+    # locatie met het hoogste gewicht). Bijgewerkt via MeldingQuerySet.wijziging_vastleggen.
+    sortering_status_naam = models.CharField(max_length=50, null=True, blank=True)
+    sortering_straatnaam = models.CharField(max_length=255, null=True, blank=True)
+    sortering_buurtnaam = models.CharField(max_length=255, null=True, blank=True)
+    sortering_wijknaam = models.CharField(max_length=255, null=True, blank=True)
+    sortering_begraafplaats = models.CharField(max_length=50, null=True, blank=True)
+    sortering_vak = models.CharField(max_length=10, null=True, blank=True)
+    sortering_grafnummer = models.CharField(max_length=10, null=True, blank=True)
     zoek_tekst = models.TextField(
         default="",
         blank=True,
         null=True,
     )
+    # Wordt opgehoogd bij elke wijziging van de melding of onderliggende objecten, voor ETags
+    versie = models.PositiveIntegerField(default=0)
+    # De omschrijving_melder van alle signalen van de melding, voor trigram zoeken
+    omschrijving_melder = models.TextField(
+        default="",
+        blank=True,
+    )
+    # Afgeleid van zoek_tekst, alle niet alfanumerieke tekens worden spaties zodat
+    # straatnamen, huisnummers, postcodes en e-mail delen losse lexemen worden.
+    zoek_vector = models.GeneratedField(
+        expression=SearchVector(
+            Func(
+                F("zoek_tekst"),
+                Value("[^[:alnum:]]+"),
+                Value(" "),
+                Value("g"),
+                function="REGEXP_REPLACE",
+            ),
+            config="simple",
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     objects = MeldingQuerySet.as_manager()
     acties = MeldingManager()
@@ -210,61 +269,7 @@ class Melding(BasisModel):
         return self.locaties_voor_melding
 
     def get_zoek_tekst(self):
-        from apps.locatie.models import Locatie
-        from apps.melders.models import Melder
-
-        signalen_voor_melding = self.signalen_voor_melding.all()
-        melders = Melder.objects.filter(
-            id__in=list(signalen_voor_melding.values_list("melder__id", flat=True))
-        )
-        locaties_voor_melding = (
-            Locatie.objects.exclude(locatie_type="lichtmast")
-            .filter(
-                Q(melding__id=self.id)
-                | Q(
-                    signaal__id__in=list(
-                        signalen_voor_melding.values_list("id", flat=True)
-                    )
-                )
-            )
-            .distinct()
-        )
-
-        locatie_zoek_teksten = [
-            locatie.get_zoek_tekst() for locatie in locaties_voor_melding
-        ]
-
-        bron_signaal_ids = list(
-            signalen_voor_melding.filter(
-                bron_signaal_id__isnull=False,
-            ).values_list("bron_signaal_id", flat=True)
-        )
-
-        melder_zoek_dicts = [melder.get_zoek_tekst() for melder in melders]
-        melder_zoek_teksten = [
-            melder_dict[melder_zoek_field]
-            for melder_dict in melder_zoek_dicts
-            for melder_zoek_field in [
-                "voornaam_achternaam",
-                "email",
-                "naam",
-                "telefoonnummer",
-            ]
-        ]
-
-        return ",".join(
-            list(
-                set(
-                    [
-                        tekst
-                        for tekst in bron_signaal_ids
-                        + locatie_zoek_teksten
-                        + melder_zoek_teksten
-                        if tekst
-                    ]
-                )
-            )
-        )
+        return Melding.objects.zoek_teksten([self.id])[self.id]
 
     def get_bijlagen(self, order_by="aangemaakt_op"):
         bijlagen = Bijlage.objects.filter(
@@ -328,6 +333,123 @@ class Melding(BasisModel):
     class Meta:
         verbose_name = "Melding"
         verbose_name_plural = "Meldingen"
+        indexes = [
+            GinIndex(fields=["zoek_vector"], name="melding_zoek_vector_idx"),
+            models.Index(fields=["aangemaakt_op"], name="melding_aangemaakt_op_idx"),
+            models.Index(fields=["afgesloten_op"], name="melding_afgesloten_op_idx"),
+            models.Index(fields=["aangepast_op"], name="melding_aangepast_op_idx"),
+            models.Index(
+                fields=["aangemaakt_op"],
+                condition=Q(afgesloten_op__isnull=True),
+                name="melding_open_aangemaakt_idx",
+            ),
+            GistIndex(
+                fields=["referentie_geografie"], name="melding_referentie_geog_idx"
+            ),
+            GinIndex(
+                fields=["omschrijving_melder"],
+                opclasses=["gin_trgm_ops"],
+                name="melding_omschrijving_trgm_idx",
+            ),
+            models.Index(
+                fields=["sortering_status_naam", "id"],
+                condition=Q(afgesloten_op__isnull=True),
+                name="melding_actief_status_idx",
+            ),
+            models.Index(
+                fields=["sortering_straatnaam", "id"],
+                condition=Q(afgesloten_op__isnull=True),
+                name="melding_actief_straat_idx",
+            ),
+            models.Index(
+                fields=["sortering_buurtnaam", "id"],
+                condition=Q(afgesloten_op__isnull=True),
+                name="melding_actief_buurt_idx",
+            ),
+            models.Index(
+                fields=["sortering_wijknaam", "id"],
+                condition=Q(afgesloten_op__isnull=True),
+                name="melding_actief_wijk_idx",
+            ),
+            models.Index(
+                fields=["sortering_begraafplaats", "id"],
+                condition=Q(afgesloten_op__isnull=True),
+                name="melding_actief_begraafpl_idx",
+            ),
+            models.Index(
+                fields=["sortering_vak", "id"],
+                condition=Q(afgesloten_op__isnull=True),
+                name="melding_actief_vak_idx",
+            ),
+            models.Index(
+                fields=["sortering_grafnummer", "id"],
+                condition=Q(afgesloten_op__isnull=True),
+                name="melding_actief_grafnr_idx",
+            ),
+        ]
+
+
+class MeldingStatusBuurtAantal(models.Model):
+    """
+    Aantal meldingen per status, wijk, buurt en spoed, voor meldingen met een
+    referentie locatie van het type adres. De tellers worden door MeldingManager
+    in dezelfde transactie als de melding bijgewerkt, en kunnen worden hersteld met
+    het management command 'herbereken_melding_status_buurt_aantallen'.
+    """
+
+    status_naam = models.CharField(max_length=50)
+    wijknaam = models.CharField(max_length=255)
+    buurtnaam = models.CharField(max_length=255)
+    spoed = models.BooleanField(default=False)
+    aantal = models.IntegerField(default=0)
+
+    objects = MeldingStatusBuurtAantalQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Melding status buurt aantal"
+        verbose_name_plural = "Melding status buurt aantallen"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["status_naam", "wijknaam", "buurtnaam", "spoed"],
+                name="melding_status_buurt_aantal_uniek",
+            ),
+        ]
+
+
+class MeldingBuurtAantal(models.Model):
+    """
+    Aantal aangemaakte en afgehandelde meldingen per uur of dag, wijk en buurt.
+    Wordt periodiek bijgewerkt door 'task_melding_buurt_aantallen_bijwerken'.
+    """
+
+    class IntervalOpties(models.TextChoices):
+        UUR = "uur", "Uur"
+        DAG = "dag", "Dag"
+
+    interval = models.CharField(max_length=3, choices=IntervalOpties.choices)
+    periode_start = models.DateTimeField()
+    wijknaam = models.CharField(max_length=255)
+    buurtnaam = models.CharField(max_length=255)
+    aangemaakt = models.IntegerField(default=0)
+    afgehandeld = models.IntegerField(default=0)
+    bijgewerkt_op = models.DateTimeField()
+
+    objects = MeldingBuurtAantalQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Melding buurt aantal"
+        verbose_name_plural = "Melding buurt aantallen"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["interval", "periode_start", "wijknaam", "buurtnaam"],
+                name="melding_buurt_aantal_uniek",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["bijgewerkt_op"], name="melding_buurt_aantal_bijgew_idx"
+            ),
+        ]
 
 
 class Specificatie(BasisModel):
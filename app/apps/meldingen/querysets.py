@@ -1,16 +1,213 @@
 import logging
-from datetime import timedelta
+import math
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from functools import reduce
+from operator import or_
 
 from django.conf import settings
 from django.contrib.gis.db import models
-from django.db import connections
-from django.db.models import Count, F, OuterRef, QuerySet, Subquery, Value
-from django.db.models.functions import Coalesce, Concat
+from django.contrib.gis.db.models.functions import (
+    Centroid,
+    Distance,
+    GeoHash,
+    Transform,
+)
+from django.contrib.gis.geos import Polygon
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections, transaction
+from django.db.models import (
+    Avg,
+    BinaryField,
+    BooleanField,
+    Case,
+    Count,
+    Exists,
+    F,
+    FloatField,
+    Func,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import (
+    Coalesce,
+    Concat,
+    JSONObject,
+    Trim,
+    TruncDay,
+    TruncHour,
+)
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
 
+class KNNAfstand(Func):
+    """
+    PostGIS '<->' operator, in een ORDER BY met LIMIT gebruikt postgres hiervoor
+    de GIST index op de geometrie kolom.
+    """
+
+    template = "%(expressions)s"
+    arg_joiner = " <-> "
+    output_field = FloatField()
+
+
+class AsMVTGeom(Func):
+    function = "ST_AsMVTGeom"
+    output_field = BinaryField()
+
+
+class TileEnvelope(Func):
+    function = "ST_TileEnvelope"
+    output_field = BinaryField()
+
+
+class PuntX(Func):
+    function = "ST_X"
+    output_field = FloatField()
+
+
+class PuntY(Func):
+    function = "ST_Y"
+    output_field = FloatField()
+
+
+def tegel_envelop(z, x, y, marge=0):
+    """
+    Bounding box in WGS84 van tegel z/x/y, vergroot met 'marge' (fractie van de tegel).
+    """
+    n = 2**z
+
+    def lon(x):
+        return x / n * 360 - 180
+
+    def lat(y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+    envelop = Polygon.from_bbox(
+        (lon(x - marge), lat(y + 1 + marge), lon(x + 1 + marge), lat(y - marge))
+    )
+    envelop.srid = 4326
+    return envelop
+
+
+ZOEK_TERM_REGEX = re.compile(r"[^\W_]+")
+
+
+STATUS_BUURT_SPOED_URGENTIE = 0.5
+BUURT_FILTER = Q(
+    referentie_locatie__locatie_type="adres",
+    referentie_locatie__wijknaam__isnull=False,
+    referentie_locatie__buurtnaam__isnull=False,
+)
+STATUS_BUURT_FILTER = BUURT_FILTER & Q(status__isnull=False)
+
+
+def uur_start(tijdstip):
+    # Nederlandse tijdzones verschillen hele uren van UTC, dus een UTC uur is ook
+    # een lokaal uur, zonder de dubbele of ontbrekende uren rond de zomertijd
+    return tijdstip.astimezone(dt_timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    )
+
+
+def dag_start(tijdstip):
+    return timezone.localtime(tijdstip).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def aaneengesloten_periodes(starts, lengte):
+    """
+    Voegt gesorteerde periode starts samen tot (start, eind) tuples van
+    aaneengesloten periodes met de gegeven lengte.
+    """
+    periodes = []
+    for start in starts:
+        if periodes and periodes[-1][1] == start:
+            periodes[-1] = (periodes[-1][0], start + lengte)
+        else:
+            periodes.append((start, start + lengte))
+    return periodes
+
+
+def periodes_filter(veld, periodes):
+    return reduce(
+        or_,
+        (Q(**{f"{veld}__gte": start, f"{veld}__lt": eind}) for start, eind in periodes),
+    )
+
+
+def zoek_query(tekst):
+    """
+    Zet zoek tekst om naar een tsquery waarin alle woorden als prefix moeten
+    voorkomen, b.v. 'Coolsingel 4, 3011' wordt 'coolsingel:* & 4:* & 3011:*'.
+    De woorden worden op dezelfde manier gesplitst als Melding.zoek_vector.
+
+    Anders dan het vroegere icontains zoeken matcht een woord alleen aan het begin
+    van een woord in de zoek tekst: 'cools' vindt 'Coolsingel', 'singel' niet.
+    Komma's scheiden nog steeds zoektermen die allemaal moeten voorkomen, net als
+    spaties.
+    """
+    termen = ZOEK_TERM_REGEX.findall(tekst or "")
+    if not termen:
+        return None
+    return SearchQuery(
+        " & ".join(f"{term}:*" for term in termen),
+        search_type="raw",
+        config="simple",
+    )
+
+
+def postcode_zoek_tekst(postcode):
+    """
+    '3011 AD' wordt '3011AD 3011 AD', zodat '3011AD', '3011 AD' en '3011' allemaal
+    als prefix overeenkomen.
+    """
+    postcode = "".join(postcode.split()).upper()
+    return f"{postcode} {postcode[:4]} {postcode[4:]}".strip()
+
+
+EXPORT_VELDEN = (
+    "id",
+    "uuid",
+    "origineel_aangemaakt",
+    "aangemaakt_op",
+    "aangepast_op",
+    "afgesloten_op",
+    "resolutie",
+    "afhandelreden",
+    "urgentie",
+    "omschrijving_melder",
+)
+EXPORT_RELATIE_VELDEN = {
+    "status_naam": F("status__naam"),
+    "straatnaam": F("referentie_locatie__straatnaam"),
+    "huisnummer": F("referentie_locatie__huisnummer"),
+    "huisletter": F("referentie_locatie__huisletter"),
+    "toevoeging": F("referentie_locatie__toevoeging"),
+    "postcode": F("referentie_locatie__postcode"),
+    "buurtnaam": F("referentie_locatie__buurtnaam"),
+    "wijknaam": F("referentie_locatie__wijknaam"),
+    "begraafplaats": F("referentie_locatie__begraafplaats"),
+    "grafnummer": F("referentie_locatie__grafnummer"),
+    "vak": F("referentie_locatie__vak"),
+}
+EXPORT_KOLOMMEN = [*EXPORT_VELDEN, *EXPORT_RELATIE_VELDEN, "onderwerpen"]
+
+
 class MeldingQuerySet(QuerySet):
     def dictfetchall(self, cursor):
         """
@@ -20,135 +217,808 @@ class MeldingQuerySet(QuerySet):
         columns = [col[0] for col in cursor.description]
         return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
-    def melding_status_buurt_aantallen(self, spoed_start=0, spoed_end=1.1):
-        spoed_qs = ""
-        if isinstance(spoed_start, (float | int)) and isinstance(
-            spoed_end, (float | int)
-        ):
-            spoed_qs = f'AND "meldingen_melding"."urgentie" >= {float(spoed_start)} AND "meldingen_melding"."urgentie" < {float(spoed_end)}'
-
-        sql = f'SELECT "status_status"."naam", \
-            "locatie_locatie"."wijknaam", \
-            "locatie_locatie"."buurtnaam", \
-            COUNT("status_status"."naam") AS "count" \
-            FROM "status_status" \
-                JOIN "meldingen_melding" ON ("status_status"."id" = "meldingen_melding"."status_id") \
-                JOIN "locatie_locatie" ON ("locatie_locatie"."id" = "meldingen_melding"."referentie_locatie_id") \
-            WHERE \
-                "locatie_locatie"."buurtnaam" IS NOT NULL \
-                AND "locatie_locatie"."wijknaam" IS NOT NULL \
-                AND "locatie_locatie"."locatie_type" = \'adres\' \
-                {spoed_qs} \
-            GROUP BY "status_status"."naam", "locatie_locatie"."wijknaam", "locatie_locatie"."buurtnaam" \
-            ORDER BY "status_status"."naam", "locatie_locatie"."wijknaam", "locatie_locatie"."buurtnaam" ASC; \
-        '
-        melding_status_buurt_aantallen_results = []
-        with connections[settings.READONLY_DATABASE_KEY].cursor() as cursor:
-            cursor.execute(sql)
-            melding_status_buurt_aantallen_results = self.dictfetchall(cursor)
-        return melding_status_buurt_aantallen_results
-
-    def melding_afgehandeld_per_buurt_aantallen(
-        self, afgesloten_op_gt, afgesloten_op_lte
-    ):
-        try:
-            afgesloten_op_gt = afgesloten_op_gt.isoformat()
-        except Exception:
-            afgesloten_op_gt = (timezone.now() - timedelta(hours=24)).isoformat()
-
-        sq_where_to = ""
-        try:
-            sq_where_to = f'AND "meldingen_melding"."afgesloten_op" <= \'{afgesloten_op_lte.isoformat()}\''
-        except Exception:
-            ...
-
-        sql = f'SELECT "locatie_locatie"."wijknaam", \
-            "locatie_locatie"."buurtnaam", \
-            COUNT(*) AS "count" \
-            FROM "meldingen_melding" \
-                JOIN "locatie_locatie" ON ("locatie_locatie"."id" = "meldingen_melding"."referentie_locatie_id") \
-            WHERE \
-                "meldingen_melding"."afgesloten_op" > \'{afgesloten_op_gt}\' \
-                AND "locatie_locatie"."buurtnaam" IS NOT NULL \
-                AND "locatie_locatie"."wijknaam" IS NOT NULL \
-                AND "locatie_locatie"."locatie_type" = \'adres\' \
-                {sq_where_to} \
-            GROUP BY "locatie_locatie"."wijknaam", "locatie_locatie"."buurtnaam" \
-            ORDER BY "locatie_locatie"."wijknaam", "locatie_locatie"."buurtnaam" ASC; \
-        '
-        melding_status_buurt_aantallen_results = []
-        with connections[settings.READONLY_DATABASE_KEY].cursor() as cursor:
-            cursor.execute(sql)
-            melding_status_buurt_aantallen_results = self.dictfetchall(cursor)
-        return melding_status_buurt_aantallen_results
-
-    def melding_aangemaakt_per_buurt_aantallen(
-        self, aangemaakt_op_gt, aangemaakt_op_lte, openstaand=True
-    ):
-        try:
-            aangemaakt_op_gt = aangemaakt_op_gt.isoformat()
-        except Exception:
-            aangemaakt_op_gt = (timezone.now() - timedelta(hours=24)).isoformat()
-
-        sq_where_to = ""
-        try:
-            sq_where_to = f'AND "meldingen_melding"."aangemaakt_op" <= \'{aangemaakt_op_lte.isoformat()}\''
-        except Exception:
-            ...
-
-        sq_openstaand = ""
-        if openstaand:
-            sq_openstaand = 'AND "meldingen_melding"."afgesloten_op" IS NULL'
-
-        sql = f'SELECT "locatie_locatie"."wijknaam", \
-            "locatie_locatie"."buurtnaam", \
-            COUNT(*) AS "count" \
-            FROM "meldingen_melding" \
-                JOIN "locatie_locatie" ON ("locatie_locatie"."id" = "meldingen_melding"."referentie_locatie_id") \
-            WHERE \
-                "meldingen_melding"."aangemaakt_op" > \'{aangemaakt_op_gt}\' \
-                AND "locatie_locatie"."buurtnaam" IS NOT NULL \
-                AND "locatie_locatie"."wijknaam" IS NOT NULL \
-                AND "locatie_locatie"."locatie_type" = \'adres\' \
-                {sq_where_to} \
-                {sq_openstaand} \
-            GROUP BY "locatie_locatie"."wijknaam", "locatie_locatie"."buurtnaam" \
-            ORDER BY "locatie_locatie"."wijknaam", "locatie_locatie"."buurtnaam" ASC; \
-        '
-        melding_status_buurt_aantallen_results = []
-        with connections[settings.READONLY_DATABASE_KEY].cursor() as cursor:
-            cursor.execute(sql)
-            melding_status_buurt_aantallen_results = self.dictfetchall(cursor)
-        return melding_status_buurt_aantallen_results
+    def status_buurt_sleutels(self):
+        """
+        Per melding de sleutel (status naam, wijk, buurt, spoed) waaronder de melding
+        in MeldingStatusBuurtAantal wordt geteld, alleen voor meldingen met een
+        referentie locatie van het type adres met een wijk en buurt.
+        """
+        return {
+            rij["id"]: (
+                rij["status__naam"],
+                rij["referentie_locatie__wijknaam"],
+                rij["referentie_locatie__buurtnaam"],
+                rij["urgentie"] >= STATUS_BUURT_SPOED_URGENTIE,
+            )
+            for rij in self.filter(STATUS_BUURT_FILTER).values(
+                "id",
+                "status__naam",
+                "referentie_locatie__wijknaam",
+                "referentie_locatie__buurtnaam",
+                "urgentie",
+            )
+        }
+
+    def status_buurt_telling(self):
+        """
+        Aantal meldingen per (status naam, wijk, buurt, spoed), in een enkele
+        gegroepeerde query.
+        """
+        return {
+            (
+                rij["status__naam"],
+                rij["referentie_locatie__wijknaam"],
+                rij["referentie_locatie__buurtnaam"],
+                rij["spoed"],
+            ): rij["aantal"]
+            for rij in self.filter(STATUS_BUURT_FILTER)
+            .annotate(
+                spoed=Case(
+                    When(urgentie__gte=STATUS_BUURT_SPOED_URGENTIE, then=Value(True)),
+                    default=Value(False),
+                    output_field=BooleanField(),
+                )
+            )
+            .order_by()
+            .values(
+                "status__naam",
+                "referentie_locatie__wijknaam",
+                "referentie_locatie__buurtnaam",
+                "spoed",
+            )
+            .annotate(aantal=Count("id"))
+        }
+
+    def status_buurt_aantallen_bijwerken(self, voor):
+        """
+        Verwerkt het verschil tussen de sleutels van voor een wijziging, uit
+        'status_buurt_sleutels', en de huidige sleutels in MeldingStatusBuurtAantal.
+        Hoort in dezelfde transactie te worden aangeroepen als de wijziging.
+        """
+        from apps.meldingen.models import MeldingStatusBuurtAantal
+
+        MeldingStatusBuurtAantal.objects.using(self.db).bijwerken(
+            voor, self.status_buurt_sleutels()
+        )
 
     def nieuwe_meldingen(self):
-        from apps.aliassen.models import OnderwerpAlias
+        from apps.aliassen.catalogus import onderwerp_catalogus
+        from apps.meldingen.models import Melding
+
+        onderwerpen = Melding.onderwerpen.through.objects.filter(
+            melding_id=OuterRef("pk")
+        )
+        meldingen = (
+            self.prefetch_related(None)
+            .annotate(
+                onderwerp_alias_id=Subquery(
+                    onderwerpen.order_by("id").values("onderwerpalias_id")[:1]
+                ),
+                wijk=Coalesce(
+                    F("referentie_locatie__wijknaam"),
+                    Value("Onbekend"),
+                ),
+            )
+            .values("onderwerp_alias_id", "wijk")
+            .order_by()
+            .annotate(count=Count("id"))
+        )
+
+        # De onderwerp naam komt uit de lokale catalogus, zodat er in de database
+        # alleen op onderwerp id en wijk gegroepeerd hoeft te worden
+        onderwerpen_uit_catalogus = onderwerp_catalogus.get_many(
+            [m["onderwerp_alias_id"] for m in meldingen if m["onderwerp_alias_id"]]
+        )
+        aantallen = {}
+        for m in meldingen:
+            onderwerp_naam = (
+                onderwerpen_uit_catalogus.get(m["onderwerp_alias_id"], {}).get("naam")
+                or "Onbekend"
+            )
+            sleutel = (onderwerp_naam, m["wijk"])
+            aantallen[sleutel] = aantallen.get(sleutel, 0) + m["count"]
+
+        return [
+            {
+                "count": count,
+                "onderwerp_naam": onderwerp_naam,
+                "wijk": wijk,
+            }
+            for (onderwerp_naam, wijk), count in sorted(
+                aantallen.items(), key=lambda item: f"{item[0][0]}-{item[0][1]}"
+            )
+        ]
+
+    def dubbele_kandidaten(
+        self,
+        punt,
+        onderwerp_ids=None,
+        afstand=settings.DUBBELE_KANDIDATEN_AFSTAND,
+        max_aantal=settings.DUBBELE_KANDIDATEN_MAX_AANTAL,
+        dagen=settings.DUBBELE_KANDIDATEN_DAGEN,
+    ):
+        """
+        Open meldingen binnen 'afstand' meter van 'punt', met minimaal één van de
+        onderwerpen, gesorteerd op afstand en daarna op leeftijd (nieuwste eerst).
+        Het bounding box filter en de KNN sortering gebruiken de GIST index op
+        referentie_punt, de exacte afstand in meters wordt alleen voor de
+        overgebleven meldingen berekend.
+        """
+        from apps.meldingen.models import Melding
 
-        onderwerpen = OnderwerpAlias.objects.filter(
-            meldingen_voor_onderwerpen=OuterRef("pk")
+        if punt.srid is None:
+            punt.srid = 4326
+        # Graden per meter in de lengterichting, dit is de ruimste van de twee richtingen
+        afstand_graden = afstand / (111320 * max(math.cos(math.radians(punt.y)), 0.01))
+
+        meldingen = self.filter(
+            afgesloten_op__isnull=True,
+            referentie_punt__isnull=False,
+            referentie_punt__dwithin=(punt, afstand_graden),
+        )
+        if dagen:
+            meldingen = meldingen.filter(
+                origineel_aangemaakt__gte=timezone.now() - timedelta(days=dagen)
+            )
+        if onderwerp_ids is not None:
+            meldingen = meldingen.filter(
+                Exists(
+                    Melding.onderwerpen.through.objects.filter(
+                        melding_id=OuterRef("pk"),
+                        onderwerpalias_id__in=onderwerp_ids,
+                    )
+                )
+            )
+        return (
+            meldingen.annotate(afstand=Distance("referentie_punt", punt))
+            .filter(afstand__lte=afstand)
+            .order_by(
+                KNNAfstand(
+                    F("referentie_punt"),
+                    Value(punt, output_field=models.PointField(srid=4326)),
+                ),
+                "-origineel_aangemaakt",
+            )[:max_aantal]
+        )
+
+    def zoeken(self, tekst):
+        """
+        Full text zoeken op zoek_vector via de GIN index, gesorteerd op relevantie.
+        """
+        query = zoek_query(tekst)
+        if query is None:
+            return self
+        return (
+            self.filter(zoek_vector=query)
+            .annotate(zoek_rang=SearchRank(F("zoek_vector"), query))
+            .order_by("-zoek_rang", "-id")
         )
-        meldingen = self.all()
 
-        meldingen = meldingen.annotate(
-            onderwerp_naam=Coalesce(
-                Subquery(onderwerpen.values("response_json__name")[:1]),
-                Value("Onbekend", output_field=models.JSONField()),
+    def zoek_teksten(self, melding_ids):
+        """
+        Bouwt de zoek_tekst voor een reeks meldingen met twee queries: de signalen
+        gegroepeerd per melding (bron signaal ids en melders) en de locaties van de
+        meldingen en hun signalen. Geeft een dict terug met melding id als sleutel.
+        """
+        from apps.locatie.models import Locatie
+        from apps.melders.models import Melder
+        from apps.signalen.models import Signaal
+
+        melder_velden = ["naam", "voornaam", "achternaam", "email", "telefoonnummer"]
+        locatie_velden = [
+            "locatie_type",
+            "straatnaam",
+            "huisnummer",
+            "huisletter",
+            "toevoeging",
+            "grafnummer",
+            "vak",
+        ]
+        teksten = {melding_id: set() for melding_id in melding_ids}
+
+        signalen_per_melding = (
+            Signaal.objects.filter(melding_id__in=melding_ids)
+            .values("melding_id")
+            .order_by()
+            .annotate(
+                bron_signaal_ids=ArrayAgg(
+                    "bron_signaal_id",
+                    distinct=True,
+                    filter=Q(bron_signaal_id__isnull=False),
+                    default=[],
+                ),
+                melders=ArrayAgg(
+                    JSONObject(**{veld: f"melder__{veld}" for veld in melder_velden}),
+                    filter=Q(melder__isnull=False),
+                    default=[],
+                ),
             )
-        ).annotate(
-            wijk=Coalesce(
-                F("referentie_locatie__wijknaam"),
-                Value("Onbekend"),
+        )
+        for signalen in signalen_per_melding:
+            melding_teksten = teksten[signalen["melding_id"]]
+            melding_teksten.update(signalen["bron_signaal_ids"])
+            for melder in signalen["melders"]:
+                melding_teksten.update(Melder(**melder).get_zoek_tekst().values())
+
+        locaties = (
+            Locatie.objects.exclude(locatie_type="lichtmast")
+            .filter(
+                Q(melding_id__in=melding_ids) | Q(signaal__melding_id__in=melding_ids)
             )
+            .values("melding_id", "signaal__melding_id", "postcode", *locatie_velden)
         )
-        meldingen = meldingen.annotate(
-            onderwerp_wijk=Concat(
-                "onderwerp_naam", Value("-"), "wijk", output_field=models.CharField()
+        for locatie in locaties:
+            locatie_teksten = {
+                Locatie(
+                    **{veld: locatie[veld] for veld in locatie_velden}
+                ).get_zoek_tekst()
+            }
+            if locatie["postcode"]:
+                locatie_teksten.add(postcode_zoek_tekst(locatie["postcode"]))
+            for melding_id in {locatie["melding_id"], locatie["signaal__melding_id"]}:
+                if melding_id in teksten:
+                    teksten[melding_id].update(locatie_teksten)
+
+        return {
+            melding_id: ",".join(sorted(tekst for tekst in melding_teksten if tekst))
+            for melding_id, melding_teksten in teksten.items()
+        }
+
+    def zoek_tekst_vernieuwen(self, batch_grootte=1000, vanaf_id=0, voortgang=None):
+        """
+        Vernieuwt zoek_tekst voor alle meldingen in deze queryset, in batches op
+        volgorde van id. Alleen gewijzigde meldingen worden met bulk_update
+        weggeschreven. Na elke batch wordt 'voortgang' aangeroepen met het laatste
+        verwerkte id, zodat een afgebroken run met 'vanaf_id' hervat kan worden.
+        """
+        resultaat = {"aantal": 0, "gewijzigd": 0, "laatste_id": vanaf_id}
+        while True:
+            meldingen = list(
+                self.filter(id__gt=resultaat["laatste_id"])
+                .order_by("id")
+                .only("id", "zoek_tekst")[:batch_grootte]
+            )
+            if not meldingen:
+                break
+            zoek_teksten = self.zoek_teksten([melding.id for melding in meldingen])
+            gewijzigd = []
+            for melding in meldingen:
+                if melding.zoek_tekst != zoek_teksten[melding.id]:
+                    melding.zoek_tekst = zoek_teksten[melding.id]
+                    gewijzigd.append(melding)
+            self.bulk_update(gewijzigd, ["zoek_tekst"])
+
+            resultaat["aantal"] += len(meldingen)
+            resultaat["gewijzigd"] += len(gewijzigd)
+            resultaat["laatste_id"] = meldingen[-1].id
+            if voortgang:
+                voortgang(resultaat)
+        return resultaat
+
+    def omschrijving_melder_toevoegen(self, omschrijving_melder):
+        """
+        Voegt de omschrijving van een extra signaal toe aan Melding.omschrijving_melder,
+        met een enkele update zodat de melding niet gelockt hoeft te worden.
+        """
+        if not omschrijving_melder:
+            return 0
+        return self.update(
+            omschrijving_melder=Trim(
+                Concat(
+                    F("omschrijving_melder"),
+                    Value(" "),
+                    Value(omschrijving_melder),
+                    output_field=models.TextField(),
+                )
             )
         )
+
+    def mvt_tegel(self, z, x, y, extent=4096, buffer=64):
+        """
+        Mapbox vector tile met een 'meldingen' laag. De bounding box filter op
+        referentie_punt gebruikt de GIST index, ST_AsMVTGeom projecteert naar de tegel.
+        """
         meldingen = (
-            meldingen.values("onderwerp_wijk", "onderwerp_naam", "wijk")
-            .order_by("onderwerp_wijk")
-            .annotate(count=Count("onderwerp_wijk"))
-            .values("count", "onderwerp_naam", "wijk")
+            self.filter(
+                referentie_punt__bboverlaps=tegel_envelop(
+                    z, x, y, marge=buffer / extent
+                )
+            )
+            .order_by()
+            .annotate(
+                geom=AsMVTGeom(
+                    Transform("referentie_punt", 3857),
+                    TileEnvelope(Value(z), Value(x), Value(y)),
+                    Value(extent),
+                    Value(buffer),
+                    Value(True),
+                )
+            )
+            .values(
+                "geom",
+                "id",
+                "uuid",
+                "urgentie",
+                "origineel_aangemaakt",
+                status_naam=F("status__naam"),
+            )
+        )
+        sql, params = meldingen.query.get_compiler(meldingen.db).as_sql()
+        with connections[meldingen.db].cursor() as cursor:
+            cursor.execute(
+                f"SELECT ST_AsMVT(tegel.*, 'meldingen', %s, 'geom') FROM ({sql}) AS tegel",
+                [extent, *params],
+            )
+            tegel = cursor.fetchone()[0]
+        return bytes(tegel) if tegel else b""
+
+    def clusters(self, precisie=6):
+        """
+        Aantallen per geohash cel van referentie_punt, met het gemiddelde punt en de
+        aantallen per status. Eén GROUP BY op cel en status, de statussen worden
+        hier per cel samengevoegd.
+        """
+        rijen = (
+            self.filter(referentie_punt__isnull=False)
+            .order_by()
+            .annotate(cel=GeoHash("referentie_punt", precision=precisie))
+            .values(
+                "cel",
+                status_naam=Coalesce(F("status__naam"), Value("onbekend")),
+            )
+            .annotate(
+                aantal=Count("id"),
+                lon=Avg(PuntX("referentie_punt")),
+                lat=Avg(PuntY("referentie_punt")),
+            )
+        )
+        clusters = {}
+        for rij in rijen:
+            cluster = clusters.setdefault(
+                rij["cel"],
+                {
+                    "geohash": rij["cel"],
+                    "aantal": 0,
+                    "lon": 0,
+                    "lat": 0,
+                    "statussen": {},
+                },
+            )
+            cluster["aantal"] += rij["aantal"]
+            cluster["lon"] += rij["lon"] * rij["aantal"]
+            cluster["lat"] += rij["lat"] * rij["aantal"]
+            cluster["statussen"][rij["status_naam"]] = rij["aantal"]
+
+        for cluster in clusters.values():
+            cluster["lon"] /= cluster["aantal"]
+            cluster["lat"] /= cluster["aantal"]
+        return [clusters[cel] for cel in sorted(clusters)]
+
+    def referentie_punt_vernieuwen(self):
+        """
+        Zet Melding.referentie_punt op het (midden)punt van de referentie locatie, of
+        anders van de locatie met het hoogste gewicht die een geometrie heeft, in een
+        enkele update.
+        """
+        from apps.locatie.models import Locatie
+
+        locaties = Locatie.objects.filter(geometrie__isnull=False).annotate(
+            punt=Centroid("geometrie")
+        )
+        referentie_locatie = locaties.filter(pk=OuterRef("referentie_locatie_id"))
+        zwaarste_locatie = locaties.filter(melding=OuterRef("pk")).order_by(
+            "-gewicht", "id"
+        )
+        return self.update(
+            referentie_punt=Coalesce(
+                Subquery(referentie_locatie.values("punt")[:1]),
+                Subquery(zwaarste_locatie.values("punt")[:1]),
+            )
         )
-        return meldingen
+
+    def _sorteer_velden(self):
+        from apps.locatie.models import Locatie
+        from apps.status.models import Status
+
+        locaties = Locatie.objects.filter(melding=OuterRef("pk")).order_by(
+            Case(
+                When(pk=OuterRef("referentie_locatie_id"), then=Value(0)),
+                default=Value(1),
+            ),
+            "-gewicht",
+            "id",
+        )
+        return {
+            "sortering_status_naam": Subquery(
+                Status.objects.filter(pk=OuterRef("status_id")).values("naam")[:1]
+            ),
+            **{
+                f"sortering_{veld}": Subquery(locaties.values(veld)[:1])
+                for veld in (
+                    "straatnaam",
+                    "buurtnaam",
+                    "wijknaam",
+                    "begraafplaats",
+                    "vak",
+                    "grafnummer",
+                )
+            },
+        }
+
+    def sorteer_velden_vernieuwen(self):
+        """
+        Zet de sortering_* kolommen vanuit de status en de referentie locatie, of
+        anders de locatie met het hoogste gewicht, in een enkele update.
+        """
+        return self.update(**self._sorteer_velden())
+
+    def versie_ophogen(self):
+        return self.update(versie=F("versie") + 1)
+
+    def wijziging_vastleggen(self):
+        """
+        Hoogt de versie op en zet de sortering_* kolommen in een enkele update. De
+        MeldingManager acties roepen dit aan binnen hun transactie, na het opslaan van
+        de melding.
+        """
+        return self.update(versie=F("versie") + 1, **self._sorteer_velden())
+
+    def export_rijen(self, chunk_size=2000):
+        """
+        Platte rijen voor een export. Via een server side cursor worden steeds
+        'chunk_size' rijen opgehaald, er worden geen model instanties gemaakt.
+        """
+        from apps.aliassen.catalogus import onderwerp_catalogus
+        from apps.meldingen.models import Melding
+
+        onderwerpen = Melding.onderwerpen.through.objects.filter(
+            melding_id=OuterRef("pk")
+        ).order_by("id")
+        rijen = (
+            self.prefetch_related(None)
+            .annotate(
+                onderwerp_alias_ids=ArraySubquery(
+                    onderwerpen.values("onderwerpalias_id")
+                )
+            )
+            .order_by("id")
+            .values("onderwerp_alias_ids", *EXPORT_VELDEN, **EXPORT_RELATIE_VELDEN)
+        )
+        for rij in rijen.iterator(chunk_size=chunk_size):
+            onderwerp_alias_ids = rij.pop("onderwerp_alias_ids") or []
+            rij["onderwerpen"] = [
+                onderwerp_catalogus.naam(onderwerp_alias_id)
+                for onderwerp_alias_id in onderwerp_alias_ids
+            ]
+            yield rij
+
+
+class MeldingStatusBuurtAantalQuerySet(QuerySet):
+    def bijwerken(self, voor, na):
+        """
+        Past de tellers aan met -1 voor de sleutels in 'voor' en +1 voor de sleutels
+        in 'na', beide een dict van melding id naar sleutel. De upserts gebeuren in
+        een vaste volgorde, zodat gelijktijdige transacties elkaar niet blokkeren.
+        """
+        verschil = Counter(na.values())
+        verschil.subtract(Counter(voor.values()))
+        verschil = {sleutel: aantal for sleutel, aantal in verschil.items() if aantal}
+        if not verschil:
+            return 0
+
+        tabel = self.model._meta.db_table
+        sql = f'INSERT INTO "{tabel}" ("status_naam", "wijknaam", "buurtnaam", "spoed", "aantal") \
+            VALUES (%s, %s, %s, %s, %s) \
+            ON CONFLICT ("status_naam", "wijknaam", "buurtnaam", "spoed") \
+            DO UPDATE SET "aantal" = "{tabel}"."aantal" + EXCLUDED."aantal"; \
+        '
+        with connections[self.db].cursor() as cursor:
+            cursor.executemany(
+                sql,
+                [(*sleutel, aantal) for sleutel, aantal in sorted(verschil.items())],
+            )
+        return len(verschil)
+
+    def herbouwen(self):
+        """
+        Vergelijkt de tellers met een volledige telling van de meldingen en herstelt
+        de verschillen. De tabel wordt zolang gelockt, zodat er tijdens het herbouwen
+        geen bijwerkingen verloren gaan. Geeft het aantal gecorrigeerde tellers terug.
+        """
+        from apps.meldingen.models import Melding
+
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(
+                    f'LOCK TABLE "{self.model._meta.db_table}" IN SHARE ROW EXCLUSIVE MODE'
+                )
+            telling = Melding.objects.using(self.db).status_buurt_telling()
+            huidig = {
+                (
+                    teller.status_naam,
+                    teller.wijknaam,
+                    teller.buurtnaam,
+                    teller.spoed,
+                ): teller
+                for teller in self.all()
+            }
+            aanpassen = []
+            verwijderen = []
+            for sleutel, teller in huidig.items():
+                aantal = telling.get(sleutel, 0)
+                if not aantal:
+                    verwijderen.append(teller.pk)
+                elif teller.aantal != aantal:
+                    teller.aantal = aantal
+                    aanpassen.append(teller)
+            toevoegen = [
+                self.model(
+                    status_naam=sleutel[0],
+                    wijknaam=sleutel[1],
+                    buurtnaam=sleutel[2],
+                    spoed=sleutel[3],
+                    aantal=aantal,
+                )
+                for sleutel, aantal in telling.items()
+                if sleutel not in huidig
+            ]
+            self.filter(pk__in=verwijderen).delete()
+            self.bulk_update(aanpassen, ["aantal"])
+            self.bulk_create(toevoegen)
+        return len(verwijderen) + len(aanpassen) + len(toevoegen)
+
+    def aantallen(self, spoed=None):
+        """
+        Aantallen per status, wijk en buurt, optioneel alleen voor spoed of niet
+        spoed meldingen.
+        """
+        tellers = self.filter(aantal__gt=0)
+        if spoed is not None:
+            tellers = tellers.filter(spoed=spoed)
+        return (
+            tellers.values("wijknaam", "buurtnaam", naam=F("status_naam"))
+            .annotate(count=Sum("aantal"))
+            .order_by("naam", "wijknaam", "buurtnaam")
+        )
+
+
+class MeldingBuurtAantalQuerySet(QuerySet):
+    def _herberekenen(self, uren, bijgewerkt_op):
+        """
+        Telt de uur periodes in 'uren' opnieuw vanuit de meldingen en daarna de dagen
+        waar deze uren in vallen vanuit de uur periodes.
+        """
+        from apps.meldingen.models import Melding
+
+        if not uren:
+            return 0
+        uur_periodes = aaneengesloten_periodes(sorted(uren), timedelta(hours=1))
+        dag_periodes = aaneengesloten_periodes(
+            sorted({dag_start(uur) for uur in uren}), timedelta(days=1)
+        )
+        meldingen = Melding.objects.using(self.db).filter(BUURT_FILTER).order_by()
+        buurt_velden = ("referentie_locatie__wijknaam", "referentie_locatie__buurtnaam")
+
+        tellingen = defaultdict(Counter)
+        for rij in (
+            meldingen.filter(periodes_filter("aangemaakt_op", uur_periodes))
+            .annotate(uur=TruncHour("aangemaakt_op"))
+            .values("uur", *buurt_velden)
+            .annotate(aangemaakt=Count("id"))
+        ):
+            telling = tellingen[(rij["uur"], *[rij[veld] for veld in buurt_velden])]
+            telling["aangemaakt"] += rij["aangemaakt"]
+        for rij in (
+            meldingen.filter(periodes_filter("afgesloten_op", uur_periodes))
+            .annotate(uur=TruncHour("afgesloten_op"))
+            .values("uur", *buurt_velden)
+            .annotate(afgehandeld=Count("id"))
+        ):
+            telling = tellingen[(rij["uur"], *[rij[veld] for veld in buurt_velden])]
+            telling["afgehandeld"] += rij["afgehandeld"]
+
+        uur_aantallen = self.filter(interval=self.model.IntervalOpties.UUR)
+        dag_aantallen = self.filter(interval=self.model.IntervalOpties.DAG)
+        with transaction.atomic(using=self.db):
+            uur_aantallen.filter(
+                periodes_filter("periode_start", uur_periodes)
+            ).delete()
+            self.bulk_create(
+                [
+                    self.model(
+                        interval=self.model.IntervalOpties.UUR,
+                        periode_start=uur,
+                        wijknaam=wijknaam,
+                        buurtnaam=buurtnaam,
+                        bijgewerkt_op=bijgewerkt_op,
+                        **telling,
+                    )
+                    for (uur, wijknaam, buurtnaam), telling in tellingen.items()
+                ]
+            )
+            dagen = list(
+                uur_aantallen.filter(periodes_filter("periode_start", dag_periodes))
+                .annotate(dag=TruncDay("periode_start"))
+                .order_by()
+                .values("dag", "wijknaam", "buurtnaam")
+                .annotate(
+                    som_aangemaakt=Sum("aangemaakt"),
+                    som_afgehandeld=Sum("afgehandeld"),
+                )
+            )
+            dag_aantallen.filter(
+                periodes_filter("periode_start", dag_periodes)
+            ).delete()
+            self.bulk_create(
+                [
+                    self.model(
+                        interval=self.model.IntervalOpties.DAG,
+                        periode_start=rij["dag"],
+                        wijknaam=rij["wijknaam"],
+                        buurtnaam=rij["buurtnaam"],
+                        aangemaakt=rij["som_aangemaakt"],
+                        afgehandeld=rij["som_afgehandeld"],
+                        bijgewerkt_op=bijgewerkt_op,
+                    )
+                    for rij in dagen
+                ]
+            )
+        return len(uren)
+
+    def bijwerken(self):
+        """
+        Telt alleen de uren opnieuw waarin meldingen zijn aangemaakt of afgesloten
+        die sinds de vorige keer zijn aangepast. De vorige keer wordt een marge
+        teruggezet, zodat meldingen uit transacties die later zijn afgerond alsnog
+        worden meegenomen. Voor heropende meldingen wordt ook het uur van hun
+        afsluitende statussen opnieuw geteld.
+        """
+        from apps.meldingen.models import Melding
+        from apps.status.models import Status
+
+        bijgewerkt_op = timezone.now()
+        bijgewerkt_tot = self.aggregate(Max("bijgewerkt_op"))["bijgewerkt_op__max"]
+        if not bijgewerkt_tot:
+            return self.herbouwen()
+        vanaf = bijgewerkt_tot - timedelta(
+            minutes=settings.MELDING_BUURT_AANTALLEN_MARGE_MINUTEN
+        )
+
+        uren = set()
+        for aangemaakt_uur, afgesloten_uur in (
+            Melding.objects.using(self.db)
+            .filter(aangepast_op__gt=vanaf)
+            .annotate(
+                aangemaakt_uur=TruncHour("aangemaakt_op"),
+                afgesloten_uur=TruncHour("afgesloten_op"),
+            )
+            .order_by()
+            .values_list("aangemaakt_uur", "afgesloten_uur")
+            .distinct()
+        ):
+            uren.add(uur_start(aangemaakt_uur))
+            if afgesloten_uur:
+                uren.add(uur_start(afgesloten_uur))
+        uren.update(
+            uur_start(uur)
+            for uur in Status.objects.using(self.db)
+            .filter(
+                melding__aangepast_op__gt=vanaf,
+                naam__in=[
+                    Status.NaamOpties.AFGEHANDELD,
+                    Status.NaamOpties.GEANNULEERD,
+                ],
+            )
+            .annotate(uur=TruncHour("aangemaakt_op"))
+            .order_by()
+            .values_list("uur", flat=True)
+            .distinct()
+        )
+        return self._herberekenen(uren, bijgewerkt_op)
+
+    def herbouwen(self):
+        """
+        Telt alle uren en dagen opnieuw, vanaf de oudste melding.
+        """
+        from apps.meldingen.models import Melding
+
+        bijgewerkt_op = timezone.now()
+        eerste = Melding.objects.using(self.db).aggregate(Min("aangemaakt_op"))[
+            "aangemaakt_op__min"
+        ]
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            if not eerste:
+                return 0
+            uren = set()
+            uur = uur_start(eerste)
+            while uur <= bijgewerkt_op:
+                uren.add(uur)
+                uur += timedelta(hours=1)
+            return self._herberekenen(uren, bijgewerkt_op)
+
+    def periode_aantallen(self, veld, vanaf, tot):
+        """
+        Aantal meldingen per wijk en buurt met 'veld' (aangemaakt, openstaand of
+        afgehandeld) in de periode na 'vanaf' tot en met 'tot'. Hele dagen en uren
+        worden uit de opgetelde periodes gehaald, alleen de randen en de uren na de
+        laatste bijwerking worden uit de meldingen geteld.
+        Openstaande meldingen worden altijd uit de meldingen geteld, omdat een melding
+        ook na de laatste bijwerking kan worden afgesloten.
+        """
+        from apps.meldingen.models import Melding
+
+        nu = timezone.now()
+        if not isinstance(vanaf, datetime):
+            vanaf = nu - timedelta(hours=24)
+        if not isinstance(tot, datetime):
+            tot = nu
+        if timezone.is_naive(vanaf):
+            vanaf = timezone.make_aware(vanaf)
+        if timezone.is_naive(tot):
+            tot = timezone.make_aware(tot)
+        tijd_veld = "afgesloten_op" if veld == "afgehandeld" else "aangemaakt_op"
+
+        aantallen = Counter()
+        bijgewerkt_tot = self.aggregate(Max("bijgewerkt_op"))["bijgewerkt_op__max"]
+        uren_start = uur_start(vanaf) + timedelta(hours=1)
+        uren_eind = (
+            min(uur_start(tot), uur_start(bijgewerkt_tot))
+            if bijgewerkt_tot
+            else uren_start
+        )
+        if veld != "openstaand" and uren_start < uren_eind:
+            dagen_start = dag_start(uren_start)
+            if dagen_start < uren_start:
+                dagen_start = dag_start(dagen_start + timedelta(days=1))
+            dagen_eind = dag_start(uren_eind)
+            periodes = [(self.model.IntervalOpties.UUR, uren_start, uren_eind)]
+            if dagen_start < dagen_eind:
+                periodes = [
+                    (self.model.IntervalOpties.UUR, uren_start, dagen_start),
+                    (self.model.IntervalOpties.DAG, dagen_start, dagen_eind),
+                    (self.model.IntervalOpties.UUR, dagen_eind, uren_eind),
+                ]
+            for rij in (
+                self.filter(
+                    reduce(
+                        or_,
+                        (
+                            Q(
+                                interval=interval,
+                                periode_start__gte=start,
+                                periode_start__lt=eind,
+                            )
+                            for interval, start, eind in periodes
+                        ),
+                    )
+                )
+                .order_by()
+                .values("wijknaam", "buurtnaam")
+                .annotate(aantal=Sum(veld))
+            ):
+                aantallen[(rij["wijknaam"], rij["buurtnaam"])] += rij["aantal"]
+            randen = Q(
+                **{f"{tijd_veld}__gt": vanaf, f"{tijd_veld}__lt": uren_start}
+            ) | Q(**{f"{tijd_veld}__gte": uren_eind, f"{tijd_veld}__lte": tot})
+        else:
+            randen = Q(**{f"{tijd_veld}__gt": vanaf, f"{tijd_veld}__lte": tot})
+
+        meldingen = Melding.objects.using(self.db).filter(BUURT_FILTER, randen)
+        if veld == "openstaand":
+            meldingen = meldingen.filter(afgesloten_op__isnull=True)
+        for rij in (
+            meldingen.order_by()
+            .values(
+                wijknaam=F("referentie_locatie__wijknaam"),
+                buurtnaam=F("referentie_locatie__buurtnaam"),
+            )
+            .annotate(aantal=Count("id"))
+        ):
+            aantallen[(rij["wijknaam"], rij["buurtnaam"])] += rij["aantal"]
+
+        return [
+            {"wijknaam": wijknaam, "buurtnaam": buurtnaam, "count": aantal}
+            for (wijknaam, buurtnaam), aantal in sorted(aantallen.items())
+            if aantal
+        ]
@@ -26,6 +26,7 @@ from drf_spectacular.utils import extend_schema_field
 from drf_writable_nested.serializers import WritableNestedModelSerializer
 from rest_framework import serializers
 from rest_framework.reverse import reverse
+from utils.serializers import VeldenSerializerMixin
 
 
 class LinkSerializer(serializers.Serializer):
@@ -349,7 +350,7 @@ class BijlageRecentSerializer(BijlageSerializer):
         return representation
 
 
-class MeldingSerializer(serializers.ModelSerializer):
+class MeldingSerializer(VeldenSerializerMixin, serializers.ModelSerializer):
     _links = MeldingLinksSerializer(source="*", read_only=True)
     status = StatusSerializer(read_only=True)
     onderwerpen = OnderwerpBronUrlField(many=True, read_only=True)
@@ -394,6 +395,25 @@ class MeldingSerializer(serializers.ModelSerializer):
             "meta_uitgebreid",
             "resolutie",
         )
+        relatie_paden = {
+            "status": (("status",), ()),
+            "onderwerpen": ((), ("onderwerpen",)),
+            "thumbnail_afbeelding": ((), ("thumbnail_afbeelding",)),
+            "referentie_locatie": ((), ("referentie_locatie",)),
+            "signalen_voor_melding": ((), ("signalen_voor_melding",)),
+            "taakopdrachten_voor_melding": (
+                (),
+                ("taakopdrachten_voor_melding__status",),
+            ),
+        }
+
+
+class MeldingDubbeleKandidaatSerializer(MeldingSerializer):
+    afstand = serializers.FloatField(source="afstand.m", read_only=True)
+
+    class Meta(MeldingSerializer.Meta):
+        fields = MeldingSerializer.Meta.fields + ("afstand",)
+        expand_velden = ("signalen_voor_melding", "taakopdrachten_voor_melding")
 
 
 class MeldingDetailSerializer(MeldingSerializer):
@@ -462,10 +482,45 @@ class MeldingDetailSerializer(MeldingSerializer):
             "taakopdrachten_voor_melding",
             "signalen_voor_melding",
         )
+        relatie_paden = {
+            "status": (("status",), ()),
+            "bijlagen": ((), ("bijlagen",)),
+            "locaties_voor_melding": ((), ("locaties_voor_melding",)),
+            "meldinggebeurtenissen": (
+                (),
+                (
+                    "meldinggebeurtenissen_voor_melding__bijlagen",
+                    "meldinggebeurtenissen_voor_melding__status",
+                    "meldinggebeurtenissen_voor_melding__locatie",
+                    "meldinggebeurtenissen_voor_melding__taakgebeurtenis__taakopdracht",
+                    "meldinggebeurtenissen_voor_melding__taakgebeurtenis__bijlagen",
+                    "meldinggebeurtenissen_voor_melding__taakgebeurtenis__taakstatus",
+                ),
+            ),
+            "taakopdrachten_voor_melding": (
+                (),
+                (
+                    "taakopdrachten_voor_melding__applicatie",
+                    "taakopdrachten_voor_melding__status",
+                    "taakopdrachten_voor_melding__taakgebeurtenissen_voor_taakopdracht__bijlagen",
+                    "taakopdrachten_voor_melding__taakgebeurtenissen_voor_taakopdracht__taakstatus",
+                ),
+            ),
+            "signalen_voor_melding": (
+                (),
+                (
+                    "signalen_voor_melding__bijlagen",
+                    "signalen_voor_melding__locaties_voor_signaal",
+                ),
+            ),
+        }
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
 
+        if "locaties_voor_melding" not in representation:
+            return representation
+
         # Sorteer locaties_voor_melding op 'gewicht' veld
         locaties_sorted = sorted(
             representation["locaties_voor_melding"],
@@ -479,6 +534,27 @@ class MeldingDetailSerializer(MeldingSerializer):
         return representation
 
 
+class MeldingVeranderingSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    melding = serializers.UUIDField(source="melding.uuid")
+    type = serializers.CharField(source="gebeurtenis_type")
+    tijdstip = serializers.DateTimeField(source="aangemaakt_op")
+
+
+class MeldingVeranderingPaginatedSerializer(serializers.Serializer):
+    next = serializers.URLField(allow_null=True)
+    previous = serializers.URLField(allow_null=True)
+    results = MeldingVeranderingSerializer(many=True)
+
+
+class MeldingClusterSerializer(serializers.Serializer):
+    geohash = serializers.CharField()
+    aantal = serializers.IntegerField()
+    lon = serializers.FloatField()
+    lat = serializers.FloatField()
+    statussen = serializers.DictField(child=serializers.IntegerField())
+
+
 class MeldingAantallenSerializer(serializers.Serializer):
     count = serializers.IntegerField()
     wijk = serializers.CharField()
@@ -1,6 +1,8 @@
 import logging
 
 from apps.bijlagen.tasks import task_aanmaken_afbeelding_versies, task_verwijder_bestand
+from apps.locatie.models import Adres, Graf, Lichtmast, Locatie
+from apps.meldingen.detail_cache import melding_detail_cache
 from apps.meldingen.managers import (
     afgesloten,
     gebeurtenis_toegevoegd,
@@ -8,10 +10,12 @@ from apps.meldingen.managers import (
     status_aangepast,
     taakopdracht_aangemaakt,
     taakopdracht_notificatie,
+    taakopdracht_status_aangepast,
     taakopdracht_verwijderd,
     urgentie_aangepast,
     verwijderd,
 )
+from apps.meldingen.models import Melding
 from apps.meldingen.producers import (
     MeldingAangemaaktProducer,
     TaakopdrachtAangemaaktProducer,
@@ -19,6 +23,7 @@ from apps.meldingen.producers import (
 )
 from apps.meldingen.tasks import (
     task_bijlages_voor_geselecteerde_meldingen_opruimen,
+    task_melding_detail_cache_legen,
     task_notificatie_voor_signaal_melding_afgesloten,
     task_notificaties_voor_melding_veranderd_v2,
     task_vernieuw_melding_zoek_tekst,
@@ -26,14 +31,53 @@ from apps.meldingen.tasks import (
 from apps.status.models import Status
 from apps.taken.models import Taakgebeurtenis
 from apps.taken.tasks import task_taak_verwijderen
-from celery import chord, states
+from celery import chain, chord, states
 from celery.signals import before_task_publish
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django_celery_results.models import TaskResult
+from utils.pagination import filter_options_ongeldig_maken
 
 logger = logging.getLogger(__name__)
 
 
+@receiver(
+    [
+        signaal_aangemaakt,
+        status_aangepast,
+        urgentie_aangepast,
+        afgesloten,
+        gebeurtenis_toegevoegd,
+        taakopdracht_aangemaakt,
+        taakopdracht_notificatie,
+        taakopdracht_status_aangepast,
+        taakopdracht_verwijderd,
+        verwijderd,
+    ],
+    dispatch_uid="melding_veranderd",
+)
+def melding_veranderd_handler(sender, melding=None, *args, **kwargs):
+    # De versie en de sortering_* kolommen zijn al bijgewerkt in de transactie van de
+    # MeldingManager actie
+    melding_uuid = melding.uuid if melding else kwargs.get("melding_uuid")
+    if melding_uuid:
+        melding_detail_cache.ongeldig_maken(melding_uuid)
+    filter_options_ongeldig_maken(Melding)
+
+
+# Adres, Graf en Lichtmast zijn proxies van Locatie en sturen hun eigen signals
+@receiver([post_save, post_delete], sender=Locatie, dispatch_uid="melding_locatie")
+@receiver([post_save, post_delete], sender=Adres, dispatch_uid="melding_locatie")
+@receiver([post_save, post_delete], sender=Graf, dispatch_uid="melding_locatie")
+@receiver([post_save, post_delete], sender=Lichtmast, dispatch_uid="melding_locatie")
+def locatie_opgeslagen_handler(sender, instance, raw=False, *args, **kwargs):
+    if raw or not instance.melding_id:
+        return
+    meldingen = Melding.objects.filter(pk=instance.melding_id)
+    meldingen.referentie_punt_vernieuwen()
+    meldingen.sorteer_velden_vernieuwen()
+
+
 @receiver(signaal_aangemaakt, dispatch_uid="melding_signaal_aangemaakt")
 def signaal_aangemaakt_handler(sender, melding, signaal, *args, **kwargs):
     if kwargs.get("raw"):
@@ -48,7 +92,14 @@ def signaal_aangemaakt_handler(sender, melding, signaal, *args, **kwargs):
             notificatie_type="signaal_aangemaakt",
         )
     )
-    chord(bijlages_aanmaken, notificaties_voor_melding_veranderd)()
+    # De cache wordt na het aanmaken van de afbeelding versies nogmaals geleegd
+    chord(
+        bijlages_aanmaken,
+        chain(
+            task_melding_detail_cache_legen.si(str(melding.uuid)),
+            notificaties_voor_melding_veranderd,
+        ),
+    )()
     task_vernieuw_melding_zoek_tekst.delay(melding.id)
 
     if melding.meldinggebeurtenissen_voor_melding.count() == 1:
@@ -127,7 +178,14 @@ def gebeurtenis_toegevoegd_handler(
             notificatie_type="gebeurtenis_toegevoegd",
         )
     )
-    chord(bijlages_aanmaken, notificaties_voor_melding_veranderd)()
+    # De cache wordt na het aanmaken van de afbeelding versies nogmaals geleegd
+    chord(
+        bijlages_aanmaken,
+        chain(
+            task_melding_detail_cache_legen.si(str(melding.uuid)),
+            notificaties_voor_melding_veranderd,
+        ),
+    )()
 
     if meldinggebeurtenis.locatie:
         task_vernieuw_melding_zoek_tekst.delay(melding.id)
@@ -188,7 +246,14 @@ def taakopdracht_status_aangepast_handler(
             notificatie_type="taakopdracht_notificatie",
         )
     )
-    chord(bijlages_aanmaken, notificaties_voor_melding_veranderd)()
+    # De cache wordt na het aanmaken van de afbeelding versies nogmaals geleegd
+    chord(
+        bijlages_aanmaken,
+        chain(
+            task_melding_detail_cache_legen.si(str(melding.uuid)),
+            notificaties_voor_melding_veranderd,
+        ),
+    )()
 
     taakopdracht_veranderd_producer = TaakopdrachtVeranderdProducer()
     taakopdracht_veranderd_producer.publish(melding, taakgebeurtenis)
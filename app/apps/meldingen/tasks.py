@@ -26,6 +26,16 @@ class BaseTaskWithRetry(celery.Task):
     retry_jitter = True
 
 
+@shared_task(bind=True)
+def task_melding_detail_cache_legen(self, melding_uuid):
+    from apps.meldingen.detail_cache import melding_detail_cache
+    from apps.meldingen.models import Melding
+
+    Melding.objects.filter(uuid=melding_uuid).versie_ophogen()
+    melding_detail_cache.ongeldig_maken(melding_uuid)
+    return f"Melding detail cache geleegd voor melding_uuid={melding_uuid}"
+
+
 @shared_task(bind=True, base=BaseTaskWithRetry)
 def task_notificatie_voor_signaal_melding_afgesloten(self, signaal_uuid):
     from apps.signalen.models import Signaal
@@ -237,10 +247,9 @@ def task_vernieuw_melding_zoek_tekst_voor_melding_reeks(
         melding_ids = list(
             Melding.objects.all().order_by(order_by).values_list("id", flat=True)
         )[start_index:eind_index]
-    for melding_id in melding_ids:
-        task_vernieuw_melding_zoek_tekst.delay(melding_id)
+    resultaat = Melding.objects.filter(id__in=melding_ids).zoek_tekst_vernieuwen()
 
-    return f"Melding zoek tekst vernieuwen voor, start_index={start_index}, eind_index={eind_index}, melding_ids={len(melding_ids)}"
+    return f"Melding zoek tekst vernieuwen voor, start_index={start_index}, eind_index={eind_index}, melding_ids={len(melding_ids)}, gewijzigd={resultaat['gewijzigd']}"
 
 
 @shared_task(bind=True)
@@ -259,6 +268,59 @@ def task_vernieuw_melding_zoek_tekst(self, melding_id):
     return f"Melding zoek tekst vernieuwd voor melding_id={melding_id}"
 
 
+@shared_task(bind=True)
+def task_vernieuw_melding_afgeleide_velden_voor_melding_reeks(
+    self,
+    start_index=None,
+    eind_index=None,
+    order_by="id",
+    melding_ids=[],
+    batch_grootte=1000,
+):
+    from apps.meldingen.models import Melding
+
+    if not melding_ids:
+        melding_ids = list(
+            Melding.objects.all().order_by(order_by).values_list("id", flat=True)
+        )[start_index:eind_index]
+    aantal = 0
+    for start in range(0, len(melding_ids), batch_grootte):
+        meldingen = Melding.objects.filter(
+            id__in=melding_ids[start : start + batch_grootte]
+        )
+        meldingen.sorteer_velden_vernieuwen()
+        aantal += meldingen.referentie_punt_vernieuwen()
+
+    return f"Melding referentie punt en sorteer velden vernieuwen voor, start_index={start_index}, eind_index={eind_index}, melding_ids={len(melding_ids)}, aantal={aantal}"
+
+
+@shared_task(bind=True)
+def task_melding_status_buurt_aantallen_herbouwen(self):
+    from apps.meldingen.models import MeldingStatusBuurtAantal
+
+    gecorrigeerd = MeldingStatusBuurtAantal.objects.herbouwen()
+
+    return f"Melding status buurt aantallen herberekend, gecorrigeerd={gecorrigeerd}"
+
+
+@shared_task(bind=True)
+def task_melding_buurt_aantallen_bijwerken(self):
+    from apps.meldingen.models import MeldingBuurtAantal
+
+    uren = MeldingBuurtAantal.objects.bijwerken()
+
+    return f"Melding buurt aantallen bijgewerkt, uren={uren}"
+
+
+@shared_task(bind=True)
+def task_melding_buurt_aantallen_herbouwen(self):
+    from apps.meldingen.models import MeldingBuurtAantal
+
+    uren = MeldingBuurtAantal.objects.herbouwen()
+
+    return f"Melding buurt aantallen herbouwd, uren={uren}"
+
+
 @shared_task(bind=True)
 def task_set_melding_referentie_locatie_melding_voor_reeks(
     self, start_index=None, eind_index=None, order_by="id", melding_ids=[]
@@ -291,8 +353,10 @@ def task_set_melding_referentie_locatie_voor_melding(self, melding_id):
     )
 
     if meldingen and locaties:
-        meldingen[0].referentie_locatie = locaties[0]
-        meldingen[0].save(update_fields=["referentie_locatie"])
+        melding = meldingen[0]
+        melding.referentie_locatie = locaties[0]
+        melding.referentie_punt = locaties[0].get_referentie_punt()
+        melding.save(update_fields=["referentie_locatie", "referentie_punt"])
 
     return f"Referentie locatie set voor melding: {melding_id}"
 
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime, timedelta
 
 import requests_mock
@@ -6,14 +7,29 @@ from apps.applicaties.models import Applicatie
 from apps.bijlagen.models import Bijlage
 from apps.instellingen.models import Instelling
 from apps.locatie.models import Adres, Lichtmast
-from apps.meldingen.models import Melding
+from apps.meldingen.managers import urgentie_aangepast
+from apps.meldingen.models import (
+    Melding,
+    MeldingBuurtAantal,
+    Meldinggebeurtenis,
+    MeldingStatusBuurtAantal,
+)
+from apps.signalen.models import Signaal, SignaalAanvraag
+from apps.signalen.tasks import task_signaal_aanvraag_verwerken
 from apps.status.models import Status
 from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.timezone import get_current_timezone, make_aware
 from model_bakery import baker
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from utils.pagination import LimitOffsetPagination
 from utils.unittest_helpers import get_authenticated_client, get_unauthenticated_client
 
 B64_FILE = "e1xydGYxXGFuc2lcYW5zaWNwZzEyNTJcY29jb2FydGYyNTgwClxjb2NvYXRleHRzY2FsaW5nMFxjb2NvYXBsYXRmb3JtMHtcZm9udHRibFxmMFxmc3dpc3NcZmNoYXJzZXQwIEhlbHZldGljYTt9CntcY29sb3J0Ymw7XHJlZDI1NVxncmVlbjI1NVxibHVlMjU1O30Ke1wqXGV4cGFuZGVkY29sb3J0Ymw7O30KXHBhcGVydzExOTAwXHBhcGVyaDE2ODQwXG1hcmdsMTQ0MFxtYXJncjE0NDBcdmlld3cxMTUyMFx2aWV3aDg0MDBcdmlld2tpbmQwClxwYXJkXHR4NTY2XHR4MTEzM1x0eDE3MDBcdHgyMjY3XHR4MjgzNFx0eDM0MDFcdHgzOTY4XHR4NDUzNVx0eDUxMDJcdHg1NjY5XHR4NjIzNlx0eDY4MDNccGFyZGlybmF0dXJhbFxwYXJ0aWdodGVuZmFjdG9yMAoKXGYwXGZzMjQgXGNmMCBUZXN0IGZpbGV9Cg=="
@@ -142,6 +158,130 @@ class SignaalApiTest(APITestCase):
         )
         self.assertEqual(authenticated_response.status_code, status.HTTP_200_OK)
 
+    @requests_mock.Mocker()
+    def test_create_signalen_batch(self, m):
+        m.get(MOCK_URL, json={}, status_code=200)
+        client = get_authenticated_client()
+        url = reverse("app:signaal-batch")
+        tweede_signaal_data = dict(
+            self.signaal_data, bron_signaal_id="mock_bron_signaal_id_2"
+        )
+        data = [self.signaal_data, tweede_signaal_data, self.signaal_data, {}]
+
+        response = client.post(url, data=data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [resultaat["resultaat"] for resultaat in response.json()],
+            ["aangemaakt", "aangemaakt", "dubbel", "fout"],
+        )
+        self.assertEqual(Melding.objects.count(), 2)
+        melding = Melding.objects.first()
+        self.assertIsNotNone(melding.status)
+        self.assertIsNotNone(melding.referentie_locatie)
+        self.assertEqual(melding.onderwerpen.count(), 1)
+        self.assertEqual(melding.meldinggebeurtenissen_voor_melding.count(), 1)
+
+    @requests_mock.Mocker()
+    def test_create_signalen_batch_opnieuw_versturen(self, m):
+        m.get(MOCK_URL, json={}, status_code=200)
+        client = get_authenticated_client()
+        client.post(reverse("app:signaal-list"), data=self.signaal_data, format="json")
+        signaal = Signaal.objects.get()
+
+        response = client.post(
+            reverse("app:signaal-batch"), data=[self.signaal_data], format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]["resultaat"], "dubbel")
+        self.assertIsNone(response.json()[0]["fouten"])
+        self.assertIn(str(signaal.uuid), response.json()[0]["signaal"])
+        self.assertEqual(Signaal.objects.count(), 1)
+        self.assertEqual(Melding.objects.count(), 1)
+
+    @override_settings(SIGNAAL_AUTOMATISCH_KOPPELEN_AFSTAND=50)
+    @requests_mock.Mocker()
+    def test_create_signalen_batch_automatisch_koppelen(self, m):
+        m.get(MOCK_URL, json={}, status_code=200)
+        client = get_authenticated_client()
+        client.post(reverse("app:signaal-list"), data=self.signaal_data, format="json")
+        melding = Melding.objects.get()
+
+        response = client.post(
+            reverse("app:signaal-batch"),
+            data=[dict(self.signaal_data, bron_signaal_id="mock_bron_signaal_id_2")],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]["resultaat"], "toegevoegd")
+        self.assertIn(str(melding.uuid), response.json()[0]["melding"])
+        self.assertEqual(Melding.objects.count(), 1)
+        self.assertEqual(melding.signalen_voor_melding.count(), 2)
+
+    @requests_mock.Mocker()
+    def test_create_signaal_asynchroon(self, m):
+        m.get(MOCK_URL, json={}, status_code=200)
+        client = get_authenticated_client()
+        url = f"{reverse('app:signaal-list')}?asynchroon=true"
+
+        response = client.post(url, data=self.signaal_data, format="json")
+        dubbele_response = client.post(url, data=self.signaal_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json()["uuid"], dubbele_response.json()["uuid"])
+        self.assertEqual(SignaalAanvraag.objects.count(), 1)
+        self.assertEqual(Melding.objects.count(), 0)
+
+        signaal_aanvraag = SignaalAanvraag.objects.first()
+        task_signaal_aanvraag_verwerken(signaal_aanvraag.id)
+        task_signaal_aanvraag_verwerken(signaal_aanvraag.id)
+        signaal_aanvraag.refresh_from_db()
+
+        self.assertEqual(signaal_aanvraag.status, SignaalAanvraag.StatusOpties.VERWERKT)
+        self.assertEqual(Melding.objects.count(), 1)
+        status_response = client.get(response["Location"])
+        self.assertEqual(status_response.json()["status"], "verwerkt")
+
+    @requests_mock.Mocker()
+    def test_create_signaal_asynchroon_na_verwerking(self, m):
+        m.get(MOCK_URL, json={}, status_code=200)
+        client = get_authenticated_client()
+        url = f"{reverse('app:signaal-list')}?asynchroon=true"
+        response = client.post(url, data=self.signaal_data, format="json")
+        task_signaal_aanvraag_verwerken(SignaalAanvraag.objects.get().id)
+
+        herhaalde_responses = [
+            client.post(url, data=self.signaal_data, format="json") for _ in range(2)
+        ]
+
+        for herhaalde_response in herhaalde_responses:
+            self.assertEqual(herhaalde_response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(herhaalde_response.json()["uuid"], response.json()["uuid"])
+            self.assertEqual(herhaalde_response.json()["status"], "verwerkt")
+        self.assertEqual(Signaal.objects.count(), 1)
+
+    @requests_mock.Mocker()
+    def test_create_signaal_asynchroon_na_fout(self, m):
+        m.get(MOCK_URL, json={}, status_code=200)
+        client = get_authenticated_client()
+        url = f"{reverse('app:signaal-list')}?asynchroon=true"
+        client.post(url, data=self.signaal_data, format="json")
+        SignaalAanvraag.objects.update(
+            status=SignaalAanvraag.StatusOpties.FOUT, fout={"fout": ["fout"]}
+        )
+
+        response = client.post(url, data=self.signaal_data, format="json")
+        signaal_aanvraag = SignaalAanvraag.objects.get()
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json()["status"], "ontvangen")
+        task_signaal_aanvraag_verwerken(signaal_aanvraag.id)
+        signaal_aanvraag.refresh_from_db()
+        self.assertEqual(signaal_aanvraag.status, SignaalAanvraag.StatusOpties.VERWERKT)
+        self.assertEqual(Melding.objects.count(), 1)
+
 
 class MeldingApiTest(APITestCase):
     def test_get_melding_unauthenticated(self):
@@ -160,6 +300,84 @@ class MeldingApiTest(APITestCase):
         response = client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_get_melding_detail_cache(self):
+        client = get_authenticated_client()
+        melding = baker.make(Melding, urgentie=0.2)
+        url = reverse("app:melding-detail", kwargs={"uuid": melding.uuid})
+
+        client.get(url)
+        Melding.objects.filter(pk=melding.pk).update(urgentie=0.5)
+        with CaptureQueriesContext(connection) as queries:
+            gecachte_response = client.get(url)
+        urgentie_aangepast.send_robust(
+            sender=self.__class__, melding=melding, vorige_urgentie=0.2
+        )
+        response = client.get(url)
+
+        self.assertEqual(gecachte_response.json()["urgentie"], 0.2)
+        self.assertFalse(
+            [q for q in queries if "meldingen_melding" in q["sql"]],
+        )
+        self.assertEqual(response.json()["urgentie"], 0.5)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_get_melding_detail_cache_versie_verdwenen(self):
+        client = get_authenticated_client()
+        melding = baker.make(Melding, urgentie=0.2)
+        url = reverse("app:melding-detail", kwargs={"uuid": melding.uuid})
+
+        client.get(url)
+        Melding.objects.filter(pk=melding.pk).update(urgentie=0.5)
+        urgentie_aangepast.send_robust(
+            sender=self.__class__, melding=melding, vorige_urgentie=0.2
+        )
+        # De versie verdwijnt uit de cache, b.v. door eviction, het document niet
+        cache.delete(f"melding_detail_versie:{melding.uuid}")
+        response = client.get(url)
+
+        self.assertEqual(response.json()["urgentie"], 0.5)
+
+    def test_get_melding_detail_etag(self):
+        client = get_authenticated_client()
+        melding = baker.make(Melding)
+        url = reverse("app:melding-detail", kwargs={"uuid": melding.uuid})
+
+        response = client.get(url)
+        etag = response["ETag"]
+        niet_gewijzigd_response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        Melding.objects.filter(pk=melding.pk).versie_ophogen()
+        gewijzigd_response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            niet_gewijzigd_response.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+        self.assertEqual(gewijzigd_response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(gewijzigd_response["ETag"], etag)
+
+    def test_get_melding_lijst_etag(self):
+        client = get_authenticated_client()
+        melding = baker.make(Melding)
+        url = reverse("app:melding-list")
+
+        response = client.get(url)
+        etag = response["ETag"]
+        niet_gewijzigd_response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        Melding.objects.filter(pk=melding.pk).versie_ophogen()
+        gewijzigd_response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            niet_gewijzigd_response.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+        self.assertEqual(gewijzigd_response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(gewijzigd_response["ETag"], etag)
+
     def test_melding_not_found(self):
         client = get_authenticated_client()
         url = reverse("app:melding-detail", kwargs={"uuid": 99})
@@ -167,6 +385,34 @@ class MeldingApiTest(APITestCase):
         response = client.get(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_nieuwe_meldingen_aantallen(self):
+        client = get_authenticated_client()
+        onderwerp = baker.make(
+            OnderwerpAlias,
+            bron_url=MOCK_URL,
+            response_json={"name": "Grofvuil", "priority": "low"},
+        )
+        meldingen = baker.make(Melding, _quantity=2)
+        for melding in meldingen:
+            melding.onderwerpen.add(onderwerp)
+            melding.referentie_locatie = baker.make(
+                Adres, melding=melding, wijknaam="Centrum"
+            )
+            melding.save()
+        baker.make(Melding)
+
+        url = reverse("app:melding-nieuwe-meldingen")
+        response = client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            [
+                {"count": 2, "wijk": "Centrum", "onderwerp": "Grofvuil"},
+                {"count": 1, "wijk": "Onbekend", "onderwerp": "Onbekend"},
+            ],
+        )
+
     def test_get_melding_list(self):
         client = get_authenticated_client()
         baker.make(Melding, _quantity=3)
@@ -178,6 +424,256 @@ class MeldingApiTest(APITestCase):
 
         self.assertEqual(len(data["results"]), 3)
 
+    def test_get_melding_list_fields(self):
+        client = get_authenticated_client()
+        for melding in baker.make(Melding, _quantity=3):
+            baker.make(Adres, melding=melding)
+        url = reverse("app:melding-list")
+
+        with CaptureQueriesContext(connection) as alle_velden:
+            client.get(url)
+        with CaptureQueriesContext(connection) as enkele_velden:
+            response = client.get(url, {"fields": "id,uuid,urgentie"})
+        self.assertEqual(
+            set(response.json()["results"][0].keys()), {"id", "uuid", "urgentie"}
+        )
+        self.assertLess(len(enkele_velden), len(alle_velden))
+
+        response = client.get(url, {"fields": "id", "expand": "referentie_locatie"})
+        self.assertEqual(
+            set(response.json()["results"][0].keys()), {"id", "referentie_locatie"}
+        )
+
+    def test_get_melding_list_cursor(self):
+        client = get_authenticated_client()
+        origineel_aangemaakt = make_aware(datetime(2024, 1, 1))
+        meldingen = baker.make(
+            Melding, origineel_aangemaakt=origineel_aangemaakt, _quantity=3
+        )
+        nieuwste = baker.make(
+            Melding, origineel_aangemaakt=origineel_aangemaakt + timedelta(days=1)
+        )
+        verwacht = [nieuwste.id] + sorted(
+            [melding.id for melding in meldingen], reverse=True
+        )
+
+        url = reverse("app:melding-list")
+        response = client.get(
+            url, {"cursor": "", "limit": 2, "ordering": "-origineel_aangemaakt"}
+        )
+        eerste_pagina = response.json()
+        response = client.get(eerste_pagina["next"])
+        tweede_pagina = response.json()
+        response = client.get(tweede_pagina["previous"])
+
+        self.assertNotIn("count", eerste_pagina)
+        self.assertIsNone(eerste_pagina["previous"])
+        self.assertIsNone(tweede_pagina["next"])
+        self.assertEqual(
+            [m["id"] for m in eerste_pagina["results"] + tweede_pagina["results"]],
+            verwacht,
+        )
+        self.assertEqual(
+            [m["id"] for m in response.json()["results"]],
+            [m["id"] for m in eerste_pagina["results"]],
+        )
+
+    def test_get_melding_export(self):
+        client = get_authenticated_client()
+        oud = baker.make(Melding, origineel_aangemaakt=make_aware(datetime(2023, 1, 1)))
+        meldingen = baker.make(
+            Melding,
+            origineel_aangemaakt=make_aware(datetime(2024, 1, 1)),
+            _quantity=2,
+        )
+        url = reverse("app:melding-export")
+        parameters = {"origineel_aangemaakt_gte": "2024-01-01T00:00:00"}
+
+        ndjson_response = client.get(url, parameters)
+        ndjson_regels = b"".join(ndjson_response.streaming_content).splitlines()
+        csv_response = client.get(url, {"formaat": "csv", **parameters})
+        csv_regels = (
+            b"".join(csv_response.streaming_content).decode("utf-8-sig").splitlines()
+        )
+
+        self.assertEqual(ndjson_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [json.loads(regel)["id"] for regel in ndjson_regels],
+            [melding.id for melding in meldingen],
+        )
+        self.assertNotIn(oud.id, [json.loads(regel)["id"] for regel in ndjson_regels])
+        self.assertEqual(csv_regels[0].split(",")[:2], ["id", "uuid"])
+        self.assertEqual(len(csv_regels), 3)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_pagination_filter_options(self):
+        for naam in ("openstaand", "openstaand", "afgehandeld"):
+            melding_status = baker.make(Status, naam=naam)
+            melding_status.melding.status = melding_status
+            melding_status.melding.save()
+
+        class View:
+            filter_options_fields = ("status__naam",)
+            filter_options_aantallen = True
+
+            def get_prefiltered_queryset(self):
+                return Melding.objects.all()
+
+        request = Request(APIRequestFactory().get("/melding/"))
+        queryset = Melding.objects.filter(status__naam="openstaand")
+        paginator = LimitOffsetPagination()
+        paginator.paginate_queryset(queryset, request, View())
+        with CaptureQueriesContext(connection) as queries:
+            LimitOffsetPagination().paginate_queryset(queryset, request, View())
+
+        self.assertEqual(
+            paginator.filter_options["status__naam"],
+            {
+                "afgehandeld": ("afgehandeld", "afgehandeld", 0),
+                "openstaand": ("openstaand", "openstaand", 2),
+            },
+        )
+        self.assertFalse(
+            [q for q in queries.captured_queries if "GROUPING SETS" in q["sql"]]
+        )
+
+    def test_get_melding_veranderingen(self):
+        client = get_authenticated_client()
+        melding = baker.make(Melding)
+        gebeurtenissen = baker.make(Meldinggebeurtenis, melding=melding, _quantity=3)
+        Meldinggebeurtenis.objects.update(
+            aangemaakt_op=make_aware(datetime(2024, 1, 1))
+        )
+        url = reverse("app:melding-veranderingen")
+
+        response = client.get(url, {"limit": 2})
+        eerste_pagina = response.json()
+        tweede_pagina = client.get(eerste_pagina["next"]).json()
+        nieuw = baker.make(Meldinggebeurtenis, melding=melding)
+        Meldinggebeurtenis.objects.filter(pk=nieuw.pk).update(
+            aangemaakt_op=make_aware(datetime(2024, 1, 2))
+        )
+        derde_pagina = client.get(tweede_pagina["next"]).json()
+        baker.make(Meldinggebeurtenis, melding=melding)
+        vierde_pagina = client.get(derde_pagina["next"]).json()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [g["id"] for g in eerste_pagina["results"] + tweede_pagina["results"]],
+            [gebeurtenis.id for gebeurtenis in gebeurtenissen],
+        )
+        self.assertEqual(eerste_pagina["results"][0]["melding"], str(melding.uuid))
+        self.assertEqual([g["id"] for g in derde_pagina["results"]], [nieuw.id])
+        self.assertEqual(vierde_pagina["results"], [])
+        self.assertIsNotNone(vierde_pagina["next"])
+
+    def test_get_melding_list_ordering_sorteer_velden(self):
+        client = get_authenticated_client()
+        meldingen = {}
+        for naam in ("pauze", "controle", "openstaand"):
+            melding_status = baker.make(Status, naam=naam)
+            melding_status.melding.status = melding_status
+            melding_status.melding.save()
+            meldingen[naam] = melding_status.melding
+        Melding.objects.all().sorteer_velden_vernieuwen()
+
+        url = reverse("app:melding-list")
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, {"ordering": "-status__naam"})
+
+        self.assertEqual(
+            [melding["id"] for melding in response.json()["results"]],
+            [meldingen[naam].id for naam in ("pauze", "openstaand", "controle")],
+        )
+        self.assertTrue(
+            [
+                q
+                for q in queries.captured_queries
+                if 'ORDER BY "meldingen_melding"."sortering_status_naam" DESC'
+                in q["sql"]
+            ]
+        )
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_get_melding_list_count_strategie(self):
+        client = get_authenticated_client()
+        baker.make(Melding, _quantity=3)
+        url = reverse("app:melding-list")
+
+        response = client.get(url, {"count_strategie": "cache"})
+        baker.make(Melding)
+        gecachte_response = client.get(url, {"count_strategie": "cache"})
+        exacte_response = client.get(url)
+
+        self.assertEqual(response.json()["count_strategie"], "cache")
+        self.assertEqual(gecachte_response.json()["count"], 3)
+        self.assertEqual(exacte_response.json()["count"], 4)
+        self.assertEqual(exacte_response.json()["count_strategie"], "exact")
+        self.assertEqual(
+            client.get(url, {"count_strategie": "onbekend"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_filter_melding_q(self):
+        client = get_authenticated_client()
+        coolsingel = baker.make(Melding, zoek_tekst="Coolsingel 40a,3011AD,jan@mail.nl")
+        baker.make(Melding, zoek_tekst="Blaak 40,3011TA")
+        baker.make(Melding, zoek_tekst="")
+
+        url = reverse("app:melding-list")
+
+        for q in ["coolsingel 40", "3011ad", "Cools, 40A", "jan@mail"]:
+            response = client.get(url, {"q": q})
+            self.assertEqual(
+                [melding["id"] for melding in response.json()["results"]],
+                [coolsingel.id],
+            )
+        response = client.get(url, {"q": "3011"})
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_filter_melding_q_postcode(self):
+        client = get_authenticated_client()
+        melding = baker.make(Melding)
+        baker.make(
+            Adres,
+            melding=melding,
+            straatnaam="Coolsingel",
+            huisnummer=40,
+            postcode="3011 AD",
+        )
+        Melding.objects.filter(pk=melding.pk).zoek_tekst_vernieuwen()
+        url = reverse("app:melding-list")
+
+        for q in ["3011AD", "3011 ad", "3011", "Coolsingel, 40"]:
+            response = client.get(url, {"q": q})
+            self.assertEqual(
+                [m["id"] for m in response.json()["results"]], [melding.id]
+            )
+        # Prefix i.p.v. infix: een deel midden in een woord matcht niet meer
+        for q in ["singel", "Coolsingel, 41"]:
+            response = client.get(url, {"q": q})
+            self.assertEqual(response.json()["results"], [])
+
+    def test_filter_melding_omschrijving(self):
+        client = get_authenticated_client()
+        grofvuil = baker.make(
+            Melding,
+            omschrijving_melder="Er staat al dagen een matras en een bank naast de container",
+        )
+        baker.make(Melding, omschrijving_melder="Lantaarnpaal brandt niet")
+
+        url = reverse("app:melding-list")
+        response = client.get(url, {"omschrijving": "matras"})
+
+        self.assertEqual(
+            [melding["id"] for melding in response.json()["results"]],
+            [grofvuil.id],
+        )
+
     def test_filter_melding_within_distance(self):
         reference_lat = 51.924409
         reference_lon = 4.477736
@@ -218,6 +714,265 @@ class MeldingApiTest(APITestCase):
 
         self.assertEqual(len(data["results"]), 1)
 
+    def test_filter_melding_bbox(self):
+        client = get_authenticated_client()
+        m1 = baker.make(Melding)
+        baker.make(Adres, geometrie=Point(4.477736, 51.924409), melding=m1, gewicht=1)
+        baker.make(Adres, geometrie=Point(4.5, 51.95), melding=m1, gewicht=0.5)
+        m2 = baker.make(Melding)
+        baker.make(Adres, geometrie=Point(4.5, 51.95), melding=m2, gewicht=1)
+
+        url = reverse("app:melding-list")
+        response = client.get(url, {"bbox": "4.47,51.92,4.48,51.93"})
+
+        self.assertEqual(
+            [melding["id"] for melding in response.json()["results"]], [m1.id]
+        )
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_get_melding_tiles(self):
+        client = get_authenticated_client()
+        melding = baker.make(Melding)
+        baker.make(Adres, geometrie=Point(4.477736, 51.924409), melding=melding)
+        # Tegel 14/8395/5417 bevat het centrum van Rotterdam
+        url = reverse(
+            "app:melding-tiles", kwargs={"z": 14, "x": 8395, "y": 5417}
+        ).rstrip("/")
+
+        response = client.get(f"{url}.mvt")
+        lege_response = client.get(f"{url}.mvt", {"urgentie_gt": 0.9})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/vnd.mapbox-vector-tile")
+        self.assertIn(b"meldingen", response.content)
+        self.assertEqual(lege_response.content, b"")
+
+    @override_settings(MELDING_CLUSTERS_CACHE_TIMEOUT=0)
+    def test_get_melding_clusters(self):
+        client = get_authenticated_client()
+        for lon, lat, naam in (
+            (4.477736, 51.924409, "openstaand"),
+            (4.477836, 51.924509, "afgehandeld"),
+            (4.5, 52.1, "openstaand"),
+        ):
+            melding_status = baker.make(Status, naam=naam)
+            melding = melding_status.melding
+            melding.status = melding_status
+            melding.save()
+            baker.make(Adres, geometrie=Point(lon, lat), melding=melding)
+
+        url = reverse("app:melding-clusters")
+        response = client.get(url, {"precisie": 5})
+        clusters = response.json()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([cluster["aantal"] for cluster in clusters], [2, 1])
+        self.assertEqual(clusters[0]["statussen"], {"openstaand": 1, "afgehandeld": 1})
+        self.assertAlmostEqual(clusters[0]["lon"], 4.477786)
+
+    def test_get_melding_status_buurt_aantallen(self):
+        client = get_authenticated_client()
+        meldingen = []
+        for buurtnaam in ("Cool", "Cool", "Oude Westen"):
+            melding_status = baker.make(Status, naam="openstaand")
+            melding = melding_status.melding
+            melding.status = melding_status
+            melding.urgentie = 0.2
+            melding.referentie_locatie = baker.make(
+                Adres, wijknaam="Centrum", buurtnaam=buurtnaam, melding=melding
+            )
+            melding.save()
+            meldingen.append(melding)
+        MeldingStatusBuurtAantal.objects.herbouwen()
+
+        spoed_melding = Melding.objects.filter(pk=meldingen[0].pk)
+        status_buurt_sleutels = spoed_melding.status_buurt_sleutels()
+        spoed_melding.update(urgentie=0.5)
+        spoed_melding.status_buurt_aantallen_bijwerken(status_buurt_sleutels)
+
+        url = reverse("app:melding-melding-status-buurt-aantallen")
+        alle = client.get(url).json()["results"]
+        spoed = client.get(url, {"spoed": "true"}).json()["results"]
+        niet_spoed = client.get(url, {"spoed": "false"}).json()["results"]
+
+        self.assertEqual(
+            [(rij["buurt"], rij["count"]) for rij in alle],
+            [("Cool", 2), ("Oude Westen", 1)],
+        )
+        self.assertEqual([(rij["buurt"], rij["count"]) for rij in spoed], [("Cool", 1)])
+        self.assertEqual(
+            [(rij["buurt"], rij["count"]) for rij in niet_spoed],
+            [("Cool", 1), ("Oude Westen", 1)],
+        )
+        self.assertEqual(MeldingStatusBuurtAantal.objects.herbouwen(), 0)
+
+    def test_get_melding_buurt_aantallen(self):
+        client = get_authenticated_client()
+        nu = timezone.now()
+
+        def melding_in_buurt(buurtnaam, **velden):
+            melding = baker.make(Melding)
+            melding.referentie_locatie = baker.make(
+                Adres, wijknaam="Centrum", buurtnaam=buurtnaam, melding=melding
+            )
+            melding.save()
+            Melding.objects.filter(pk=melding.pk).update(**velden)
+            melding.refresh_from_db()
+            return melding
+
+        openstaand = melding_in_buurt("Cool", aangemaakt_op=nu - timedelta(days=2))
+        melding_in_buurt(
+            "Cool",
+            aangemaakt_op=nu - timedelta(days=2),
+            afgesloten_op=nu - timedelta(days=1),
+        )
+        MeldingBuurtAantal.objects.herbouwen()
+        melding_in_buurt("Oude Westen")
+
+        periode = {"aangemaakt_op_gt": (nu - timedelta(days=3)).isoformat()}
+        aangemaakt_url = reverse("app:melding-melding-aangemaakt-per-buurt-aantallen")
+        afgehandeld_url = reverse("app:melding-melding-afgehandeld-per-buurt-aantallen")
+        aangemaakt = client.get(aangemaakt_url, periode).json()["results"]
+        afgehandeld = client.get(
+            afgehandeld_url,
+            {"afgesloten_op_gt": (nu - timedelta(days=3)).isoformat()},
+        ).json()["results"]
+
+        self.assertEqual(
+            [(rij["buurt"], rij["count"]) for rij in aangemaakt],
+            [("Cool", 1), ("Oude Westen", 1)],
+        )
+        self.assertEqual(
+            [(rij["buurt"], rij["count"]) for rij in afgehandeld], [("Cool", 1)]
+        )
+
+        openstaand.afgesloten_op = timezone.now()
+        openstaand.save()
+        aangemaakt = client.get(aangemaakt_url, periode).json()["results"]
+
+        self.assertEqual(
+            [(rij["buurt"], rij["count"]) for rij in aangemaakt], [("Oude Westen", 1)]
+        )
+
+    def test_get_status_overgangen(self):
+        client = get_authenticated_client()
+        melding = baker.make(Melding)
+        baker.make(Adres, wijknaam="Centrum", melding=melding)
+        begin = timezone.now() - timedelta(days=1)
+        for uren, naam in (
+            (0, "openstaand"),
+            (1, "in_behandeling"),
+            (3, "afgehandeld"),
+        ):
+            melding_status = baker.make(Status, naam=naam, melding=melding)
+            Status.objects.filter(pk=melding_status.pk).update(
+                aangemaakt_op=begin + timedelta(hours=uren)
+            )
+        Status.objects.filter(melding=melding).overgangen_vastleggen()
+
+        self.assertEqual(
+            Status.objects.filter(melding=melding).overgangen_vastleggen(), 0
+        )
+
+        veranderingen = client.get(reverse("app:status-veranderingen")).json()
+        afgehandeld = client.get(reverse("app:status-afgehandeld")).json()
+
+        self.assertEqual(
+            [
+                (
+                    rij["wijk"],
+                    rij["onderwerp"],
+                    rij["begin_status"],
+                    rij["eind_status"],
+                    rij["duur_seconden_gemiddeld"],
+                    rij["aantal"],
+                )
+                for rij in veranderingen
+            ],
+            [
+                ("Centrum", "Onbekend", "in_behandeling", "afgehandeld", 7200, 1),
+                ("Centrum", "Onbekend", "openstaand", "in_behandeling", 3600, 1),
+            ],
+        )
+        self.assertEqual(afgehandeld[0]["melding_aantal"], 1)
+        self.assertEqual(afgehandeld[0]["openstaand_duur_gemiddeld"], 3600)
+        self.assertEqual(afgehandeld[0]["in_behandeling_duur_gemiddeld"], 7200)
+        self.assertEqual(afgehandeld[0]["afgehandeld_aantal_gemiddeld"], 1)
+        self.assertIsNone(afgehandeld[0]["afgehandeld_duur_gemiddeld"])
+
+    def test_dubbele_kandidaten(self):
+        reference_lat = 51.924409
+        reference_lon = 4.477736
+
+        client = get_authenticated_client()
+        onderwerp = baker.make(OnderwerpAlias, bron_url=MOCK_URL)
+        nu = timezone.now()
+        # Aangemaakt voor en nieuwer dan de rest, alleen de afstand zet deze achteraan
+        verder_weg = baker.make(
+            Melding,
+            referentie_punt=Point(4.478122, 51.924488),
+            origineel_aangemaakt=nu,
+        )
+        ouder_dichtbij = baker.make(
+            Melding,
+            referentie_punt=Point(reference_lon, reference_lat),
+            origineel_aangemaakt=nu - timedelta(days=2),
+        )
+        dichtbij = baker.make(
+            Melding,
+            referentie_punt=Point(reference_lon, reference_lat),
+            origineel_aangemaakt=nu - timedelta(days=1),
+        )
+        afgesloten = baker.make(
+            Melding,
+            referentie_punt=Point(reference_lon, reference_lat),
+            afgesloten_op=make_aware(datetime.now()),
+        )
+        ander_onderwerp = baker.make(
+            Melding, referentie_punt=Point(reference_lon, reference_lat)
+        )
+        for melding in (dichtbij, ouder_dichtbij, verder_weg, afgesloten):
+            melding.onderwerpen.add(onderwerp)
+        ander_onderwerp.onderwerpen.add(baker.make(OnderwerpAlias))
+
+        url = reverse("app:melding-dubbele-kandidaten")
+        response = client.get(
+            url,
+            {
+                "lat": reference_lat,
+                "lon": reference_lon,
+                "afstand": 50,
+                "onderwerp": MOCK_URL,
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [melding["id"] for melding in response.json()],
+            [dichtbij.id, ouder_dichtbij.id, verder_weg.id],
+        )
+
+    def test_dubbele_kandidaten_expand(self):
+        client = get_authenticated_client()
+        onderwerp = baker.make(OnderwerpAlias, bron_url=MOCK_URL)
+        melding = baker.make(Melding, referentie_punt=Point(4.477736, 51.924409))
+        melding.onderwerpen.add(onderwerp)
+        url = reverse("app:melding-dubbele-kandidaten")
+        data = {"lat": 51.924409, "lon": 4.477736, "onderwerp": MOCK_URL}
+
+        response = client.get(url, data)
+        expand_response = client.get(
+            url, {**data, "expand": "taakopdrachten_voor_melding"}
+        )
+
+        self.assertIn("afstand", response.json()[0])
+        self.assertNotIn("taakopdrachten_voor_melding", response.json()[0])
+        self.assertNotIn("signalen_voor_melding", response.json()[0])
+        self.assertIn("taakopdrachten_voor_melding", expand_response.json()[0])
+        self.assertIn("afstand", expand_response.json()[0])
+
     def test_filter_melding_with_mutiple_locations_within_distance(self):
         reference_lat = 51.924409
         reference_lon = 4.477736
@@ -1,4 +1,7 @@
 import requests_mock
+from apps.aliassen.models import OnderwerpAlias
+from apps.locatie.models import Adres
+from apps.melders.models import Melder
 from apps.meldingen.managers import MeldingManager
 from apps.meldingen.models import Melding
 from apps.meldingen.serializers import MeldingGebeurtenisStatusSerializer
@@ -7,8 +10,10 @@ from apps.meldingen.tests.factories import (
     OnderwerpAliasFactory,
     StatusFactory,
 )
+from apps.signalen.models import Signaal
 from django.db import transaction
-from django.test import TransactionTestCase
+from django.test import TestCase, TransactionTestCase
+from model_bakery import baker
 from rest_framework.exceptions import ValidationError
 
 
@@ -58,3 +63,82 @@ class MeldingTransactionTest(TransactionTestCase):
                 melding = Melding.objects.using(self.DB2).get(id=self.melding.id)
                 with self.assertRaises(MeldingManager.MeldingInGebruik):
                     Melding.acties.status_aanpassen(self.serializer, melding, self.DB2)
+
+
+class OnderwerpAliasVernieuwenTest(TestCase):
+    bron_url = "http://mock_url/onderwerp/1"
+
+    @requests_mock.Mocker()
+    def test_opslaan_zonder_netwerk(self, m):
+        OnderwerpAlias.objects.create(bron_url=self.bron_url)
+        self.assertEqual(m.call_count, 0)
+
+    @requests_mock.Mocker()
+    def test_ophalen_of_aanmaken_zonder_netwerk(self, m):
+        with self.captureOnCommitCallbacks() as callbacks:
+            _, aangemaakt = OnderwerpAlias.objects.ophalen_of_aanmaken(self.bron_url)
+            _, opnieuw_aangemaakt = OnderwerpAlias.objects.ophalen_of_aanmaken(
+                self.bron_url
+            )
+
+        self.assertTrue(aangemaakt)
+        self.assertFalse(opnieuw_aangemaakt)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(m.call_count, 0)
+
+    @requests_mock.Mocker()
+    def test_vernieuwen_conditioneel(self, m):
+        m.get(
+            self.bron_url,
+            [
+                {
+                    "json": {"name": "Grofvuil"},
+                    "headers": {"ETag": '"v1"'},
+                    "status_code": 200,
+                },
+                {"status_code": 304},
+            ],
+        )
+        OnderwerpAlias.objects.create(bron_url=self.bron_url)
+
+        eerste_resultaat = OnderwerpAlias.objects.vernieuwen()
+        tweede_resultaat = OnderwerpAlias.objects.vernieuwen()
+        onderwerp_alias = OnderwerpAlias.objects.get(bron_url=self.bron_url)
+
+        self.assertEqual(eerste_resultaat["gewijzigd"], 1)
+        self.assertEqual(tweede_resultaat["ongewijzigd"], 1)
+        self.assertEqual(m.last_request.headers["If-None-Match"], '"v1"')
+        self.assertEqual(onderwerp_alias.response_json, {"name": "Grofvuil"})
+        self.assertIsNotNone(onderwerp_alias.vernieuwd_op)
+
+
+class MeldingZoekTekstVernieuwenTest(TestCase):
+    def test_zoek_tekst_vernieuwen(self):
+        meldingen = baker.make(Melding, _quantity=3)
+        for index, melding in enumerate(meldingen):
+            signaal = baker.make(
+                Signaal,
+                melding=melding,
+                bron_signaal_id=f"bron-{index}",
+                melder=baker.make(Melder, email=f"melder{index}@mail.nl"),
+            )
+            baker.make(
+                Adres,
+                signaal=signaal,
+                melding=melding,
+                straatnaam="Coolsingel",
+                huisnummer=index + 1,
+            )
+        voortgang = []
+
+        resultaat = Melding.objects.zoek_tekst_vernieuwen(
+            batch_grootte=2, voortgang=lambda r: voortgang.append(r["laatste_id"])
+        )
+
+        self.assertEqual(resultaat["aantal"], 3)
+        self.assertEqual(resultaat["gewijzigd"], 3)
+        self.assertEqual(voortgang, [meldingen[1].id, meldingen[2].id])
+        melding = Melding.objects.get(id=meldingen[0].id)
+        self.assertEqual(melding.zoek_tekst, "Coolsingel 1,bron-0,melder0@mail.nl")
+        self.assertEqual(melding.zoek_tekst, melding.get_zoek_tekst())
+        self.assertEqual(Melding.objects.zoek_tekst_vernieuwen()["gewijzigd"], 0)
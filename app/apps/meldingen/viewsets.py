@@ -1,17 +1,30 @@
+import hashlib
 import logging
 from datetime import datetime, timedelta
+from urllib.parse import urlencode
 
+from apps.aliassen.models import OnderwerpAlias
+from apps.meldingen.detail_cache import melding_detail_cache
 from apps.meldingen.filtersets import (
     MeldingFilter,
     RelatedOrderingFilter,
     SpecificatieFilterSet,
 )
-from apps.meldingen.models import Melding, Meldinggebeurtenis, Specificatie
+from apps.meldingen.models import (
+    Melding,
+    MeldingBuurtAantal,
+    Meldinggebeurtenis,
+    MeldingStatusBuurtAantal,
+    Specificatie,
+)
+from apps.meldingen.querysets import EXPORT_KOLOMMEN
 from apps.meldingen.serializers import (
     MeldingAantallenSerializer,
     MeldingAfgehandeldPerBuurtAantalPaginatedSerializer,
     MeldingAfgehandeldPerBuurtAantalSerializer,
+    MeldingClusterSerializer,
     MeldingDetailSerializer,
+    MeldingDubbeleKandidaatSerializer,
     MeldingGebeurtenisAfhandelenSerializer,
     MeldinggebeurtenisSerializer,
     MeldingGebeurtenisStatusSerializer,
@@ -19,6 +32,8 @@ from apps.meldingen.serializers import (
     MeldingSerializer,
     MeldingStatusBuurtAantalPaginatedSerializer,
     MeldingStatusBuurtAantalSerializer,
+    MeldingVeranderingPaginatedSerializer,
+    MeldingVeranderingSerializer,
     SpecificatieSerializer,
 )
 from apps.taken.serializers import (
@@ -29,14 +44,21 @@ from apps.taken.serializers import (
 )
 from config.context import db
 from django.conf import settings
-from django.http import Http404, JsonResponse
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_filters import rest_framework as filters
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import mixins, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from utils.conditional import ConditioneleGetMixin, conditionele_get
+from utils.export import csv_stream, ndjson_stream
+from utils.pagination import KeysetPagination
+from utils.renderers import MVTRenderer
 
 logger = logging.getLogger(__name__)
 
@@ -131,10 +153,18 @@ class MeldinggebeurtenisViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewS
             OpenApiParameter(
                 "actieve_meldingen", OpenApiTypes.BOOL, OpenApiParameter.QUERY
             ),
+            OpenApiParameter("fields", OpenApiTypes.STR, OpenApiParameter.QUERY),
+            OpenApiParameter("expand", OpenApiTypes.STR, OpenApiParameter.QUERY),
         ]
-    )
+    ),
+    retrieve=extend_schema(
+        parameters=[
+            OpenApiParameter("fields", OpenApiTypes.STR, OpenApiParameter.QUERY),
+            OpenApiParameter("expand", OpenApiTypes.STR, OpenApiParameter.QUERY),
+        ]
+    ),
 )
-class MeldingViewSet(viewsets.ReadOnlyModelViewSet):
+class MeldingViewSet(ConditioneleGetMixin, viewsets.ReadOnlyModelViewSet):
     lookup_field = "uuid"
     queryset = (
         Melding.objects.select_related(
@@ -184,30 +214,37 @@ class MeldingViewSet(viewsets.ReadOnlyModelViewSet):
         "-urgentie",
     ]
     filterset_class = MeldingFilter
+    # Sorteren op gedenormaliseerde kolommen i.p.v. joins, zie RelatedOrderingFilter
+    ordering_vervangingen = {
+        "status__naam": "sortering_status_naam",
+        "straatnaam": "sortering_straatnaam",
+        "referentie_locatie__straatnaam": "sortering_straatnaam",
+        "referentie_locatie__buurtnaam": "sortering_buurtnaam",
+        "locaties_voor_melding__buurtnaam": "sortering_buurtnaam",
+        "locaties_voor_melding__wijknaam": "sortering_wijknaam",
+        "referentie_locatie__begraafplaats": "sortering_begraafplaats",
+        "referentie_locatie__vak": "sortering_vak",
+        "referentie_locatie__grafnummer": "sortering_grafnummer",
+    }
+    versie_velden = ("aangepast_op", "versie")
+    cursor_ordering_fields = (
+        "-id",
+        "id",
+        "-origineel_aangemaakt",
+        "origineel_aangemaakt",
+        "-urgentie",
+        "urgentie",
+        "-aangemaakt_op",
+        "aangemaakt_op",
+        "-aangepast_op",
+        "aangepast_op",
+    )
 
     def get_queryset(self):
-        if self.action == "retrieve":
-            return (
-                Melding.objects.select_related(
-                    "status",
-                )
-                .prefetch_related(
-                    "bijlagen",
-                    "signalen_voor_melding__bijlagen",
-                    "meldinggebeurtenissen_voor_melding__bijlagen",
-                    "meldinggebeurtenissen_voor_melding__status",
-                    "meldinggebeurtenissen_voor_melding__locatie",
-                    "meldinggebeurtenissen_voor_melding__taakgebeurtenis__taakopdracht",
-                    "meldinggebeurtenissen_voor_melding__taakgebeurtenis__bijlagen",
-                    "meldinggebeurtenissen_voor_melding__taakgebeurtenis__taakstatus",
-                    "taakopdrachten_voor_melding__applicatie",
-                    "taakopdrachten_voor_melding__status",
-                    "taakopdrachten_voor_melding__taakgebeurtenissen_voor_taakopdracht__bijlagen",
-                    "taakopdrachten_voor_melding__taakgebeurtenissen_voor_taakopdracht__taakstatus",
-                    "locaties_voor_melding",
-                    "signalen_voor_melding__locaties_voor_signaal",
-                )
-                .all()
+        if self.action in ("list", "retrieve", "dubbele_kandidaten"):
+            # De prefetches volgen de gevraagde velden, zie VeldenSerializerMixin
+            return self.get_serializer_class().queryset_voor_velden(
+                Melding.objects.all(), self.request
             )
         return super().get_queryset()
 
@@ -216,6 +253,15 @@ class MeldingViewSet(viewsets.ReadOnlyModelViewSet):
             return self.serializer_detail_class
         return super().get_serializer_class()
 
+    def get_filter_hash(self, request):
+        return hashlib.sha1(
+            urlencode(
+                sorted((k, sorted(v)) for k, v in request.query_params.lists()),
+                doseq=True,
+            ).encode()
+        ).hexdigest()
+
+    @conditionele_get
     def list(self, request):
         with db(settings.READONLY_DATABASE_KEY):
             queryset = self.filter_queryset(self.get_queryset())
@@ -228,9 +274,20 @@ class MeldingViewSet(viewsets.ReadOnlyModelViewSet):
             serializer = self.get_serializer(queryset, many=True)
             return Response(serializer.data)
 
+    @conditionele_get
     def retrieve(self, request, uuid=None):
-        with db(settings.READONLY_DATABASE_KEY):
-            return super().retrieve(request, uuid)
+        if MeldingDetailSerializer.gevraagde_velden(request) is not None:
+            with db(settings.READONLY_DATABASE_KEY):
+                return super().retrieve(request, uuid)
+
+        versie, document = melding_detail_cache.ophalen(uuid, request)
+        if document is not None:
+            return Response(document)
+        # Opbouwen vanaf de primaire database, zodat een document met de nieuwste
+        # versie nooit gebaseerd is op een achterlopende replica
+        response = super().retrieve(request, uuid)
+        melding_detail_cache.opslaan(uuid, request, versie, response.data)
+        return response
 
     @extend_schema(
         description="Verander de status van een melding",
@@ -557,6 +614,221 @@ class MeldingViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    @extend_schema(
+        description="Open meldingen in de buurt van een punt met minimaal één van de onderwerpen, gesorteerd op afstand en leeftijd. Bedoeld om bij een nieuw signaal mogelijke dubbele meldingen te vinden. De afstand is in meters. De signalen en taakopdrachten van een melding komen alleen mee met ?expand=signalen_voor_melding,taakopdrachten_voor_melding.",
+        responses={status.HTTP_200_OK: MeldingDubbeleKandidaatSerializer(many=True)},
+        parameters=[
+            OpenApiParameter("lat", OpenApiTypes.FLOAT, OpenApiParameter.QUERY),
+            OpenApiParameter("lon", OpenApiTypes.FLOAT, OpenApiParameter.QUERY),
+            OpenApiParameter("afstand", OpenApiTypes.FLOAT, OpenApiParameter.QUERY),
+            OpenApiParameter("dagen", OpenApiTypes.INT, OpenApiParameter.QUERY),
+            OpenApiParameter(
+                "onderwerp", OpenApiTypes.URI, OpenApiParameter.QUERY, many=True
+            ),
+            OpenApiParameter("fields", OpenApiTypes.STR, OpenApiParameter.QUERY),
+            OpenApiParameter("expand", OpenApiTypes.STR, OpenApiParameter.QUERY),
+        ],
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="dubbele-kandidaten",
+        serializer_class=MeldingDubbeleKandidaatSerializer,
+        filter_backends=(),
+        pagination_class=None,
+        filterset_class=None,
+    )
+    def dubbele_kandidaten(self, request):
+        try:
+            punt = Point(
+                float(request.GET["lon"]), float(request.GET["lat"]), srid=4326
+            )
+            afstand = float(
+                request.GET.get("afstand", settings.DUBBELE_KANDIDATEN_AFSTAND)
+            )
+            dagen = int(request.GET.get("dagen", settings.DUBBELE_KANDIDATEN_DAGEN))
+        except (KeyError, ValueError):
+            return Response(
+                {
+                    "detail": "lat en lon zijn verplicht, lat, lon, afstand en dagen moeten numeriek zijn"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        afstand = min(afstand, settings.DUBBELE_KANDIDATEN_AFSTAND * 10)
+
+        with db(settings.READONLY_DATABASE_KEY):
+            onderwerp_ids = None
+            if request.GET.getlist("onderwerp"):
+                onderwerp_ids = list(
+                    OnderwerpAlias.objects.filter(
+                        bron_url__in=request.GET.getlist("onderwerp")
+                    ).values_list("id", flat=True)
+                )
+            serializer = self.get_serializer(
+                self.get_queryset().dubbele_kandidaten(
+                    punt,
+                    onderwerp_ids=onderwerp_ids,
+                    afstand=afstand,
+                    dagen=dagen,
+                ),
+                many=True,
+            )
+            return Response(serializer.data)
+
+    @extend_schema(
+        description="Mapbox vector tile met de meldingen in tegel z/x/y, als punten in de laag 'meldingen'. Alle melding filters kunnen worden gebruikt.",
+        responses={(status.HTTP_200_OK, MVTRenderer.media_type): OpenApiTypes.BINARY},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)",
+        renderer_classes=(MVTRenderer,),
+        filter_backends=(filters.DjangoFilterBackend,),
+        pagination_class=None,
+    )
+    def tiles(self, request, z, x, y, format=None):
+        z, x, y = int(z), int(x), int(y)
+        if z > settings.MELDING_TEGELS_MAX_ZOOM or x >= 2**z or y >= 2**z:
+            raise Http404
+
+        cache_key = f"melding_tegel:{z}/{x}/{y}:{self.get_filter_hash(request)}"
+        tegel = cache.get(cache_key)
+        if tegel is None:
+            with db(settings.READONLY_DATABASE_KEY):
+                tegel = self.filter_queryset(Melding.objects.all()).mvt_tegel(z, x, y)
+            cache.set(cache_key, tegel, settings.MELDING_TEGELS_CACHE_TIMEOUT)
+        return Response(tegel, content_type=MVTRenderer.media_type)
+
+    @extend_schema(
+        description="Melding aantallen per geohash cel, met het gemiddelde punt en de aantallen per status. Alle melding filters kunnen worden gebruikt. De precisie is de lengte van de geohash, van 1 (grof) tot 12 (fijn).",
+        responses={status.HTTP_200_OK: MeldingClusterSerializer(many=True)},
+        parameters=[
+            OpenApiParameter("precisie", OpenApiTypes.INT, OpenApiParameter.QUERY),
+        ],
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="clusters",
+        serializer_class=MeldingClusterSerializer,
+        filter_backends=(filters.DjangoFilterBackend,),
+        pagination_class=None,
+    )
+    def clusters(self, request):
+        try:
+            precisie = int(request.query_params.get("precisie", 6))
+        except ValueError:
+            precisie = 0
+        if not 1 <= precisie <= 12:
+            return Response(
+                {"precisie": "Kies een precisie van 1 tot en met 12"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cache_key = f"melding_clusters:{self.get_filter_hash(request)}"
+        if settings.MELDING_CLUSTERS_CACHE_TIMEOUT:
+            data = cache.get(cache_key)
+            if data is not None:
+                return Response(data)
+        with db(settings.READONLY_DATABASE_KEY):
+            serializer = self.get_serializer(
+                self.filter_queryset(Melding.objects.all()).clusters(precisie),
+                many=True,
+            )
+            data = serializer.data
+        if settings.MELDING_CLUSTERS_CACHE_TIMEOUT:
+            cache.set(cache_key, data, settings.MELDING_CLUSTERS_CACHE_TIMEOUT)
+        return Response(data)
+
+    @extend_schema(
+        description="Export van alle meldingen die aan de filters voldoen, als NDJSON (standaard) of CSV. De export wordt gestreamd en is niet gepagineerd.",
+        responses={(status.HTTP_200_OK, "application/x-ndjson"): OpenApiTypes.STR},
+        parameters=[
+            OpenApiParameter(
+                "formaat",
+                OpenApiTypes.STR,
+                OpenApiParameter.QUERY,
+                enum=["ndjson", "csv"],
+            ),
+        ],
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        filter_backends=(filters.DjangoFilterBackend,),
+        pagination_class=None,
+    )
+    def export(self, request):
+        formaat = request.query_params.get("formaat", "ndjson")
+        if formaat not in ("ndjson", "csv"):
+            return Response(
+                {"formaat": "Kies 'ndjson' of 'csv'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = self.filter_queryset(Melding.objects.all())
+
+        def rijen():
+            # De response wordt pas na het verlaten van deze view opgebouwd
+            with db(settings.READONLY_DATABASE_KEY):
+                yield from queryset.export_rijen(
+                    chunk_size=settings.MELDING_EXPORT_CHUNK_SIZE
+                )
+
+        if formaat == "csv":
+            response = StreamingHttpResponse(
+                csv_stream(rijen(), EXPORT_KOLOMMEN),
+                content_type="text/csv; charset=utf-8",
+            )
+        else:
+            response = StreamingHttpResponse(
+                ndjson_stream(rijen()), content_type="application/x-ndjson"
+            )
+        response["Content-Disposition"] = f"attachment; filename=meldingen.{formaat}"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @extend_schema(
+        description="Veranderingen van meldingen in volgorde van optreden, afgeleid van de melding gebeurtenissen. Begin zonder cursor, eventueel met 'sinds', en ga verder met de url uit 'next'. 'next' is er ook als er (nog) geen nieuwe veranderingen zijn.",
+        responses={status.HTTP_200_OK: MeldingVeranderingPaginatedSerializer},
+        parameters=[
+            OpenApiParameter("sinds", OpenApiTypes.DATETIME, OpenApiParameter.QUERY),
+        ],
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="veranderingen",
+        serializer_class=MeldingVeranderingSerializer,
+        pagination_class=KeysetPagination,
+        filter_backends=(),
+        filterset_class=None,
+    )
+    def veranderingen(self, request):
+        tot = timezone.now() - timedelta(
+            seconds=settings.MELDING_VERANDERINGEN_VERTRAGING_SECONDEN
+        )
+        gebeurtenissen = (
+            Meldinggebeurtenis.objects.filter(aangemaakt_op__lte=tot)
+            .select_related("melding")
+            .only("id", "aangemaakt_op", "gebeurtenis_type", "melding__uuid")
+        )
+        sinds = request.query_params.get("sinds")
+        if sinds and not request.query_params.get("cursor"):
+            sinds = parse_datetime(sinds)
+            if not sinds:
+                return Response(
+                    {"sinds": "Ongeldige datum/tijd"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            gebeurtenissen = gebeurtenissen.filter(aangemaakt_op__gt=sinds)
+
+        with db(settings.READONLY_DATABASE_KEY):
+            pagina = self.paginate_queryset(gebeurtenissen)
+            serializer = self.get_serializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @extend_schema(
         description="Nieuwe melding aantallen per wijk en onderwerp",
         responses={status.HTTP_200_OK: MeldingAantallenSerializer(many=True)},
@@ -595,17 +867,11 @@ class MeldingViewSet(viewsets.ReadOnlyModelViewSet):
     )
     def melding_status_buurt_aantallen(self, request):
         spoed = self.request.GET.get("spoed")
-        spoed_start = 0
-        spoed_end = 1.1
-        if spoed:
-            spoed_start = 0.5 if spoed == "true" else 0
-            spoed_end = 1.1 if spoed == "true" else 0.5
 
         with db(settings.READONLY_DATABASE_KEY):
             serializer = MeldingStatusBuurtAantalSerializer(
-                Melding.objects.melding_status_buurt_aantallen(
-                    spoed_start=spoed_start,
-                    spoed_end=spoed_end,
+                MeldingStatusBuurtAantal.objects.aantallen(
+                    spoed=spoed == "true" if spoed else None
                 ),
                 context={"request": request},
                 many=True,
@@ -659,9 +925,10 @@ class MeldingViewSet(viewsets.ReadOnlyModelViewSet):
 
         with db(settings.READONLY_DATABASE_KEY):
             serializer = MeldingAfgehandeldPerBuurtAantalSerializer(
-                Melding.objects.melding_afgehandeld_per_buurt_aantallen(
-                    afgesloten_op_gt=afgesloten_op_gt,
-                    afgesloten_op_lte=afgesloten_op_lte,
+                MeldingBuurtAantal.objects.periode_aantallen(
+                    "afgehandeld",
+                    vanaf=afgesloten_op_gt,
+                    tot=afgesloten_op_lte,
                 ),
                 context={"request": request},
                 many=True,
@@ -715,9 +982,10 @@ class MeldingViewSet(viewsets.ReadOnlyModelViewSet):
 
         with db(settings.READONLY_DATABASE_KEY):
             serializer = MeldingAfgehandeldPerBuurtAantalSerializer(
-                Melding.objects.melding_aangemaakt_per_buurt_aantallen(
-                    aangemaakt_op_gt=aangemaakt_op_gt,
-                    aangemaakt_op_lte=aangemaakt_op_lte,
+                MeldingBuurtAantal.objects.periode_aantallen(
+                    "openstaand",
+                    vanaf=aangemaakt_op_gt,
+                    tot=aangemaakt_op_lte,
                 ),
                 context={"request": request},
                 many=True,
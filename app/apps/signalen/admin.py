@@ -1,5 +1,5 @@
 from apps.signalen.admin_filters import MeldingAfgehandeldFilter
-from apps.signalen.models import Signaal
+from apps.signalen.models import Signaal, SignaalAanvraag
 from django.contrib import admin
 
 from .tasks import convert_aanvullende_informatie_to_aanvullende_vragen
@@ -62,3 +62,28 @@ class SignaalAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Signaal, SignaalAdmin)
+
+
+class SignaalAanvraagAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "uuid",
+        "bron_id",
+        "bron_signaal_id",
+        "status",
+        "aangemaakt_op",
+        "verwerkt_op",
+        "signaal",
+    )
+    list_filter = (
+        "status",
+        "bron_id",
+    )
+    search_fields = [
+        "bron_signaal_id",
+        "uuid",
+    ]
+    raw_id_fields = ("signaal",)
+
+
+admin.site.register(SignaalAanvraag, SignaalAanvraagAdmin)
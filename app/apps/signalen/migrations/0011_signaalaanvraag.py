@@ -0,0 +1,83 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:12
+
+import uuid
+
+import django.db.models.deletion
+import utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("signalen", "0010_signaal_kanaal_signaal_versie"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SignaalAanvraag",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "uuid",
+                    models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+                ),
+                ("aangemaakt_op", models.DateTimeField(auto_now_add=True)),
+                ("aangepast_op", models.DateTimeField(auto_now=True)),
+                ("data", utils.fields.DictJSONField(default=dict)),
+                (
+                    "bron_id",
+                    models.CharField(blank=True, max_length=500, null=True),
+                ),
+                (
+                    "bron_signaal_id",
+                    models.CharField(blank=True, max_length=500, null=True),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("ontvangen", "Ontvangen"),
+                            ("verwerkt", "Verwerkt"),
+                            ("dubbel", "Dubbel"),
+                            ("fout", "Fout"),
+                        ],
+                        default="ontvangen",
+                        max_length=50,
+                    ),
+                ),
+                ("fout", utils.fields.DictJSONField(default=dict)),
+                ("verwerkt_op", models.DateTimeField(blank=True, null=True)),
+                (
+                    "signaal",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="aanvragen_voor_signaal",
+                        to="signalen.signaal",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Signaal aanvraag",
+                "verbose_name_plural": "Signaal aanvragen",
+                "indexes": [
+                    models.Index(fields=["uuid"], name="signaal_aanvraag_uuid_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("bron_id", "bron_signaal_id"),
+                        name="signaal_aanvraag_bron_uniek",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -99,3 +99,56 @@ class Signaal(BasisModel):
             models.Index(fields=["signaal_url"], name="signaal_url_idx"),
             models.Index(fields=["uuid"], name="signaal_uuid_idx"),
         ]
+
+
+class SignaalAanvraag(BasisModel):
+    """
+    Een geaccepteerde, gevalideerde signaal payload die asynchroon door een worker
+    wordt verwerkt tot een Signaal.
+    """
+
+    class StatusOpties(models.TextChoices):
+        ONTVANGEN = "ontvangen", "Ontvangen"
+        VERWERKT = "verwerkt", "Verwerkt"
+        DUBBEL = "dubbel", "Dubbel"
+        FOUT = "fout", "Fout"
+
+    data = DictJSONField(default=dict)
+    bron_id = models.CharField(max_length=500, null=True, blank=True)
+    bron_signaal_id = models.CharField(max_length=500, null=True, blank=True)
+    status = models.CharField(
+        max_length=50,
+        choices=StatusOpties.choices,
+        default=StatusOpties.ONTVANGEN,
+    )
+    fout = DictJSONField(default=dict)
+    verwerkt_op = models.DateTimeField(null=True, blank=True)
+    signaal = models.ForeignKey(
+        to="signalen.Signaal",
+        related_name="aanvragen_voor_signaal",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
+
+    def get_absolute_url(self):
+        domain = Site.objects.get_current().domain
+        url_basis = f"{settings.PROTOCOL}://{domain}{settings.PORT}"
+        pad = reverse(
+            "v1:signaal-aanvraag-detail",
+            kwargs={"uuid": self.uuid},
+        )
+        return f"{url_basis}{pad}"
+
+    class Meta:
+        verbose_name = "Signaal aanvraag"
+        verbose_name_plural = "Signaal aanvragen"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bron_id", "bron_signaal_id"],
+                name="signaal_aanvraag_bron_uniek",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["uuid"], name="signaal_aanvraag_uuid_idx"),
+        ]
@@ -10,7 +10,7 @@ from apps.locatie.serializers import (
 )
 from apps.melders.serializers import MelderSerializer
 from apps.meldingen.models import Melding, Meldinggebeurtenis
-from apps.signalen.models import Signaal
+from apps.signalen.models import Signaal, SignaalAanvraag
 from apps.status.models import Status
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema_field
@@ -221,3 +221,74 @@ class SignaalSerializer(WritableNestedModelSerializer):
             "graven",
             "locaties_voor_signaal",
         )
+
+
+class SignaalBatchResultaatSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    resultaat = serializers.ChoiceField(
+        choices=("aangemaakt", "toegevoegd", "dubbel", "fout")
+    )
+    signaal = serializers.SerializerMethodField()
+    melding = serializers.SerializerMethodField()
+    fouten = serializers.JSONField(allow_null=True)
+
+    @extend_schema_field(OpenApiTypes.URI)
+    def get_signaal(self, obj):
+        if not obj.get("signaal"):
+            return None
+        return reverse(
+            "v1:signaal-detail",
+            kwargs={"uuid": obj["signaal"].uuid},
+            request=self.context.get("request"),
+        )
+
+    @extend_schema_field(OpenApiTypes.URI)
+    def get_melding(self, obj):
+        if not obj.get("melding"):
+            return None
+        return reverse(
+            "v1:melding-detail",
+            kwargs={"uuid": obj["melding"].uuid},
+            request=self.context.get("request"),
+        )
+
+
+class SignaalAanvraagLinksSerializer(serializers.Serializer):
+    self = serializers.SerializerMethodField()
+    signaal = serializers.SerializerMethodField()
+
+    @extend_schema_field(OpenApiTypes.URI)
+    def get_self(self, obj):
+        return reverse(
+            "v1:signaal-aanvraag-detail",
+            kwargs={"uuid": obj.uuid},
+            request=self.context.get("request"),
+        )
+
+    @extend_schema_field(OpenApiTypes.URI)
+    def get_signaal(self, obj):
+        if not obj.signaal:
+            return None
+        return reverse(
+            "v1:signaal-detail",
+            kwargs={"uuid": obj.signaal.uuid},
+            request=self.context.get("request"),
+        )
+
+
+class SignaalAanvraagSerializer(serializers.ModelSerializer):
+    _links = SignaalAanvraagLinksSerializer(source="*", read_only=True)
+
+    class Meta:
+        model = SignaalAanvraag
+        fields = (
+            "_links",
+            "uuid",
+            "bron_id",
+            "bron_signaal_id",
+            "status",
+            "fout",
+            "aangemaakt_op",
+            "verwerkt_op",
+        )
+        read_only_fields = fields
@@ -1,4 +1,5 @@
 import json
+from datetime import timedelta
 
 import celery
 from celery import shared_task
@@ -223,3 +224,86 @@ def task_set_signaal_url_by_given_id_bron_signaal_id(
         ),
         "signalen_updated_count": len(results["signalen_updated"]),
     }
+
+
+@shared_task(bind=True, base=BaseTaskWithRetry)
+def task_signaal_aanvraag_verwerken(self, signaal_aanvraag_id):
+    from apps.meldingen.models import Melding
+    from apps.signalen.models import Signaal, SignaalAanvraag
+    from apps.signalen.serializers import SignaalSerializer
+    from django.db import IntegrityError, transaction
+    from rest_framework.settings import api_settings
+
+    with transaction.atomic():
+        signaal_aanvraag = (
+            SignaalAanvraag.objects.select_for_update(skip_locked=True)
+            .filter(
+                pk=signaal_aanvraag_id,
+                status=SignaalAanvraag.StatusOpties.ONTVANGEN,
+            )
+            .first()
+        )
+        if not signaal_aanvraag:
+            return f"SignaalAanvraag met id {signaal_aanvraag_id} is al verwerkt of in verwerking"
+
+        def bestaand_signaal():
+            return Signaal.objects.filter(
+                bron_id=signaal_aanvraag.bron_id,
+                bron_signaal_id=signaal_aanvraag.bron_signaal_id,
+            ).first()
+
+        def dubbel(signaal):
+            signaal_aanvraag.status = SignaalAanvraag.StatusOpties.DUBBEL
+            signaal_aanvraag.signaal = signaal
+            signaal_aanvraag.save()
+            return f"SignaalAanvraag met id {signaal_aanvraag_id} is dubbel"
+
+        signaal_aanvraag.verwerkt_op = timezone.now()
+        if signaal_aanvraag.bron_signaal_id and (signaal := bestaand_signaal()):
+            return dubbel(signaal)
+
+        serializer = SignaalSerializer(data=signaal_aanvraag.data)
+        if not serializer.is_valid():
+            fout_codes = [
+                fout.code
+                for fout in serializer.errors.get(api_settings.NON_FIELD_ERRORS_KEY, [])
+            ]
+            if "unique" in fout_codes:
+                # Het unique together validator zag een gelijktijdig aangemaakt signaal
+                return dubbel(bestaand_signaal())
+            logger.error(
+                f"task_signaal_aanvraag_verwerken: serializer.errors={serializer.errors}"
+            )
+            signaal_aanvraag.status = SignaalAanvraag.StatusOpties.FOUT
+            signaal_aanvraag.fout = serializer.errors
+            signaal_aanvraag.save()
+            return f"SignaalAanvraag met id {signaal_aanvraag_id} is niet valide"
+
+        try:
+            signaal = Melding.acties.signaal_aanmaken(serializer)
+        except IntegrityError:
+            # Een gelijktijdige aanvraag met dezelfde bron sleutel was ons voor
+            return dubbel(bestaand_signaal())
+
+        signaal_aanvraag.status = SignaalAanvraag.StatusOpties.VERWERKT
+        signaal_aanvraag.signaal = signaal
+        signaal_aanvraag.save()
+    return f"SignaalAanvraag met id {signaal_aanvraag_id} is verwerkt"
+
+
+@shared_task(bind=True)
+def task_signaal_aanvragen_herstarten(self, ouder_dan_minuten=10):
+    """
+    Vangnet voor aanvragen waarvan de taak verloren is gegaan.
+    """
+    from apps.signalen.models import SignaalAanvraag
+
+    signaal_aanvraag_ids = list(
+        SignaalAanvraag.objects.filter(
+            status=SignaalAanvraag.StatusOpties.ONTVANGEN,
+            aangemaakt_op__lt=timezone.now() - timedelta(minutes=ouder_dan_minuten),
+        ).values_list("id", flat=True)
+    )
+    for signaal_aanvraag_id in signaal_aanvraag_ids:
+        task_signaal_aanvraag_verwerken.delay(signaal_aanvraag_id)
+    return f"Aantal herstarte signaal aanvragen: {len(signaal_aanvraag_ids)}"
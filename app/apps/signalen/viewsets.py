@@ -1,19 +1,30 @@
 import logging
+from functools import reduce
+from operator import or_
 
 from apps.meldingen.models import Melding
 from apps.signalen.filtersets import RelatedOrderingFilter, SignaalFilter
-from apps.signalen.models import Signaal
+from apps.signalen.models import Signaal, SignaalAanvraag
 from apps.signalen.serializers import (
     SignaalAantallenSerializer,
+    SignaalAanvraagSerializer,
+    SignaalBatchResultaatSerializer,
     SignaalListSerializer,
     SignaalSerializer,
 )
+from apps.signalen.tasks import task_signaal_aanvraag_verwerken
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from django_filters import rest_framework as filters
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.validators import UniqueTogetherValidator
+from utils.conditional import ConditioneleGetMixin, conditionele_get
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +41,7 @@ logger = logging.getLogger(__name__)
     ]
 )
 class SignaalViewSet(
+    ConditioneleGetMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.CreateModelMixin,
@@ -47,18 +59,53 @@ class SignaalViewSet(
     )
     ordering_fields = "__all_related__"
     filterset_class = SignaalFilter
+    cursor_ordering_fields = (
+        "-id",
+        "id",
+        "-aangemaakt_op",
+        "aangemaakt_op",
+    )
 
     def get_serializer_class(self):
         if self.action == "list":
             return self.serializer_list_class
         return super().get_serializer_class()
 
+    @conditionele_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditionele_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @extend_schema(
+        description="Signaal aanmaken. Met de query parameter 'asynchroon=true' wordt het signaal alleen gevalideerd en opgeslagen als aanvraag, waarna een worker het signaal aanmaakt. De response is dan 202 met de url van de aanvraag.",
+        responses={
+            status.HTTP_201_CREATED: SignaalSerializer,
+            status.HTTP_202_ACCEPTED: SignaalAanvraagSerializer,
+        },
+        parameters=[
+            OpenApiParameter("asynchroon", OpenApiTypes.BOOL, OpenApiParameter.QUERY),
+        ],
+    )
     def create(self, request):
+        asynchroon = request.GET.get("asynchroon") == "true"
         serializer = self.serializer_class(
             data=request.data,
             context={"request": request},
         )
+        if asynchroon:
+            # Een herhaald asynchroon request krijgt de bestaande aanvraag terug, een
+            # signaal dat al bestaat wordt door de worker als dubbel verwerkt
+            serializer.validators = [
+                validator
+                for validator in serializer.validators
+                if not isinstance(validator, UniqueTogetherValidator)
+            ]
         if serializer.is_valid():
+            if asynchroon:
+                return self._accepteren(request, serializer)
             signaal = Melding.acties.signaal_aanmaken(serializer)
             serializer = self.serializer_class(signaal, context={"request": request})
             return Response(
@@ -72,6 +119,157 @@ class SignaalViewSet(
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
 
+    def _accepteren(self, request, serializer):
+        bron_id = serializer.validated_data.get("bron_id")
+        bron_signaal_id = serializer.validated_data.get("bron_signaal_id")
+        if bron_signaal_id:
+            signaal_aanvraag, aangemaakt = SignaalAanvraag.objects.get_or_create(
+                bron_id=bron_id,
+                bron_signaal_id=bron_signaal_id,
+                defaults={"data": request.data},
+            )
+            # Een mislukte aanvraag wordt met de nieuwe data opnieuw verwerkt
+            if not aangemaakt and SignaalAanvraag.objects.filter(
+                pk=signaal_aanvraag.pk,
+                status=SignaalAanvraag.StatusOpties.FOUT,
+            ).update(
+                data=request.data,
+                status=SignaalAanvraag.StatusOpties.ONTVANGEN,
+                fout={},
+                verwerkt_op=None,
+                aangepast_op=timezone.now(),
+            ):
+                signaal_aanvraag.refresh_from_db()
+        else:
+            signaal_aanvraag = SignaalAanvraag.objects.create(
+                bron_id=bron_id,
+                data=request.data,
+            )
+        if signaal_aanvraag.status == SignaalAanvraag.StatusOpties.ONTVANGEN:
+            transaction.on_commit(
+                lambda: task_signaal_aanvraag_verwerken.delay(signaal_aanvraag.id)
+            )
+        aanvraag_serializer = SignaalAanvraagSerializer(
+            signaal_aanvraag, context={"request": request}
+        )
+        return Response(
+            aanvraag_serializer.data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": aanvraag_serializer.data["_links"]["self"]},
+        )
+
+    @extend_schema(
+        description="Meerdere signalen in één request aanmaken. Het resultaat bevat per signaal, in dezelfde volgorde als de input, of het signaal is aangemaakt, aan een bestaande melding is toegevoegd, al bestond (dubbel) of een fout bevat.",
+        request=SignaalSerializer(many=True),
+        responses={status.HTTP_200_OK: SignaalBatchResultaatSerializer(many=True)},
+        parameters=None,
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="batch",
+        serializer_class=SignaalSerializer,
+        filter_backends=(),
+        pagination_class=None,
+        filterset_class=None,
+    )
+    def batch(self, request):
+        if not isinstance(request.data, list):
+            return Response(
+                data={"detail": "Verwacht een lijst met signalen"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(request.data) > settings.SIGNAAL_BATCH_MAX_AANTAL:
+            return Response(
+                data={
+                    "detail": f"Maximaal {settings.SIGNAAL_BATCH_MAX_AANTAL} signalen per request"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        resultaten = [None] * len(request.data)
+        valide_serializers = []
+        valide_indexen = []
+        # Signalen die al eerder zijn aangemaakt, b.v. bij het opnieuw versturen van
+        # een batch, zijn dubbel. De unique together validatie van de serializer zou
+        # ze anders als fout afwijzen.
+        bestaande_signalen = self._bestaande_signalen(request.data)
+        for index, signaal_data in enumerate(request.data):
+            bestaand_signaal = bestaande_signalen.get(self._bron_sleutel(signaal_data))
+            if bestaand_signaal:
+                resultaten[index] = {
+                    "resultaat": "dubbel",
+                    "signaal": bestaand_signaal,
+                    "melding": bestaand_signaal.melding,
+                    "fouten": None,
+                }
+                continue
+            serializer = self.serializer_class(
+                data=signaal_data,
+                context={"request": request},
+            )
+            if serializer.is_valid():
+                valide_serializers.append(serializer)
+                valide_indexen.append(index)
+                continue
+            logger.error(f"Signaal batch serializer: errors={serializer.errors}")
+            resultaten[index] = {
+                "resultaat": "fout",
+                "signaal": None,
+                "melding": None,
+                "fouten": serializer.errors,
+            }
+
+        for index, resultaat in zip(
+            valide_indexen,
+            Melding.acties.signalen_aanmaken(
+                valide_serializers,
+                chunk_grootte=settings.SIGNAAL_BATCH_CHUNK_GROOTTE,
+            ),
+        ):
+            resultaten[index] = resultaat
+
+        serializer = SignaalBatchResultaatSerializer(
+            [
+                dict(resultaat, index=index)
+                for index, resultaat in enumerate(resultaten)
+            ],
+            context={"request": request},
+            many=True,
+        )
+        return Response(serializer.data)
+
+    @staticmethod
+    def _bron_sleutel(signaal_data):
+        if not isinstance(signaal_data, dict):
+            return None
+        bron_id = signaal_data.get("bron_id")
+        bron_signaal_id = signaal_data.get("bron_signaal_id")
+        if not bron_id or not bron_signaal_id:
+            return None
+        return str(bron_id), str(bron_signaal_id)
+
+    def _bestaande_signalen(self, signalen_data):
+        bron_sleutels = {
+            sleutel
+            for sleutel in map(self._bron_sleutel, signalen_data)
+            if sleutel is not None
+        }
+        if not bron_sleutels:
+            return {}
+        return {
+            (signaal.bron_id, signaal.bron_signaal_id): signaal
+            for signaal in Signaal.objects.filter(
+                reduce(
+                    or_,
+                    (
+                        Q(bron_id=bron_id, bron_signaal_id=bron_signaal_id)
+                        for bron_id, bron_signaal_id in bron_sleutels
+                    ),
+                )
+            ).select_related("melding")
+        }
+
     @extend_schema(
         description="Signaal aantallen per wijk en onderwerp",
         responses={status.HTTP_200_OK: SignaalAantallenSerializer(many=True)},
@@ -90,3 +288,12 @@ class SignaalViewSet(
             many=True,
         )
         return Response(serializer.data)
+
+
+class SignaalAanvraagViewSet(
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    lookup_field = "uuid"
+    queryset = SignaalAanvraag.objects.select_related("signaal")
+    serializer_class = SignaalAanvraagSerializer
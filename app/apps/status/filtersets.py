@@ -1,6 +1,6 @@
 from typing import List, Tuple
 
-from apps.status.models import Status
+from apps.status.models import Status, StatusOvergang
 from django.db import models
 from django_filters import rest_framework as filters
 from rest_framework import filters as rest_filters
@@ -27,6 +27,19 @@ class StatusFilter(filters.FilterSet):
         ]
 
 
+class StatusOvergangFilter(filters.FilterSet):
+    aangemaakt_op_gte = filters.DateTimeFilter(field_name="eind_op", lookup_expr="gte")
+    aangemaakt_op_gt = filters.DateTimeFilter(field_name="eind_op", lookup_expr="gt")
+    aangemaakt_op_lte = filters.DateTimeFilter(field_name="eind_op", lookup_expr="lte")
+    aangemaakt_op_lt = filters.DateTimeFilter(field_name="eind_op", lookup_expr="lt")
+
+    class Meta:
+        model = StatusOvergang
+        fields = [
+            "eind_op",
+        ]
+
+
 class RelatedOrderingFilter(rest_filters.OrderingFilter):
     _max_related_depth = 3
 
@@ -0,0 +1,39 @@
+from apps.status.models import Status
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Legt de status overgangen vast voor bestaande statussen in batches, hervat een afgebroken run met --vanaf-id"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-grootte",
+            type=int,
+            default=1000,
+            help="Aantal statussen per batch",
+        )
+        parser.add_argument(
+            "--vanaf-id",
+            type=int,
+            default=0,
+            help="Begin na deze status id, het laatst verwerkte id uit een eerdere run",
+        )
+
+    def handle(self, *args, **options):
+        totaal = Status.objects.filter(id__gt=options["vanaf_id"]).count()
+
+        def voortgang(resultaat):
+            self.stdout.write(
+                f"{resultaat['aantal']}/{totaal} statussen verwerkt, vastgelegd={resultaat['vastgelegd']}, laatste_id={resultaat['laatste_id']}"
+            )
+
+        resultaat = Status.objects.overgangen_aanvullen(
+            batch_grootte=options["batch_grootte"],
+            vanaf_id=options["vanaf_id"],
+            voortgang=voortgang,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Status overgangen vastgelegd: aantal={resultaat['aantal']}, vastgelegd={resultaat['vastgelegd']}"
+            )
+        )
@@ -0,0 +1,150 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+STATUS_NAAM_CHOICES = [
+    ("openstaand", "Openstaand"),
+    ("in_behandeling", "In behandeling"),
+    ("controle", "Controle"),
+    ("afgehandeld", "Afgehandeld"),
+    ("geannuleerd", "Geannuleerd"),
+    ("wachten_melder", "Wachten melder"),
+    ("pauze", "Pauze"),
+]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("aliassen", "0003_onderwerpalias_vernieuwen"),
+        ("locatie", "0009_locatie_buurt_wijk_plaats_idx_locatie_plaatsnaam_idx"),
+        ("meldingen", "0034_meldingbuurtaantal"),
+        ("status", "0003_alter_status_naam"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatusOvergang",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "begin_status",
+                    models.CharField(choices=STATUS_NAAM_CHOICES, max_length=50),
+                ),
+                (
+                    "eind_status",
+                    models.CharField(choices=STATUS_NAAM_CHOICES, max_length=50),
+                ),
+                ("begin_op", models.DateTimeField()),
+                ("eind_op", models.DateTimeField()),
+                ("duur_seconden", models.FloatField()),
+                ("onderwerp", models.CharField(max_length=255)),
+                ("wijk", models.CharField(max_length=255)),
+                (
+                    "melding",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="status_overgangen_voor_melding",
+                        to="meldingen.melding",
+                    ),
+                ),
+                (
+                    "status",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="overgang",
+                        to="status.status",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Status overgang",
+                "verbose_name_plural": "Status overgangen",
+                "indexes": [
+                    models.Index(
+                        fields=["eind_op"], name="status_overgang_eind_op_idx"
+                    ),
+                    models.Index(
+                        fields=["melding", "eind_op"],
+                        name="status_overgang_melding_idx",
+                    ),
+                ],
+            },
+        ),
+        # Dezelfde overgangen als StatusQuerySet.overgangen_vastleggen, voor alle
+        # bestaande statussen in een enkele insert
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO "status_statusovergang" (
+                    "status_id",
+                    "melding_id",
+                    "begin_status",
+                    "eind_status",
+                    "begin_op",
+                    "eind_op",
+                    "duur_seconden",
+                    "onderwerp",
+                    "wijk"
+                )
+                SELECT
+                    "s"."id",
+                    "s"."melding_id",
+                    "s"."begin_status",
+                    "s"."naam",
+                    "s"."begin_op",
+                    "s"."aangemaakt_op",
+                    EXTRACT(EPOCH FROM "s"."aangemaakt_op" - "s"."begin_op"),
+                    COALESCE(
+                        NULLIF(
+                            (
+                                SELECT "o"."response_json" ->> 'name'
+                                FROM "aliassen_onderwerpalias" AS "o"
+                                INNER JOIN "meldingen_melding_onderwerpen" AS "mo"
+                                    ON "mo"."onderwerpalias_id" = "o"."id"
+                                WHERE "mo"."melding_id" = "s"."melding_id"
+                                LIMIT 1
+                            ),
+                            ''
+                        ),
+                        'Onbekend'
+                    ),
+                    COALESCE(
+                        NULLIF(
+                            (
+                                SELECT "l"."wijknaam"
+                                FROM "locatie_locatie" AS "l"
+                                WHERE "l"."melding_id" = "s"."melding_id"
+                                ORDER BY "l"."gewicht" DESC
+                                LIMIT 1
+                            ),
+                            ''
+                        ),
+                        'Onbekend'
+                    )
+                FROM (
+                    SELECT
+                        "id",
+                        "melding_id",
+                        "naam",
+                        "aangemaakt_op",
+                        LAG("naam") OVER "w" AS "begin_status",
+                        LAG("aangemaakt_op") OVER "w" AS "begin_op"
+                    FROM "status_status"
+                    WINDOW "w" AS (
+                        PARTITION BY "melding_id" ORDER BY "aangemaakt_op", "id"
+                    )
+                ) AS "s"
+                WHERE "s"."begin_op" IS NOT NULL
+                ON CONFLICT ("status_id") DO NOTHING;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,4 +1,4 @@
-from apps.status.querysets import StatusQuerySet
+from apps.status.querysets import StatusOvergangQuerySet, StatusQuerySet
 from django.contrib.gis.db import models
 from django.core.exceptions import ValidationError
 from utils.models import BasisModel
@@ -117,3 +117,40 @@ class Status(BasisModel):
 
     class StatusVeranderingNietToegestaan(Exception):
         pass
+
+
+class StatusOvergang(models.Model):
+    """
+    Overgang van de vorige status van een melding naar 'status', met de duur in
+    de vorige status en het onderwerp en de wijk van de melding op dat moment.
+    """
+
+    status = models.OneToOneField(
+        to="status.Status",
+        related_name="overgang",
+        on_delete=models.CASCADE,
+    )
+    melding = models.ForeignKey(
+        to="meldingen.Melding",
+        related_name="status_overgangen_voor_melding",
+        on_delete=models.CASCADE,
+    )
+    begin_status = models.CharField(max_length=50, choices=Status.NaamOpties.choices)
+    eind_status = models.CharField(max_length=50, choices=Status.NaamOpties.choices)
+    begin_op = models.DateTimeField()
+    eind_op = models.DateTimeField()
+    duur_seconden = models.FloatField()
+    onderwerp = models.CharField(max_length=255)
+    wijk = models.CharField(max_length=255)
+
+    objects = StatusOvergangQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Status overgang"
+        verbose_name_plural = "Status overgangen"
+        indexes = [
+            models.Index(fields=["eind_op"], name="status_overgang_eind_op_idx"),
+            models.Index(
+                fields=["melding", "eind_op"], name="status_overgang_melding_idx"
+            ),
+        ]
@@ -1,143 +1,136 @@
 import logging
 
 from dateutil import parser
-from django.contrib.gis.db import models
+from django.db import connections
 from django.db.models import (
     Avg,
+    Case,
     Count,
-    ExpressionWrapper,
-    F,
-    FloatField,
-    Min,
+    Exists,
     OuterRef,
     Q,
     QuerySet,
     Subquery,
     Sum,
     Value,
+    When,
 )
-from django.db.models.expressions import Func
-from django.db.models.functions import Coalesce, Concat
 
 logger = logging.getLogger(__name__)
 
-
-class Epoch(Func):
-    template = "EXTRACT(epoch FROM %(expressions)s)::DOUBLE PRECISION"
-    output_field = models.FloatField()
+ONBEKEND = "Onbekend"
 
 
 class StatusQuerySet(QuerySet):
-    def veranderingen(self, params):
+    def overgangen_vastleggen(self):
+        """
+        Legt voor de statussen in deze queryset die nog geen StatusOvergang hebben
+        de overgang vanaf de vorige status van de melding vast, met het onderwerp en
+        de wijk van de melding op dat moment. De eerste status van een melding heeft
+        geen overgang.
+        """
         from apps.aliassen.models import OnderwerpAlias
         from apps.locatie.models import Locatie
-        from apps.status.models import Status
+        from apps.status.models import Status, StatusOvergang
 
-        statussen = self.all()
-
-        sub_all_statussen = Status.objects.filter(
+        vorige_statussen = Status.objects.filter(
             melding=OuterRef("melding"), aangemaakt_op__lt=OuterRef("aangemaakt_op")
-        ).order_by("melding")
-
-        sub = sub_all_statussen.values_list("melding", flat=True)
-
-        sub_aangemaakt_op = sub_all_statussen.order_by("-aangemaakt_op").values_list(
-            "aangemaakt_op", flat=True
-        )[:1]
-        sub_naam = sub_all_statussen.order_by("-aangemaakt_op").values_list(
-            "naam", flat=True
-        )[:1]
-        sum_statussen_for_meldingen = sub.annotate(
-            statussen_for_melding_sum=Count("melding")
-        ).values("statussen_for_melding_sum")
-
-        # annotate with onderwerp & wijk
+        ).order_by("-aangemaakt_op")
         locaties = Locatie.objects.filter(melding=OuterRef("melding")).order_by(
             "-gewicht"
         )
         onderwerpen = OnderwerpAlias.objects.filter(
             meldingen_voor_onderwerpen=OuterRef("melding")
         )
-        statussen = statussen.annotate(
-            onderwerp=Coalesce(
-                Subquery(onderwerpen.values("response_json__name")[:1]),
-                Value("Onbekend", output_field=models.JSONField()),
+        rijen = (
+            self.filter(overgang__isnull=True)
+            .annotate(
+                begin_status=Subquery(vorige_statussen.values("naam")[:1]),
+                begin_op=Subquery(vorige_statussen.values("aangemaakt_op")[:1]),
+                onderwerp=Subquery(onderwerpen.values("response_json__name")[:1]),
+                wijk=Subquery(locaties.values("wijknaam")[:1]),
             )
-        ).annotate(
-            wijk=Coalesce(
-                Subquery(locaties.values("wijknaam")[:1]),
-                Value("Onbekend"),
-            )
-        )
-
-        # filter out statussen whithout previous status, meaning there is no duration between only one status.
-        statussen = statussen.annotate(
-            status_count=Subquery(sum_statussen_for_meldingen)
-        ).filter(status_count__isnull=False)
-
-        # add previous status naam
-        statussen = statussen.annotate(
-            begin_status=Subquery(sub_naam), eind_status=F("naam")
-        )
-
-        # add unique combined value for averages later
-        statussen = statussen.annotate(
-            eind_begin_wijk_onderwerp=Concat(
+            .filter(begin_op__isnull=False)
+            .order_by()
+            .values(
+                "id",
+                "melding_id",
                 "naam",
-                Value("-"),
-                "eind_status",
-                Value("-"),
+                "aangemaakt_op",
+                "begin_status",
+                "begin_op",
                 "onderwerp",
-                Value("-"),
                 "wijk",
-                output_field=models.CharField(),
-            )
-        ).order_by("eind_begin_wijk_onderwerp")
-
-        # add duration between begin and end status
-        statussen = statussen.annotate(
-            duur_seconden=ExpressionWrapper(
-                Epoch(F("aangemaakt_op")) - Epoch(Subquery(sub_aangemaakt_op)),
-                output_field=FloatField(),
             )
         )
-
-        # add average duration between begin and end status
-        statussen = statussen.values(
-            "eind_begin_wijk_onderwerp",
-            "wijk",
-            "onderwerp",
-            "begin_status",
-            "eind_status",
-        ).annotate(
-            duur_seconden_gemiddeld=Avg(
-                F("duur_seconden"),
-                output_field=FloatField(),
-            ),
-            aantal=Count(F("eind_begin_wijk_onderwerp")),
-        )
-
-        return statussen.values(
-            "wijk",
-            "onderwerp",
-            "begin_status",
-            "eind_status",
-            "duur_seconden_gemiddeld",
-            "aantal",
+        overgangen = [
+            StatusOvergang(
+                status_id=rij["id"],
+                melding_id=rij["melding_id"],
+                begin_status=rij["begin_status"],
+                eind_status=rij["naam"],
+                begin_op=rij["begin_op"],
+                eind_op=rij["aangemaakt_op"],
+                duur_seconden=(rij["aangemaakt_op"] - rij["begin_op"]).total_seconds(),
+                onderwerp=str(rij["onderwerp"]) if rij["onderwerp"] else ONBEKEND,
+                wijk=rij["wijk"] or ONBEKEND,
+            )
+            for rij in rijen
+        ]
+        StatusOvergang.objects.using(self.db).bulk_create(
+            overgangen, ignore_conflicts=True
+        )
+        return len(overgangen)
+
+    def overgangen_aanvullen(self, batch_grootte=1000, vanaf_id=0, voortgang=None):
+        """
+        Legt de overgangen voor alle statussen in deze queryset vast, in batches op
+        volgorde van id. Na elke batch wordt 'voortgang' aangeroepen met het laatste
+        verwerkte id, zodat een afgebroken run met 'vanaf_id' hervat kan worden.
+        """
+        resultaat = {"aantal": 0, "vastgelegd": 0, "laatste_id": vanaf_id}
+        while True:
+            status_ids = list(
+                self.filter(id__gt=resultaat["laatste_id"])
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_grootte]
+            )
+            if not status_ids:
+                break
+            resultaat["vastgelegd"] += self.filter(
+                id__in=status_ids
+            ).overgangen_vastleggen()
+            resultaat["aantal"] += len(status_ids)
+            resultaat["laatste_id"] = status_ids[-1]
+            if voortgang:
+                voortgang(resultaat)
+        return resultaat
+
+
+class StatusOvergangQuerySet(QuerySet):
+    def veranderingen(self):
+        """
+        Gemiddelde duur en aantal van de overgangen per wijk, onderwerp, begin en
+        eind status.
+        """
+        return (
+            self.order_by("wijk", "onderwerp", "begin_status", "eind_status")
+            .values("wijk", "onderwerp", "begin_status", "eind_status")
+            .annotate(
+                duur_seconden_gemiddeld=Avg("duur_seconden"),
+                aantal=Count("id"),
+            )
         )
 
     def doorlooptijden_afgehandelde_meldingen(self, params):
-        from apps.aliassen.models import OnderwerpAlias
-        from apps.locatie.models import Locatie
+        """
+        Per wijk en onderwerp het aantal afgehandelde meldingen, met per status naam
+        het gemiddelde aantal keer dat een melding die status had en de gemiddelde
+        totale duur in die status. Een melding telt mee als de laatste overgang naar
+        afgehandeld of geannuleerd binnen de periode valt.
+        """
         from apps.status.models import Status
 
-        locaties = Locatie.objects.filter(melding=OuterRef("melding")).order_by(
-            "-gewicht"
-        )
-        onderwerpen = OnderwerpAlias.objects.filter(
-            meldingen_voor_onderwerpen=OuterRef("melding")
-        )
-
         aangemaakt_op_gte = None
         aangemaakt_op_lt = None
         try:
@@ -146,127 +139,66 @@ class StatusQuerySet(QuerySet):
         except Exception:
             ...
 
-        qs = Status.objects.all()
-
-        if aangemaakt_op_lt:
-            qs = qs.filter(
-                aangemaakt_op__lt=aangemaakt_op_lt,
+        afsluitingen = self.filter(
+            eind_status__in=[
+                Status.NaamOpties.AFGEHANDELD,
+                Status.NaamOpties.GEANNULEERD,
+            ]
+        ).exclude(
+            Exists(
+                self.model.objects.filter(
+                    melding=OuterRef("melding"), eind_op__gt=OuterRef("eind_op")
+                )
             )
-
-        # annotate met duur van status
-        qs = qs.annotate(
-            duur=Coalesce(
-                ExpressionWrapper(
-                    Epoch(
-                        Subquery(
-                            Status.objects.filter(
-                                melding=OuterRef("melding"),
-                                aangemaakt_op__gt=OuterRef("aangemaakt_op"),
-                            )
-                            .order_by()
-                            .annotate(min=Min("aangemaakt_op"))
-                            .values("min")[:1]
-                        )
-                    )
-                    - Epoch(F("aangemaakt_op")),
-                    output_field=FloatField(),
-                ),
-                0,
-                output_field=FloatField(),
-            ),
-        )
-
-        # subquery aantallen per status naam optie
-        qs_aantal = (
-            Status.objects.filter(melding=OuterRef("melding")).values("naam").order_by()
         )
-        # subquery voor totale duur van de status instanties per naam optie
-        qs_duur = qs.filter(melding=OuterRef("melding")).values("naam").order_by()
-
-        for status_naam, _ in Status.NaamOpties.choices:
-            annotations = [
-                {
-                    f"{status_naam}_aantal": Subquery(
-                        qs_aantal.filter(
-                            naam=status_naam,
-                        )
-                        .annotate(val=Count("naam"))
-                        .values("val")[:1]
-                    ),
+        if aangemaakt_op_gte:
+            afsluitingen = afsluitingen.filter(eind_op__gte=aangemaakt_op_gte)
+        if aangemaakt_op_lt:
+            afsluitingen = afsluitingen.filter(eind_op__lt=aangemaakt_op_lt)
+
+        # Per afgesloten melding het aantal keer en de totale duur per status naam,
+        # de laatste status telt als een keer mee
+        overgangen = "melding__status_overgangen_voor_melding"
+        namen = [naam for naam, _ in Status.NaamOpties.choices]
+        per_melding = (
+            afsluitingen.order_by()
+            .values("melding_id", "eind_status", "onderwerp", "wijk")
+            .annotate(
+                **{
+                    f"{naam}_aantal": Count(
+                        overgangen, filter=Q(**{f"{overgangen}__begin_status": naam})
+                    )
+                    + Case(When(eind_status=naam, then=Value(1)), default=Value(0))
+                    for naam in namen
                 },
-                {
-                    f"{status_naam}_duur_totaal": Subquery(
-                        qs_duur.filter(
-                            naam=status_naam,
-                        )
-                        .annotate(val=Sum("duur"))
-                        .values("val")[:1]
-                    ),
+                **{
+                    f"{naam}_duur": Sum(
+                        f"{overgangen}__duur_seconden",
+                        filter=Q(**{f"{overgangen}__begin_status": naam}),
+                    )
+                    for naam in namen
                 },
-            ]
-            for annotation in annotations:
-                qs = qs.annotate(**annotation)
-
-        # filter op laatste afgehandelde status instanties
-        qs = qs.filter(
-            duur=0,
-            naam__in=[Status.NaamOpties.AFGEHANDELD, Status.NaamOpties.GEANNULEERD],
-        )
-        if aangemaakt_op_gte:
-            qs = qs.filter(
-                aangemaakt_op__gte=aangemaakt_op_gte,
-            )
-
-        # annotate met wijk en onderwerp
-        qs = qs.annotate(
-            onderwerp=Coalesce(
-                Subquery(onderwerpen.values("response_json__name")[:1]),
-                Value("Onbekend", output_field=models.JSONField()),
             )
-        ).annotate(
-            wijk=Coalesce(
-                Subquery(locaties.values("wijknaam")[:1]),
-                Value("Onbekend"),
-            )
-        )
-        # annotate met onderwerp & wijk gecombineerde voor ontdubbeling
-        qs = qs.annotate(
-            onderwerp_wijk=Concat(
-                "onderwerp", Value("-"), "wijk", output_field=models.CharField()
-            )
-        )
-
-        # annotate met gemiddelden van totaal aantal en totaal duur van statussen
-        avg_fields = [
-            {
-                f"{naam}_aantal_gemiddeld": Avg(
-                    F(f"{naam}_aantal"),
-                    output_field=FloatField(),
-                ),
-                f"{naam}_duur_gemiddeld": Avg(
-                    F(f"{naam}_duur_totaal"),
-                    output_field=FloatField(),
-                    filter=~Q(**{f"{naam}_duur_totaal": 0}),
-                ),
-            }
-            for naam, _ in Status.NaamOpties.choices
-        ]
-        avg_fields.insert(0, {"melding_aantal": Count("onderwerp_wijk")})
-        avg_fields = {k: v for a in avg_fields for k, v in a.items()}
-
-        end_values = list(
-            ["melding_aantal", "wijk", "onderwerp"]
-            + [
-                n
-                for naam, _ in Status.NaamOpties.choices
-                for n in [f"{naam}_aantal_gemiddeld", f"{naam}_duur_gemiddeld"]
-            ]
-        )
-
-        qs = (
-            qs.values("onderwerp_wijk", "wijk", "onderwerp")
-            .order_by()
-            .annotate(**avg_fields)
-            .values(*end_values)
         )
-        return qs
+        per_melding_sql, params = per_melding.query.sql_with_params()
+        # Net als een gemiddelde over alleen de meldingen die de status hadden
+        gemiddelden = ", ".join(
+            f"AVG(NULLIF(per_melding.{naam}_{veld}, 0))::DOUBLE PRECISION"
+            f" AS {naam}_{veld}_gemiddeld"
+            for naam in namen
+            for veld in ("aantal", "duur")
+        )
+        sql = f"""
+            SELECT
+                COUNT(*) AS melding_aantal,
+                per_melding.wijk AS wijk,
+                per_melding.onderwerp AS onderwerp,
+                {gemiddelden}
+            FROM ({per_melding_sql}) AS per_melding
+            GROUP BY per_melding.onderwerp, per_melding.wijk
+            ORDER BY per_melding.onderwerp, per_melding.wijk
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            kolommen = [kolom[0] for kolom in cursor.description]
+            return [dict(zip(kolommen, rij)) for rij in cursor.fetchall()]
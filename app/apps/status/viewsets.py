@@ -1,7 +1,11 @@
 import logging
 
-from apps.status.filtersets import RelatedOrderingFilter, StatusFilter
-from apps.status.models import Status
+from apps.status.filtersets import (
+    RelatedOrderingFilter,
+    StatusFilter,
+    StatusOvergangFilter,
+)
+from apps.status.models import Status, StatusOvergang
 from apps.status.serializers import (
     StatusAfgehandeldSerializer,
     StatusLijstSerializer,
@@ -44,11 +48,14 @@ class StatusViewSet(
         methods=["get"],
         url_path="veranderingen",
         serializer_class=StatusVeranderingSerializer,
+        queryset=StatusOvergang.objects.all(),
+        filter_backends=(filters.DjangoFilterBackend,),
+        filterset_class=StatusOvergangFilter,
     )
     def veranderingen(self, request):
         with db(settings.READONLY_DATABASE_KEY):
             serializer = StatusVeranderingSerializer(
-                self.filter_queryset(self.get_queryset()).veranderingen(request.GET),
+                self.filter_queryset(self.get_queryset()).veranderingen(),
                 context={"request": request},
                 many=True,
             )
@@ -79,7 +86,9 @@ class StatusViewSet(
     def afgehandeld(self, request):
         with db(settings.READONLY_DATABASE_KEY):
             serializer = StatusAfgehandeldSerializer(
-                self.get_queryset().doorlooptijden_afgehandelde_meldingen(request.GET),
+                StatusOvergang.objects.doorlooptijden_afgehandelde_meldingen(
+                    request.GET
+                ),
                 context={"request": request},
                 many=True,
             )
@@ -2,7 +2,11 @@ import uuid
 from functools import reduce
 from operator import or_
 
-from apps.taken.models import Taakopdracht, Taakstatus
+from apps.taken.models import (
+    Taakopdracht,
+    TaakopdrachtDoorlooptijdHistogram,
+    Taakstatus,
+)
 from celery import states
 from django.db.models import Q
 from django_filters import rest_framework as filters
@@ -126,3 +130,17 @@ class TaakopdrachtFilter(filters.FilterSet):
         fields = [
             "melding",
         ]
+
+
+class TaakopdrachtDoorlooptijdHistogramFilter(filters.FilterSet):
+    dag_gte = filters.DateFilter(field_name="dag", lookup_expr="gte")
+    dag_lt = filters.DateFilter(field_name="dag", lookup_expr="lt")
+    taaktype = filters.CharFilter(field_name="taaktype")
+    wijk = filters.CharFilter(field_name="wijk")
+    onderwerp = filters.CharFilter(field_name="onderwerp")
+
+    class Meta:
+        model = TaakopdrachtDoorlooptijdHistogram
+        fields = [
+            "dag",
+        ]
@@ -0,0 +1,114 @@
+import random
+import time
+
+from apps.applicaties.models import Applicatie
+from apps.meldingen.models import Melding
+from apps.taken.models import Taakopdracht
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Meet de duur van taaktype_aantallen_per_melding met gegenereerde taakopdrachten, alle gegenereerde data wordt na afloop teruggedraaid. Draait alleen met DEBUG of met een expliciete --database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--aantal",
+            type=int,
+            default=100000,
+            help="Aantal te genereren taakopdrachten",
+        )
+        parser.add_argument(
+            "--taaktypes",
+            type=int,
+            default=25,
+            help="Aantal verschillende taaktypes",
+        )
+        parser.add_argument(
+            "--herhalingen",
+            type=int,
+            default=3,
+            help="Aantal metingen per variant",
+        )
+        parser.add_argument(
+            "--database",
+            help="Database voor de benchmark, verplicht als DEBUG uit staat",
+        )
+
+    def taakopdrachten_genereren(self, database, aantal, aantal_taaktypes):
+        willekeurig = random.Random(aantal)
+        nu = timezone.now()
+        applicatie = Applicatie.objects.using(database).create(
+            naam="benchmark",
+            basis_url="https://benchmark.local",
+            valide_basis_urls=["https://benchmark.local"],
+        )
+        taaktypes = [
+            f"https://benchmark.local/taaktype/{nummer}/"
+            for nummer in range(aantal_taaktypes)
+        ]
+
+        meldingen = Melding.objects.using(database).bulk_create(
+            [Melding(origineel_aangemaakt=nu) for _ in range(aantal // 2)],
+            batch_size=5000,
+        )
+        taakopdrachten = []
+        for melding in meldingen:
+            for taaktype in willekeurig.sample(taaktypes, willekeurig.randint(1, 3)):
+                for _ in range(willekeurig.choice((1, 1, 1, 2))):
+                    taakopdrachten.append(
+                        Taakopdracht(
+                            melding=melding,
+                            applicatie=applicatie,
+                            taaktype=taaktype,
+                            titel=f"Taaktype {taaktype.split('/')[-2]}",
+                            afgesloten_op=nu,
+                        )
+                    )
+        Taakopdracht.objects.using(database).bulk_create(
+            taakopdrachten[:aantal], batch_size=5000
+        )
+        return len(taakopdrachten[:aantal])
+
+    def meten(self, database, querystring, herhalingen):
+        metingen = []
+        for _ in range(herhalingen):
+            start = time.perf_counter()
+            aantal = len(
+                Taakopdracht.objects.using(database).taaktype_aantallen_per_melding(
+                    querystring
+                )
+            )
+            metingen.append(time.perf_counter() - start)
+        return aantal, metingen
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["database"]:
+            raise CommandError(
+                "De benchmark schrijft test data, gebruik DEBUG of geef de database expliciet op met --database"
+            )
+        database = options["database"] or "default"
+
+        with transaction.atomic(using=database):
+            start = time.perf_counter()
+            aantal = self.taakopdrachten_genereren(
+                database, options["aantal"], options["taaktypes"]
+            )
+            self.stdout.write(
+                f"{aantal} taakopdrachten gegenereerd in {time.perf_counter() - start:.1f}s"
+            )
+
+            for naam, querystring in (
+                ("zonder meldingen", {}),
+                ("inclusief meldingen", {"inclusief-melding": "true"}),
+            ):
+                aantal, metingen = self.meten(
+                    database, querystring, options["herhalingen"]
+                )
+                self.stdout.write(
+                    f"{naam}: resultaten={aantal}, min={min(metingen):.3f}s, max={max(metingen):.3f}s"
+                )
+            transaction.set_rollback(True, using=database)
+        self.stdout.write(self.style.SUCCESS("Benchmark klaar, data teruggedraaid"))
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+from apps.taken.models import Taakopdracht, TaakopdrachtDoorlooptijdHistogram
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Berekent de taakopdracht doorlooptijd histogrammen opnieuw per blok dagen, tot en met gisteren"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--vanaf",
+            type=date.fromisoformat,
+            default=None,
+            help="Eerste dag (JJJJ-MM-DD), standaard de dag van de eerst afgesloten taakopdracht",
+        )
+        parser.add_argument(
+            "--dagen-per-blok",
+            type=int,
+            default=31,
+            help="Aantal dagen per transactie",
+        )
+
+    def handle(self, *args, **options):
+        vanaf_dag = options["vanaf"]
+        if vanaf_dag is None:
+            eerste = Taakopdracht.objects.aggregate(eerste=Min("afgesloten_op"))[
+                "eerste"
+            ]
+            if eerste is None:
+                self.stdout.write("Geen afgesloten taakopdrachten")
+                return
+            vanaf_dag = timezone.localdate(eerste)
+        tot_dag = timezone.localdate()
+
+        totaal = 0
+        while vanaf_dag < tot_dag:
+            blok_tot_dag = min(
+                vanaf_dag + timedelta(days=options["dagen_per_blok"]), tot_dag
+            )
+            aantal = TaakopdrachtDoorlooptijdHistogram.objects.bijwerken(
+                vanaf_dag, blok_tot_dag
+            )
+            totaal += aantal
+            self.stdout.write(f"{vanaf_dag} tot {blok_tot_dag}: histogrammen={aantal}")
+            vanaf_dag = blok_tot_dag
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Taakopdracht doorlooptijd histogrammen berekend: aantal={totaal}"
+            )
+        )
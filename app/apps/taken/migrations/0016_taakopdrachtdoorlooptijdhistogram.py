@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:05
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("taken", "0015_taakopdracht_taak_aanmaken_error"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaakopdrachtDoorlooptijdHistogram",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dag", models.DateField()),
+                ("taaktype", models.CharField(max_length=200)),
+                ("titel", models.CharField(max_length=200)),
+                ("wijk", models.CharField(max_length=255)),
+                ("onderwerp", models.CharField(max_length=255)),
+                ("aantal", models.IntegerField(default=0)),
+                ("duur_totaal", models.FloatField(default=0)),
+                (
+                    "emmers",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.IntegerField(), size=None
+                    ),
+                ),
+                ("bijgewerkt_op", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Taakopdracht doorlooptijd histogram",
+                "verbose_name_plural": "Taakopdracht doorlooptijd histogrammen",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dag", "taaktype", "wijk", "onderwerp"),
+                        name="taakopdracht_doorlooptijd_histogram_uniek",
+                    )
+                ],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="taakopdracht",
+            index=models.Index(
+                fields=["afgesloten_op"], name="taakopdracht_afgesloten_op_idx"
+            ),
+        ),
+    ]
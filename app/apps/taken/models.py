@@ -1,8 +1,12 @@
 from apps.bijlagen.models import Bijlage
-from apps.taken.querysets import TaakopdrachtQuerySet
+from apps.taken.querysets import (
+    TaakopdrachtDoorlooptijdHistogramQuerySet,
+    TaakopdrachtQuerySet,
+)
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.gis.db import models
+from django.contrib.postgres.fields import ArrayField
 from django.contrib.sites.models import Site
 from django.db.models import Q
 from django_celery_results.models import TaskResult
@@ -175,6 +179,9 @@ class Taakopdracht(BasisModel):
         verbose_name_plural = "Taakopdrachten"
         indexes = [
             models.Index(fields=["uuid"], name="taakopdracht_uuid_idx"),
+            models.Index(
+                fields=["afgesloten_op"], name="taakopdracht_afgesloten_op_idx"
+            ),
         ]
 
     @property
@@ -256,3 +263,35 @@ class Taakopdracht(BasisModel):
             kwargs={"uuid": self.uuid},
         )
         return f"{url_basis}{pad}"
+
+
+class TaakopdrachtDoorlooptijdHistogram(models.Model):
+    """
+    Verdeling van de afhandeltijd van afgesloten taakopdrachten per dag, taaktype,
+    wijk en onderwerp, in logaritmische emmers. Histogrammen van meerdere dagen
+    worden opgeteld, zodat percentielen over lange periodes niet alle afgesloten
+    taakopdrachten opnieuw hoeven te lezen. Wordt bijgewerkt door
+    'task_taakopdracht_doorlooptijd_histogrammen_bijwerken'.
+    """
+
+    dag = models.DateField()
+    taaktype = models.CharField(max_length=200)
+    titel = models.CharField(max_length=200)
+    wijk = models.CharField(max_length=255)
+    onderwerp = models.CharField(max_length=255)
+    aantal = models.IntegerField(default=0)
+    duur_totaal = models.FloatField(default=0)
+    emmers = ArrayField(models.IntegerField())
+    bijgewerkt_op = models.DateTimeField()
+
+    objects = TaakopdrachtDoorlooptijdHistogramQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Taakopdracht doorlooptijd histogram"
+        verbose_name_plural = "Taakopdracht doorlooptijd histogrammen"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dag", "taaktype", "wijk", "onderwerp"],
+                name="taakopdracht_doorlooptijd_histogram_uniek",
+            ),
+        ]
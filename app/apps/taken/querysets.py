@@ -1,115 +1,151 @@
 import logging
+import math
+from datetime import datetime, time
 
 from django.contrib.gis.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.db import connections, transaction
 from django.db.models import (
+    Aggregate,
     Avg,
     Count,
     ExpressionWrapper,
     F,
     FloatField,
+    IntegerField,
+    Max,
     Min,
     OuterRef,
     QuerySet,
     Subquery,
+    Sum,
     Value,
 )
-from django.db.models.functions import Coalesce, Concat
+from django.db.models.functions import (
+    Cast,
+    Coalesce,
+    Concat,
+    Floor,
+    Greatest,
+    Least,
+    Ln,
+    TruncDate,
+)
+from django.utils import timezone
 from utils.models import Epoch
 
 logger = logging.getLogger(__name__)
 
+# Doorlooptijd histogrammen: emmer i bevat afhandeltijden vanaf 2^(i/4) seconden,
+# emmer 0 ook alles onder de seconde en de laatste emmer alles vanaf ruim 2 jaar
+HISTOGRAM_EMMERS_PER_VERDUBBELING = 4
+HISTOGRAM_AANTAL_EMMERS = HISTOGRAM_EMMERS_PER_VERDUBBELING * 26
+
+
+def histogram_emmer_grenzen(emmer):
+    ondergrens = 2 ** (emmer / HISTOGRAM_EMMERS_PER_VERDUBBELING) if emmer else 0.0
+    bovengrens = 2 ** ((emmer + 1) / HISTOGRAM_EMMERS_PER_VERDUBBELING)
+    return ondergrens, bovengrens
+
+
+def histogram_percentiel(emmers, aantal, percentiel):
+    """
+    Schatting van een percentiel (0 tot en met 1) uit een doorlooptijd histogram,
+    lineair geïnterpoleerd binnen de emmer waarin het percentiel valt.
+    """
+    rang = percentiel * aantal
+    cumulatief = 0
+    for emmer, emmer_aantal in enumerate(emmers):
+        if emmer_aantal and cumulatief + emmer_aantal >= rang:
+            ondergrens, bovengrens = histogram_emmer_grenzen(emmer)
+            fractie = (rang - cumulatief) / emmer_aantal
+            return ondergrens + (bovengrens - ondergrens) * fractie
+        cumulatief += emmer_aantal
+    return None
+
+
+def percentiel_sleutel(percentiel):
+    return f"p{percentiel * 100:g}"
+
+
+class Percentielen(Aggregate):
+    """
+    PERCENTILE_CONT of PERCENTILE_DISC voor meerdere percentielen tegelijk, het
+    resultaat is een array met een waarde per percentiel.
+    """
+
+    template = "%(function)s(%(percentielen)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+
+    def __init__(self, expression, percentielen, discreet=False, **extra):
+        super().__init__(
+            expression,
+            function="PERCENTILE_DISC" if discreet else "PERCENTILE_CONT",
+            percentielen="ARRAY[%s]::DOUBLE PRECISION[]"
+            % ", ".join(str(float(p)) for p in percentielen),
+            output_field=ArrayField(FloatField()),
+            **extra,
+        )
+
 
 class TaakopdrachtQuerySet(QuerySet):
-    def taaktype_aantallen_per_melding(self, querystring):
+    def _onderwerp_en_wijk_annoteren(self):
         from apps.aliassen.models import OnderwerpAlias
 
-        inclusief_melding = querystring.get("inclusief-melding", False)
-
         onderwerpen = OnderwerpAlias.objects.filter(
             meldingen_voor_onderwerpen=OuterRef("melding")
         )
-        taakopdrachten = self.all()
-
-        taakopdrachten = taakopdrachten.annotate(
+        return self.annotate(
             onderwerp=Coalesce(
                 Subquery(onderwerpen.values("response_json__name")[:1]),
                 Value("Onbekend", output_field=models.JSONField()),
-            )
-        ).annotate(
+            ),
             wijk=Coalesce(
                 F("melding__referentie_locatie__wijknaam"),
                 Value("Onbekend"),
-            )
+            ),
         )
 
-        taakopdrachten = (
-            taakopdrachten.annotate(
-                melding_taaktype=Concat(
-                    "melding", Value("-"), "taaktype", output_field=models.CharField()
-                )
-            )
-            .values("melding_taaktype", "titel", "wijk", "onderwerp")
-            .order_by()
-        )
-        taakopdrachten = taakopdrachten.annotate(
-            taaktype_melding_aantal=Count("melding_taaktype")
-        )
+    def taaktype_aantallen_per_melding(self, querystring):
+        """
+        Aantal meldingen per onderwerp, wijk, taaktype en aantal taakopdrachten van
+        dat taaktype per melding. Eerst wordt per melding en taaktype geteld, daarna
+        worden die tellingen in dezelfde query gegroepeerd. Het resultaat is een lijst
+        met een dict per groep.
+        """
+        inclusief_melding = querystring.get("inclusief-melding", False)
 
-        taakopdrachten = (
-            taakopdrachten.annotate(
-                onderwerp_wijk_taaktype_aantal=Concat(
-                    "onderwerp",
-                    Value("-"),
-                    "wijk",
-                    Value("-"),
-                    "taaktype",
-                    Value("-"),
-                    "taaktype_melding_aantal",
-                    output_field=models.CharField(),
-                )
-            )
-            .values(
-                "onderwerp_wijk_taaktype_aantal",
-                "taaktype",
-                "wijk",
-                "onderwerp",
-                "taaktype_melding_aantal",
-                "melding",
-                "melding__uuid",
-                "titel",
-            )
+        per_melding = (
+            self._onderwerp_en_wijk_annoteren()
+            .annotate(melding_uuid=F("melding__uuid"))
+            .values("melding_uuid", "taaktype", "wijk", "onderwerp")
             .order_by()
+            .annotate(
+                taaktype_titel=Max("titel"),
+                aantal_per_melding=Count("id"),
+            )
         )
-
-        taakopdrachten = list(
-            {
-                taakopdracht.get("onderwerp_wijk_taaktype_aantal"): {
-                    "wijk": taakopdracht.get("wijk"),
-                    "onderwerp": taakopdracht.get("onderwerp"),
-                    "taaktype": taakopdracht.get("taaktype"),
-                    "titel": taakopdracht.get("titel"),
-                    "aantal_per_melding": taakopdracht.get("taaktype_melding_aantal"),
-                    "melding_aantal": len(
-                        [
-                            to
-                            for to in taakopdrachten
-                            if to.get("onderwerp_wijk_taaktype_aantal")
-                            == taakopdracht.get("onderwerp_wijk_taaktype_aantal")
-                        ]
-                    ),
-                    "meldingen": [
-                        to.get("melding__uuid")
-                        for to in taakopdrachten
-                        if to.get("onderwerp_wijk_taaktype_aantal")
-                        == taakopdracht.get("onderwerp_wijk_taaktype_aantal")
-                    ]
-                    if inclusief_melding
-                    else [],
-                }
-                for taakopdracht in taakopdrachten
-            }.values()
+        per_melding_sql, params = per_melding.query.sql_with_params()
+        meldingen_sql = (
+            "ARRAY_AGG(per_melding.melding_uuid ORDER BY per_melding.melding_uuid)"
+            if inclusief_melding
+            else "ARRAY[]::uuid[]"
         )
-        return taakopdrachten
+        sql = f"""
+            SELECT
+                per_melding.wijk AS wijk,
+                per_melding.onderwerp #>> '{{}}' AS onderwerp,
+                per_melding.taaktype AS taaktype,
+                MAX(per_melding.taaktype_titel) AS titel,
+                per_melding.aantal_per_melding AS aantal_per_melding,
+                COUNT(*) AS melding_aantal,
+                {meldingen_sql} AS meldingen
+            FROM ({per_melding_sql}) AS per_melding
+            GROUP BY 1, 2, 3, 5
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            kolommen = [kolom[0] for kolom in cursor.description]
+            return [dict(zip(kolommen, rij)) for rij in cursor.fetchall()]
 
     def taakopdracht_doorlooptijden(self):
         from apps.aliassen.models import OnderwerpAlias
@@ -261,3 +297,148 @@ class TaakopdrachtQuerySet(QuerySet):
             "taakopdracht_aantal",
         )
         return taakopdrachten
+
+    def doorlooptijd_percentielen(self, percentielen, discreet=False):
+        """
+        Aantal, gemiddelde en percentielen van de afhandeltijd in seconden van
+        afgesloten taakopdrachten per taaktype, wijk en onderwerp.
+        """
+        taakopdrachten = (
+            self.filter(afgesloten_op__isnull=False, afhandeltijd__isnull=False)
+            ._onderwerp_en_wijk_annoteren()
+            .values("taaktype", "wijk", "onderwerp")
+            .order_by()
+            .annotate(
+                taaktype_titel=Max("titel"),
+                taakopdracht_aantal=Count("id"),
+                duur_gemiddeld=Avg(Epoch("afhandeltijd")),
+                duur_percentielen=Percentielen(
+                    Epoch("afhandeltijd"), percentielen, discreet=discreet
+                ),
+            )
+        )
+        return [
+            {
+                "taaktype": taakopdracht["taaktype"],
+                "titel": taakopdracht["taaktype_titel"],
+                "wijk": taakopdracht["wijk"],
+                "onderwerp": taakopdracht["onderwerp"],
+                "taakopdracht_aantal": taakopdracht["taakopdracht_aantal"],
+                "duur_gemiddeld": taakopdracht["duur_gemiddeld"],
+                "percentielen": {
+                    percentiel_sleutel(percentiel): waarde
+                    for percentiel, waarde in zip(
+                        percentielen, taakopdracht["duur_percentielen"]
+                    )
+                },
+            }
+            for taakopdracht in taakopdrachten
+        ]
+
+    def doorlooptijd_emmers(self):
+        """
+        Aantal en totale afhandeltijd van afgesloten taakopdrachten per lokale dag,
+        taaktype, wijk, onderwerp en histogram emmer.
+        """
+        emmer = Least(
+            Cast(
+                Floor(
+                    Ln(Greatest(Epoch("afhandeltijd"), Value(1.0)))
+                    * Value(HISTOGRAM_EMMERS_PER_VERDUBBELING / math.log(2))
+                ),
+                IntegerField(),
+            ),
+            Value(HISTOGRAM_AANTAL_EMMERS - 1),
+        )
+        return (
+            self.filter(afgesloten_op__isnull=False, afhandeltijd__isnull=False)
+            ._onderwerp_en_wijk_annoteren()
+            .annotate(dag=TruncDate("afgesloten_op"), emmer=emmer)
+            .values("dag", "taaktype", "wijk", "onderwerp", "emmer")
+            .order_by()
+            .annotate(
+                taaktype_titel=Max("titel"),
+                aantal=Count("id"),
+                duur_totaal=Sum(Epoch("afhandeltijd")),
+            )
+        )
+
+
+class TaakopdrachtDoorlooptijdHistogramQuerySet(QuerySet):
+    def bijwerken(self, vanaf_dag, tot_dag):
+        """
+        Herberekent de histogrammen van de dagen vanaf 'vanaf_dag' tot 'tot_dag'
+        uit de afgesloten taakopdrachten. Geeft het aantal histogrammen terug.
+        """
+        from apps.taken.models import Taakopdracht
+
+        vanaf = timezone.make_aware(datetime.combine(vanaf_dag, time.min))
+        tot = timezone.make_aware(datetime.combine(tot_dag, time.min))
+        bijgewerkt_op = timezone.now()
+
+        histogrammen = {}
+        for rij in Taakopdracht.objects.filter(
+            afgesloten_op__gte=vanaf, afgesloten_op__lt=tot
+        ).doorlooptijd_emmers():
+            sleutel = (rij["dag"], rij["taaktype"], rij["wijk"], str(rij["onderwerp"]))
+            histogram = histogrammen.get(sleutel)
+            if histogram is None:
+                histogram = histogrammen[sleutel] = self.model(
+                    dag=rij["dag"],
+                    taaktype=rij["taaktype"],
+                    titel=rij["taaktype_titel"],
+                    wijk=rij["wijk"],
+                    onderwerp=str(rij["onderwerp"]),
+                    emmers=[0] * HISTOGRAM_AANTAL_EMMERS,
+                    bijgewerkt_op=bijgewerkt_op,
+                )
+            histogram.emmers[rij["emmer"]] += rij["aantal"]
+            histogram.aantal += rij["aantal"]
+            histogram.duur_totaal += rij["duur_totaal"]
+
+        with transaction.atomic():
+            self.filter(dag__gte=vanaf_dag, dag__lt=tot_dag).delete()
+            self.bulk_create(histogrammen.values(), batch_size=1000)
+        return len(histogrammen)
+
+    def doorlooptijd_percentielen(self, percentielen):
+        """
+        Telt de histogrammen per taaktype, wijk en onderwerp op en schat daaruit de
+        percentielen van de afhandeltijd in seconden.
+        """
+        samengevoegd = {}
+        for histogram in self.values(
+            "taaktype", "titel", "wijk", "onderwerp", "aantal", "duur_totaal", "emmers"
+        ).order_by():
+            sleutel = (histogram["taaktype"], histogram["wijk"], histogram["onderwerp"])
+            totaal = samengevoegd.get(sleutel)
+            if totaal is None:
+                samengevoegd[sleutel] = {
+                    **histogram,
+                    "emmers": list(histogram["emmers"]),
+                }
+                continue
+            totaal["aantal"] += histogram["aantal"]
+            totaal["duur_totaal"] += histogram["duur_totaal"]
+            totaal["emmers"] = [
+                a + b for a, b in zip(totaal["emmers"], histogram["emmers"])
+            ]
+
+        return [
+            {
+                "taaktype": totaal["taaktype"],
+                "titel": totaal["titel"],
+                "wijk": totaal["wijk"],
+                "onderwerp": totaal["onderwerp"],
+                "taakopdracht_aantal": totaal["aantal"],
+                "duur_gemiddeld": totaal["duur_totaal"] / totaal["aantal"],
+                "percentielen": {
+                    percentiel_sleutel(percentiel): histogram_percentiel(
+                        totaal["emmers"], totaal["aantal"], percentiel
+                    )
+                    for percentiel in percentielen
+                },
+            }
+            for totaal in samengevoegd.values()
+            if totaal["aantal"]
+        ]
@@ -1,10 +1,11 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from celery import Task, shared_task
 from celery.utils.log import get_task_logger
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import OperationalError, transaction
+from django.utils import timezone
 
 logger = get_task_logger(__name__)
 
@@ -229,3 +230,16 @@ def task_taak_verwijderen(self, taakopdracht_id, gebruiker=None):
         )
 
     return f"De taak is verwijderd in {taakopdracht.applicatie.naam}, o.b.v. taakopdracht met id: {taakopdracht.id}."
+
+
+@shared_task(bind=True)
+def task_taakopdracht_doorlooptijd_histogrammen_bijwerken(self):
+    from apps.taken.models import TaakopdrachtDoorlooptijdHistogram
+
+    tot_dag = timezone.localdate()
+    vanaf_dag = tot_dag - timedelta(
+        days=settings.TAAKOPDRACHT_DOORLOOPTIJD_HISTOGRAM_DAGEN
+    )
+    aantal = TaakopdrachtDoorlooptijdHistogram.objects.bijwerken(vanaf_dag, tot_dag)
+
+    return f"Taakopdracht doorlooptijd histogrammen bijgewerkt, vanaf_dag={vanaf_dag}, histogrammen={aantal}"
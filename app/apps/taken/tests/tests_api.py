@@ -1,4 +1,5 @@
 import copy
+from datetime import timedelta
 
 import requests_mock
 from apps.applicaties.models import Applicatie
@@ -6,7 +7,11 @@ from apps.bijlagen.models import Bijlage
 from apps.instellingen.models import Instelling
 from apps.meldingen.models import Melding
 from apps.status.models import Status
-from apps.taken.models import Taakgebeurtenis
+from apps.taken.models import (
+    Taakgebeurtenis,
+    Taakopdracht,
+    TaakopdrachtDoorlooptijdHistogram,
+)
 from django.urls import reverse
 from django.utils import timezone
 from model_bakery import baker
@@ -239,3 +244,113 @@ class TaakopdrachtStatusAanpassenApiTest(APITestCase):
         bijlagen = Bijlage.objects.all()
         self.assertEqual(taakgebeurtenissen.count(), 2)
         self.assertEqual(bijlagen.count(), 1)
+
+
+class TaakopdrachtDoorlooptijdPercentielenApiTest(APITestCase):
+    def setUp(self):
+        applicatie = baker.make(
+            Applicatie,
+            naam="taakapplicatie",
+            basis_url=MOCK_URL,
+            valide_basis_urls=[MOCK_URL],
+        )
+        for seconden in (60, 120, 600):
+            taakopdracht = baker.make(
+                Taakopdracht,
+                melding=baker.make(Melding, status=baker.make(Status)),
+                applicatie=applicatie,
+                taaktype=TAAKTYPE_MOCK_URL,
+            )
+            Taakopdracht.objects.filter(pk=taakopdracht.pk).update(
+                afgesloten_op=timezone.now(),
+                afhandeltijd=timedelta(seconds=seconden),
+            )
+
+    def test_taakopdracht_doorlooptijd_percentielen(self):
+        client = get_authenticated_client()
+        url = reverse("app:taakopdracht-taakopdracht-doorlooptijd-percentielen")
+
+        response = client.get(url, {"percentielen": "50,100"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 1)
+        statistiek = response.json()[0]
+        self.assertEqual(statistiek["taakopdracht_aantal"], 3)
+        self.assertEqual(statistiek["wijk"], "Onbekend")
+        self.assertEqual(statistiek["percentielen"], {"p50": 120.0, "p100": 600.0})
+
+        response = client.get(url, {"percentielen": "150"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_taakopdracht_doorlooptijd_percentielen_histogram(self):
+        client = get_authenticated_client()
+        vandaag = timezone.localdate()
+        TaakopdrachtDoorlooptijdHistogram.objects.bijwerken(
+            vandaag, vandaag + timedelta(days=1)
+        )
+        url = reverse(
+            "app:taakopdracht-taakopdracht-doorlooptijd-percentielen-histogram"
+        )
+
+        response = client.get(url, {"percentielen": "50", "dag_gte": vandaag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 1)
+        statistiek = response.json()[0]
+        self.assertEqual(statistiek["taakopdracht_aantal"], 3)
+        self.assertAlmostEqual(statistiek["duur_gemiddeld"], 260.0)
+        self.assertLess(abs(statistiek["percentielen"]["p50"] - 120.0), 120.0 * 0.2)
+
+
+class TaaktypeAantallenPerMeldingApiTest(APITestCase):
+    def test_taaktype_aantallen_per_melding(self):
+        client = get_authenticated_client()
+        applicatie = baker.make(
+            Applicatie,
+            naam="taakapplicatie",
+            basis_url=MOCK_URL,
+            valide_basis_urls=[MOCK_URL],
+        )
+        meldingen = baker.make(Melding, _quantity=2)
+        Taakopdracht.objects.bulk_create(
+            [
+                Taakopdracht(
+                    melding=melding,
+                    applicatie=applicatie,
+                    taaktype=TAAKTYPE_MOCK_URL,
+                    titel="mock_title",
+                )
+                for melding in meldingen + [meldingen[0]]
+            ]
+            + [
+                Taakopdracht(
+                    melding=meldingen[1],
+                    applicatie=applicatie,
+                    taaktype=f"{TAAKTYPE_MOCK_URL}ander/",
+                    titel="ander",
+                )
+            ]
+        )
+        url = reverse("app:taakopdracht-taaktype-aantallen-per-melding")
+
+        response = client.get(url, {"inclusief-melding": "true"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        aantallen = sorted(
+            response.json(),
+            key=lambda a: (a["taaktype"], a["aantal_per_melding"]),
+        )
+        self.assertEqual(
+            [
+                (a["taaktype"], a["aantal_per_melding"], a["melding_aantal"])
+                for a in aantallen
+            ],
+            [
+                (TAAKTYPE_MOCK_URL, 1, 1),
+                (TAAKTYPE_MOCK_URL, 2, 1),
+                (f"{TAAKTYPE_MOCK_URL}ander/", 1, 1),
+            ],
+        )
+        self.assertEqual(aantallen[0]["meldingen"], [str(meldingen[1].uuid)])
+        self.assertEqual(aantallen[0]["wijk"], "Onbekend")
+        self.assertEqual(aantallen[0]["titel"], "mock_title")
+
+        response = client.get(url)
+        self.assertEqual(response.json()[0]["meldingen"], [])
@@ -1,8 +1,15 @@
 import uuid
 
 from apps.meldingen.models import Melding
-from apps.taken.filtersets import TaakopdrachtFilter
-from apps.taken.models import Taakgebeurtenis, Taakopdracht
+from apps.taken.filtersets import (
+    TaakopdrachtDoorlooptijdHistogramFilter,
+    TaakopdrachtFilter,
+)
+from apps.taken.models import (
+    Taakgebeurtenis,
+    Taakopdracht,
+    TaakopdrachtDoorlooptijdHistogram,
+)
 from apps.taken.serializers import (
     TaakgebeurtenisSerializer,
     TaakgebeurtenisStatusSerializer,
@@ -22,6 +29,7 @@ from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import mixins, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from utils.conditional import ConditioneleGetMixin, conditionele_get
 
 
 class TaakgebeurtenisViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
@@ -36,6 +44,7 @@ class TaakgebeurtenisViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet)
 
 
 class TaakopdrachtViewSet(
+    ConditioneleGetMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.DestroyModelMixin,
@@ -65,12 +74,28 @@ class TaakopdrachtViewSet(
 
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = TaakopdrachtFilter
+    cursor_ordering_fields = (
+        "-id",
+        "id",
+        "-aangemaakt_op",
+        "aangemaakt_op",
+        "-aangepast_op",
+        "aangepast_op",
+    )
 
     def get_serializer_class(self):
         if self.action == "retrieve":
             return self.serializer_detail_class
         return super().get_serializer_class()
 
+    @conditionele_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditionele_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @extend_schema(
         description="Verander de status van een taak",
         request=TaakgebeurtenisStatusSerializer,
@@ -202,7 +227,8 @@ class TaakopdrachtViewSet(
                 context={"request": request},
                 many=True,
             )
-        return Response(serializer.data)
+            data = serializer.data
+        return Response(data)
 
     @extend_schema(
         description="Taakopdracht doorlooptijden en aantallen voor afgeronde taken per taaktype. Uniek o.b.v. onderwerp, wijk en taaktype ",
@@ -235,6 +261,115 @@ class TaakopdrachtViewSet(
             )
         return Response(serializer.data)
 
+    def get_percentielen(self, request):
+        try:
+            percentielen = [
+                float(percentiel) / 100
+                for percentiel in request.query_params.get(
+                    "percentielen", "50,90,99"
+                ).split(",")
+            ]
+        except ValueError:
+            return None
+        if not all(0 <= percentiel <= 1 for percentiel in percentielen):
+            return None
+        return percentielen
+
+    @extend_schema(
+        description="Aantal, gemiddelde en percentielen van de afhandeltijd in seconden van afgesloten taakopdrachten. Uniek o.b.v. onderwerp, wijk en taaktype. De percentielen worden exact berekend, continu (geïnterpoleerd) of discreet (een voorkomende afhandeltijd).",
+        responses={status.HTTP_200_OK: TaaktypeAantallenSerializer()},
+        parameters=[
+            OpenApiParameter(
+                "afgesloten_op_gte",
+                OpenApiTypes.DATETIME,
+                OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                "afgesloten_op_lt",
+                OpenApiTypes.DATETIME,
+                OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                "percentielen",
+                OpenApiTypes.STR,
+                OpenApiParameter.QUERY,
+                description="Komma gescheiden percentielen van 0 tot en met 100, standaard 50,90,99",
+            ),
+            OpenApiParameter(
+                "methode",
+                OpenApiTypes.STR,
+                OpenApiParameter.QUERY,
+                enum=["continu", "discreet"],
+            ),
+        ],
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="taakopdracht-doorlooptijd-percentielen",
+        serializer_class=TaaktypeAantallenSerializer,
+    )
+    def taakopdracht_doorlooptijd_percentielen(self, request):
+        percentielen = self.get_percentielen(request)
+        if percentielen is None:
+            return Response(
+                {"percentielen": "Kies percentielen van 0 tot en met 100"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        methode = request.query_params.get("methode", "continu")
+        if methode not in ("continu", "discreet"):
+            return Response(
+                {"methode": "Kies continu of discreet"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        with db(settings.READONLY_DATABASE_KEY):
+            serializer = TaaktypeAantallenSerializer(
+                self.filter_queryset(self.get_queryset()).doorlooptijd_percentielen(
+                    percentielen, discreet=methode == "discreet"
+                ),
+                context={"request": request},
+                many=True,
+            )
+        return Response(serializer.data)
+
+    @extend_schema(
+        description="Aantal, gemiddelde en geschatte percentielen van de afhandeltijd in seconden van afgesloten taakopdrachten, uit de dagelijkse histogrammen. Uniek o.b.v. onderwerp, wijk en taaktype. Geschikt voor lange periodes, de schatting wijkt hooguit een emmer breedte (19%) af. Dagen die nog niet zijn berekend, zoals vandaag, tellen niet mee.",
+        responses={status.HTTP_200_OK: TaaktypeAantallenSerializer()},
+        parameters=[
+            OpenApiParameter(
+                "percentielen",
+                OpenApiTypes.STR,
+                OpenApiParameter.QUERY,
+                description="Komma gescheiden percentielen van 0 tot en met 100, standaard 50,90,99",
+            ),
+        ],
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="taakopdracht-doorlooptijd-percentielen-histogram",
+        serializer_class=TaaktypeAantallenSerializer,
+        queryset=TaakopdrachtDoorlooptijdHistogram.objects.all(),
+        filter_backends=(filters.DjangoFilterBackend,),
+        filterset_class=TaakopdrachtDoorlooptijdHistogramFilter,
+    )
+    def taakopdracht_doorlooptijd_percentielen_histogram(self, request):
+        percentielen = self.get_percentielen(request)
+        if percentielen is None:
+            return Response(
+                {"percentielen": "Kies percentielen van 0 tot en met 100"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        with db(settings.READONLY_DATABASE_KEY):
+            serializer = TaaktypeAantallenSerializer(
+                self.filter_queryset(self.get_queryset()).doorlooptijd_percentielen(
+                    percentielen
+                ),
+                context={"request": request},
+                many=True,
+            )
+        return Response(serializer.data)
+
     @extend_schema(
         description="Niewe taakopdracht. Uniek o.b.v. onderwerp, wijk en taaktype ",
         responses={status.HTTP_200_OK: TaaktypeAantallenSerializer()},
@@ -262,6 +262,8 @@ HIGHEST_PRIORITY_TASKS = [
 HIGH_PRIORITY_TASKS = [
     "config.celery.test_urgent_task",
     "apps.bijlagen.tasks.task_aanmaken_afbeelding_versies",
+    "apps.signalen.tasks.task_signaal_aanvraag_verwerken",
+    "apps.meldingen.tasks.task_melding_detail_cache_legen",
 ]
 DEFAULT_PRIORITY_TASKS = [
     "config.celery.test_regular_task",
@@ -274,6 +276,33 @@ DEFAULT_PRIORITY_TASKS = [
 LOW_PRIORITY_TASKS = []
 CELERY_TASK_ROUTES = "config.celery.task_router"
 
+CELERY_BEAT_SCHEDULE = {
+    "onderwerp_catalogus_vernieuwen": {
+        "task": "apps.aliassen.tasks.task_onderwerp_catalogus_vernieuwen",
+        "schedule": 60 * 15,
+    },
+    "signaal_aanvragen_herstarten": {
+        "task": "apps.signalen.tasks.task_signaal_aanvragen_herstarten",
+        "schedule": 60 * 10,
+    },
+    "melding_status_buurt_aantallen_herbouwen": {
+        "task": "apps.meldingen.tasks.task_melding_status_buurt_aantallen_herbouwen",
+        "schedule": 60 * 60 * 24,
+    },
+    "melding_buurt_aantallen_bijwerken": {
+        "task": "apps.meldingen.tasks.task_melding_buurt_aantallen_bijwerken",
+        "schedule": 60 * 5,
+    },
+    "melding_buurt_aantallen_herbouwen": {
+        "task": "apps.meldingen.tasks.task_melding_buurt_aantallen_herbouwen",
+        "schedule": 60 * 60 * 24,
+    },
+    "taakopdracht_doorlooptijd_histogrammen_bijwerken": {
+        "task": "apps.taken.tasks.task_taakopdracht_doorlooptijd_histogrammen_bijwerken",
+        "schedule": 60 * 60 * 6,
+    },
+}
+
 
 if ENVIRONMENT in ["unittest", "development"]:
     DJANGO_TEST_USERNAME = os.getenv("DJANGO_TEST_USERNAME", "test")
@@ -323,6 +352,74 @@ TAAKTYPE_APPLICATIE_URL = os.getenv(
     "TAAKTYPE_APPLICATIE_URL", "https://taakr.forzamor.nl"
 )
 
+SIGNAAL_BATCH_MAX_AANTAL = int(os.getenv("SIGNAAL_BATCH_MAX_AANTAL", "500"))
+SIGNAAL_BATCH_CHUNK_GROOTTE = int(os.getenv("SIGNAAL_BATCH_CHUNK_GROOTTE", "100"))
+
+# Paginatie count strategieen: exact, schatting (EXPLAIN) of cache
+PAGINATIE_COUNT_STRATEGIE = os.getenv("PAGINATIE_COUNT_STRATEGIE", "exact")
+# Onder dit aantal geschatte rijen wordt alsnog exact geteld
+PAGINATIE_SCHATTING_DREMPEL = int(os.getenv("PAGINATIE_SCHATTING_DREMPEL", "10000"))
+PAGINATIE_COUNT_CACHE_TIMEOUT = int(os.getenv("PAGINATIE_COUNT_CACHE_TIMEOUT", "60"))
+PAGINATIE_FILTER_OPTIONS_CACHE_TIMEOUT = int(
+    os.getenv("PAGINATIE_FILTER_OPTIONS_CACHE_TIMEOUT", "300")
+)
+
+MELDING_DETAIL_CACHE_TIMEOUT = int(
+    os.getenv("MELDING_DETAIL_CACHE_TIMEOUT", str(60 * 60 * 24))
+)
+
+# Vector tiles worden per tegel en filter combinatie kort gecached
+MELDING_TEGELS_CACHE_TIMEOUT = int(os.getenv("MELDING_TEGELS_CACHE_TIMEOUT", "60"))
+MELDING_TEGELS_MAX_ZOOM = int(os.getenv("MELDING_TEGELS_MAX_ZOOM", "22"))
+
+# 0 zet de cache voor melding clusters uit
+MELDING_CLUSTERS_CACHE_TIMEOUT = int(os.getenv("MELDING_CLUSTERS_CACHE_TIMEOUT", "60"))
+
+# Aantal meldingen dat per keer uit de server side cursor van een export wordt gehaald
+MELDING_EXPORT_CHUNK_SIZE = int(os.getenv("MELDING_EXPORT_CHUNK_SIZE", "2000"))
+
+# De veranderingen feed laat de laatste seconden weg, zodat gebeurtenissen uit nog
+# lopende transacties niet worden overgeslagen
+MELDING_VERANDERINGEN_VERTRAGING_SECONDEN = int(
+    os.getenv("MELDING_VERANDERINGEN_VERTRAGING_SECONDEN", "5")
+)
+
+# Het bijwerken van de melding buurt aantallen kijkt zoveel minuten terug voor de
+# vorige keer, voor meldingen uit transacties die toen nog niet waren afgerond
+MELDING_BUURT_AANTALLEN_MARGE_MINUTEN = int(
+    os.getenv("MELDING_BUURT_AANTALLEN_MARGE_MINUTEN", "10")
+)
+
+# De taakopdracht doorlooptijd histogrammen van zoveel afgelopen dagen worden
+# periodiek opnieuw berekend, voor taakopdrachten die met terugwerkende kracht
+# zijn afgesloten
+TAAKOPDRACHT_DOORLOOPTIJD_HISTOGRAM_DAGEN = int(
+    os.getenv("TAAKOPDRACHT_DOORLOOPTIJD_HISTOGRAM_DAGEN", "7")
+)
+
+# Dubbele kandidaten: afstand in meters en periode in dagen
+DUBBELE_KANDIDATEN_AFSTAND = float(os.getenv("DUBBELE_KANDIDATEN_AFSTAND", "50"))
+DUBBELE_KANDIDATEN_MAX_AANTAL = int(os.getenv("DUBBELE_KANDIDATEN_MAX_AANTAL", "10"))
+DUBBELE_KANDIDATEN_DAGEN = int(os.getenv("DUBBELE_KANDIDATEN_DAGEN", "30"))
+# Een nieuw signaal wordt alleen automatisch aan de dichtstbijzijnde open melding
+# met hetzelfde onderwerp gekoppeld als deze afstand in meters groter is dan 0
+SIGNAAL_AUTOMATISCH_KOPPELEN_AFSTAND = float(
+    os.getenv("SIGNAAL_AUTOMATISCH_KOPPELEN_AFSTAND", "0")
+)
+
+ONDERWERP_CATALOGUS_LOKAAL_MAX_GROOTTE = int(
+    os.getenv("ONDERWERP_CATALOGUS_LOKAAL_MAX_GROOTTE", "1024")
+)
+ONDERWERP_CATALOGUS_LOKAAL_TIMEOUT = int(
+    os.getenv("ONDERWERP_CATALOGUS_LOKAAL_TIMEOUT", "60")
+)
+ONDERWERP_CATALOGUS_CACHE_TIMEOUT = int(
+    os.getenv("ONDERWERP_CATALOGUS_CACHE_TIMEOUT", str(60 * 60 * 24))
+)
+ONDERWERP_ALIAS_VERVERST_MAX_SECONDEN = int(
+    os.getenv("ONDERWERP_ALIAS_VERVERST_MAX_SECONDEN", str(60 * 60))
+)
+
 # Django security settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_REFERRER_POLICY = "strict-origin"
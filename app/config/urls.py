@@ -20,7 +20,7 @@ from apps.signalen.views import (
     UpdateSignaalSignaalUrlSummaryView,
     UpdateSignaalSignaalUrlView,
 )
-from apps.signalen.viewsets import SignaalViewSet
+from apps.signalen.viewsets import SignaalAanvraagViewSet, SignaalViewSet
 from apps.status.viewsets import StatusViewSet
 from apps.taken.viewsets import TaakgebeurtenisViewSet, TaakopdrachtViewSet
 from debug_toolbar.toolbar import debug_toolbar_urls
@@ -39,6 +39,9 @@ from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
 router.register(r"signaal", SignaalViewSet, basename="signaal")
+router.register(
+    r"signaal-aanvraag", SignaalAanvraagViewSet, basename="signaal-aanvraag"
+)
 router.register(r"melding", MeldingViewSet, basename="melding")
 router.register(
     r"meldinggebeurtenis", MeldinggebeurtenisViewSet, basename="meldinggebeurtenis"
@@ -0,0 +1,146 @@
+import functools
+import hashlib
+
+from config.context import db
+from django.conf import settings
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def conditionele_get(handler):
+    """
+    Decorator voor list en retrieve van een viewset met ConditioneleGetMixin.
+    Als de ETag of Last-Modified van de client nog actueel is, wordt 304 teruggegeven
+    zonder de queryset te prefetchen of te serialiseren.
+
+    Alleen een request met If-None-Match of If-Modified-Since bepaalt vooraf de versie,
+    voor een gewoon request komt de versie van het geserialiseerde object of de pagina.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup_waarde = kwargs.get(lookup_url_kwarg)
+
+        versie = None
+        if self.is_conditioneel(request):
+            versie = self.get_versie_waarden(request, lookup_waarde)
+            if versie is not None:
+                etag, laatst_aangepast = self.versie_headers(request, versie)
+                if self.niet_gewijzigd(request, etag, laatst_aangepast):
+                    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                    return self.versie_headers_zetten(response, etag, laatst_aangepast)
+
+        response = handler(self, request, *args, **kwargs)
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        if versie is None:
+            versie = self.get_response_versie_waarden(request, lookup_waarde)
+        if versie is None:
+            return response
+        return self.versie_headers_zetten(
+            response, *self.versie_headers(request, versie)
+        )
+
+    return wrapper
+
+
+class ConditioneleGetMixin:
+    """
+    ETag en Last-Modified voor list en retrieve, zie conditionele_get.
+
+    Voor een detail worden alleen 'versie_velden' van het object opgehaald, uit de
+    queryset van de viewset zonder prefetches, zodat dezelfde afscherming geldt. Voor een
+    lijst bestaat de versie uit de count van de paginator en de 'versie_velden' van de
+    objecten op de pagina. Bij een conditioneel request wordt die pagina zonder
+    prefetches opgehaald van de readonly database, net als de lijst zelf. Bij een
+    gewoon request komt de versie van de pagina die de handler al heeft opgehaald.
+    """
+
+    versie_velden = ("aangepast_op",)
+
+    def paginate_queryset(self, queryset):
+        pagina = super().paginate_queryset(queryset)
+        self._versie_pagina = pagina
+        return pagina
+
+    def is_conditioneel(self, request):
+        return bool(
+            request.headers.get("If-None-Match")
+            or request.headers.get("If-Modified-Since")
+        )
+
+    def _object_versie(self, lookup_waarde):
+        waarden = (
+            self.get_queryset()
+            .filter(**{self.lookup_field: lookup_waarde})
+            .prefetch_related(None)
+            .values_list(*self.versie_velden)
+            .first()
+        )
+        if waarden is None:
+            return None
+        return waarden, dict(zip(self.versie_velden, waarden)).get("aangepast_op")
+
+    def _pagina_versie(self, pagina):
+        waarden = (
+            getattr(self.paginator, "count", None),
+            [
+                (obj.pk, *(getattr(obj, veld) for veld in self.versie_velden))
+                for obj in pagina
+            ],
+        )
+        laatst_aangepast = max(
+            (obj.aangepast_op for obj in pagina if obj.aangepast_op), default=None
+        )
+        return waarden, laatst_aangepast
+
+    def get_versie_waarden(self, request, lookup_waarde=None):
+        if lookup_waarde is not None:
+            return self._object_versie(lookup_waarde)
+
+        with db(settings.READONLY_DATABASE_KEY):
+            pagina = self.paginate_queryset(
+                self.filter_queryset(self.get_queryset()).prefetch_related(None)
+            )
+        if pagina is None:
+            return None
+        return self._pagina_versie(pagina)
+
+    def get_response_versie_waarden(self, request, lookup_waarde=None):
+        if lookup_waarde is not None:
+            return self._object_versie(lookup_waarde)
+
+        pagina = getattr(self, "_versie_pagina", None)
+        if pagina is None:
+            return None
+        return self._pagina_versie(pagina)
+
+    def versie_headers(self, request, versie):
+        waarden, laatst_aangepast = versie
+        # De querystring hoort bij de sleutel, b.v. ?fields= of ?offset= geven een ander document
+        sleutel = f"{request.get_full_path()}:{waarden}"
+        etag = f"W/{quote_etag(hashlib.sha1(sleutel.encode()).hexdigest())}"
+        return etag, laatst_aangepast
+
+    def versie_headers_zetten(self, response, etag, laatst_aangepast):
+        response["ETag"] = etag
+        if laatst_aangepast:
+            response["Last-Modified"] = http_date(laatst_aangepast.timestamp())
+        return response
+
+    def niet_gewijzigd(self, request, etag, laatst_aangepast):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            # Weak comparison, zoals voorgeschreven voor If-None-Match
+            etags = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+            return etag.removeprefix("W/") in etags or "*" in etags
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        return bool(
+            if_modified_since
+            and laatst_aangepast
+            and int(laatst_aangepast.timestamp()) <= if_modified_since
+        )
@@ -0,0 +1,56 @@
+import csv
+import json
+from datetime import date, datetime
+
+EXPORT_REGELS_PER_CHUNK = 500
+
+
+class Echo:
+    """
+    Pseudo buffer voor csv.writer, writerow geeft de regel terug i.p.v. die te bewaren.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _waarde(waarde):
+    if isinstance(waarde, (datetime, date)):
+        return waarde.isoformat()
+    return str(waarde)
+
+
+def _csv_waarde(waarde):
+    if waarde is None:
+        return ""
+    if isinstance(waarde, (list, tuple)):
+        return ", ".join(_waarde(w) for w in waarde)
+    return _waarde(waarde)
+
+
+def _gebundeld(regels, regels_per_chunk=EXPORT_REGELS_PER_CHUNK):
+    # Niet elke regel als losse chunk naar de client sturen
+    chunk = []
+    for regel in regels:
+        chunk.append(regel)
+        if len(chunk) >= regels_per_chunk:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def ndjson_stream(rijen):
+    return _gebundeld(
+        json.dumps(rij, default=_waarde, ensure_ascii=False) + "\n" for rij in rijen
+    )
+
+
+def csv_stream(rijen, velden):
+    def regels():
+        writer = csv.writer(Echo(), csv.excel)
+        yield "﻿" + writer.writerow(velden)
+        for rij in rijen:
+            yield writer.writerow([_csv_waarde(rij.get(veld)) for veld in velden])
+
+    return _gebundeld(regels())
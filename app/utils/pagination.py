@@ -1,7 +1,16 @@
+import base64
+import hashlib
+import json
 from collections import OrderedDict
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, F, JSONField, Q, Value, When
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import LimitOffsetPagination as DRFLimitOffsetPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class LimitOffsetPagination(DRFLimitOffsetPagination):
@@ -34,23 +43,257 @@ class LimitOffsetPagination(DRFLimitOffsetPagination):
     Het tweede item wordt gebruikt voor de distinct en count in de queryset
     Met het derde item wordt de value(leesbare waarde) opgezocht in het record, ook kan je hier in een dict uit een json field de waarde halen.
 
+    De filter options van alle velden worden in één query met GROUPING SETS bepaald en voor
+    PAGINATIE_FILTER_OPTIONS_CACHE_TIMEOUT seconden gecached per pad en prefilter parameters.
+    Met 'filter_options_aantallen = True' op de viewset, of de query parameter 'filter_options_aantallen',
+    bevat elke optie het aantal records in de gefilterde queryset, dan tellen alle filter parameters mee in de cache key.
+    Met filter_options_ongeldig_maken(model) worden de gecachte filter options van een model ongeldig.
+
+    Cursor paginatie
+    Als de viewset de attribute 'cursor_ordering_fields' heeft, kan een client met de query parameter 'cursor'
+    (leeg voor de eerste pagina) kiezen voor keyset paginatie in plaats van limit/offset.
+
+    cursor_ordering_fields = ("-id", "id", "-origineel_aangemaakt", "origineel_aangemaakt")
+
+    Het eerste item is de standaard sortering, met de 'ordering' query parameter kan een van de andere
+    worden gekozen. Het id wordt altijd als tweede sortering gebruikt, zodat de volgorde stabiel is.
+    Er wordt geen count uitgevoerd en diepe pagina's zijn even snel als de eerste.
+
+    Count strategieen
+    Met de query parameter 'count_strategie', of de attribute 'count_strategie' op de viewset, kan worden
+    gekozen hoe 'count' wordt bepaald. De gebruikte strategie staat in de response onder 'count_strategie'.
+    - exact: SELECT COUNT(*), de standaard
+    - schatting: het aantal rijen volgens de query planner (EXPLAIN), bij minder dan
+      PAGINATIE_SCHATTING_DREMPEL geschatte rijen wordt alsnog exact geteld
+    - cache: exact, maar voor PAGINATIE_COUNT_CACHE_TIMEOUT seconden bewaard in de cache per pad en filters
     """
 
+    filter_options_aantallen_query_param = "filter_options_aantallen"
+    filter_options_cache_key_prefix = "paginatie_filter_options"
+
+    count_strategie_query_param = "count_strategie"
+    count_strategieen = ("exact", "schatting", "cache")
+    count_cache_key_prefix = "paginatie_count"
+    count_negeer_query_params = (
+        "limit",
+        "offset",
+        "cursor",
+        "count_strategie",
+        "filter_options_aantallen",
+    )
+
+    cursor_query_param = "cursor"
+    cursor_query_description = "Keyset paginatie, leeg voor de eerste pagina, daarna de cursor uit 'next' of 'previous'."
+    cursor_ordering_query_param = "ordering"
+    cursor_altijd_volgende = False
+
     def paginate_queryset(
         self, filtered_queryset, request, view=None
     ):  # pragma: no cover
         self.filter_options = {}
         if view and hasattr(view, "filter_options_fields"):
-            self.filter_options = self._get_filter_options(
-                filtered_queryset,
-                view.get_prefiltered_queryset(),
-                view.filter_options_fields,
+            self.request = request
+            self.filter_options = self._get_gecachte_filter_options(
+                filtered_queryset, view
+            )
+        self.cursor_modus = bool(
+            self.cursor_query_param in request.query_params
+            and self.get_cursor_ordering_fields(view)
+        )
+        if self.cursor_modus:
+            return self._cursor_paginate_queryset(filtered_queryset, request, view)
+
+        self.count_strategie = self._get_count_strategie(request, view)
+        pagina = super().paginate_queryset(filtered_queryset, request, view)
+        if pagina is not None and self.count_strategie != "exact":
+            # Een te lage schatting mag de next link niet laten verdwijnen
+            self.count = max(
+                self.count,
+                self.offset + len(pagina) + int(len(pagina) == self.limit),
+            )
+        return pagina
+
+    def _get_count_strategie(self, request, view):
+        count_strategie = request.query_params.get(
+            self.count_strategie_query_param
+        ) or getattr(view, "count_strategie", settings.PAGINATIE_COUNT_STRATEGIE)
+        if count_strategie not in self.count_strategieen:
+            raise ValidationError(
+                {
+                    self.count_strategie_query_param: f"Kies uit: {', '.join(self.count_strategieen)}"
+                }
+            )
+        return count_strategie
+
+    def get_count(self, queryset):
+        if self.count_strategie == "schatting":
+            schatting = self._geschatte_count(queryset)
+            if (
+                schatting is not None
+                and schatting >= settings.PAGINATIE_SCHATTING_DREMPEL
+            ):
+                return schatting
+            self.count_strategie = "exact"
+        elif self.count_strategie == "cache":
+            return self._gecachte_count(queryset)
+        return super().get_count(queryset)
+
+    def _geschatte_count(self, queryset):
+        try:
+            plan = json.loads(queryset.order_by().explain(format="json"))
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except Exception:
+            return None
+
+    def _count_cache_key(self):
+        query_params = sorted(
+            (key, value)
+            for key, values in self.request.query_params.lists()
+            if key not in self.count_negeer_query_params
+            for value in values
+        )
+        sleutel = hashlib.sha1(
+            json.dumps([self.request.path, query_params]).encode()
+        ).hexdigest()
+        return f"{self.count_cache_key_prefix}:{sleutel}"
+
+    def _gecachte_count(self, queryset):
+        cache_key = self._count_cache_key()
+        count = cache.get(cache_key)
+        if count is None:
+            count = super().get_count(queryset)
+            cache.set(cache_key, count, settings.PAGINATIE_COUNT_CACHE_TIMEOUT)
+        return count
+
+    def get_cursor_ordering_fields(self, view):
+        return getattr(view, "cursor_ordering_fields", None)
+
+    def _cursor_ordering(self, request, view):
+        cursor_ordering_fields = self.get_cursor_ordering_fields(view)
+        ordering = request.query_params.get(self.cursor_ordering_query_param)
+        if not ordering:
+            return cursor_ordering_fields[0]
+        ordering = ordering.split(",")[0].strip()
+        if ordering not in cursor_ordering_fields:
+            raise ValidationError(
+                {
+                    self.cursor_ordering_query_param: f"Cursor paginatie ondersteunt alleen: {', '.join(cursor_ordering_fields)}"
+                }
+            )
+        return ordering
+
+    def _encode_cursor(self, positie, terug):
+        # str i.p.v. DjangoJSONEncoder, die microseconden van datetimes afkapt
+        data = json.dumps({"p": positie, "t": terug}, default=str)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def _decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            return data["p"], bool(data["t"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound("Ongeldige cursor")
+
+    def _cursor_paginate_queryset(self, queryset, request, view):
+        self.request = request
+        self.limit = self.get_limit(request) or self.default_limit
+        ordering = self._cursor_ordering(request, view)
+        aflopend = ordering.startswith("-")
+        self.cursor_veld = ordering.lstrip("-")
+        positie, terug = self._decode_cursor(request)
+
+        # Bij 'previous' wordt in omgekeerde volgorde gezocht en het resultaat weer omgedraaid
+        omgekeerd = aflopend != terug
+        richting = "-" if omgekeerd else ""
+        queryset = queryset.order_by(f"{richting}{self.cursor_veld}", f"{richting}pk")
+        if positie:
+            lookup = "lt" if omgekeerd else "gt"
+            waarde, pk = positie
+            queryset = queryset.filter(
+                Q(**{f"{self.cursor_veld}__{lookup}": waarde})
+                | Q(**{self.cursor_veld: waarde, f"pk__{lookup}": pk})
+            )
+
+        resultaten = list(queryset[: self.limit + 1])
+        heeft_meer = len(resultaten) > self.limit
+        resultaten = resultaten[: self.limit]
+        if terug:
+            resultaten.reverse()
+
+        self.volgende_positie = None
+        self.vorige_positie = None
+        if resultaten:
+            if heeft_meer or terug or self.cursor_altijd_volgende:
+                self.volgende_positie = self._cursor_positie(resultaten[-1])
+            if (heeft_meer and terug) or (positie and not terug):
+                self.vorige_positie = self._cursor_positie(resultaten[0])
+        elif self.cursor_altijd_volgende and not terug:
+            self.volgende_positie = positie
+        return resultaten
+
+    def _cursor_positie(self, instance):
+        return [getattr(instance, self.cursor_veld), instance.pk]
+
+    def _cursor_link(self, positie, terug):
+        if positie is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.offset_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self._encode_cursor(positie, terug)
+        )
+
+    def get_next_link(self):
+        if getattr(self, "cursor_modus", False):
+            return self._cursor_link(self.volgende_positie, False)
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if getattr(self, "cursor_modus", False):
+            return self._cursor_link(self.vorige_positie, True)
+        return super().get_previous_link()
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append(
+            {
+                "name": self.count_strategie_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Hoe 'count' wordt bepaald",
+                "schema": {"type": "string", "enum": list(self.count_strategieen)},
+            }
+        )
+        if self.get_cursor_ordering_fields(view):
+            parameters.append(
+                {
+                    "name": self.cursor_query_param,
+                    "required": False,
+                    "in": "query",
+                    "description": self.cursor_query_description,
+                    "schema": {"type": "string"},
+                }
             )
-        return super().paginate_queryset(filtered_queryset, request, view)
+        return parameters
 
     def get_paginated_response(self, data):
+        if self.cursor_modus:
+            return Response(
+                OrderedDict(
+                    [
+                        ("next", self.get_next_link()),
+                        ("previous", self.get_previous_link()),
+                        ("results", data),
+                    ]
+                )
+            )
         default_repsonse_data = [
             ("count", self.count),
+            ("count_strategie", self.count_strategie),
             ("next", self.get_next_link()),
             ("previous", self.get_previous_link()),
             ("results", data),
@@ -59,7 +302,63 @@ class LimitOffsetPagination(DRFLimitOffsetPagination):
             default_repsonse_data.insert(3, ("filter_options", self.filter_options))
         return Response(OrderedDict(default_repsonse_data))
 
-    def _get_filter_options(self, f_qs, qs, fields=[]):
+    def _get_filter_options_aantallen(self, view):
+        aantallen = self.request.query_params.get(
+            self.filter_options_aantallen_query_param
+        )
+        if aantallen is not None:
+            return aantallen.lower() in ("1", "true")
+        return getattr(view, "filter_options_aantallen", False)
+
+    def _filter_options_cache_key(self, view, model, aantallen):
+        # Zonder aantallen hangen de opties alleen af van de prefilter parameters
+        pre_filterset_class = getattr(view, "pre_filterset_class", None)
+        query_params = sorted(
+            (key, value)
+            for key, values in self.request.query_params.lists()
+            if key not in self.count_negeer_query_params
+            and key != "ordering"
+            and (
+                aantallen
+                or pre_filterset_class is None
+                or key in pre_filterset_class.base_filters
+            )
+            for value in values
+        )
+        versie = cache.get(filter_options_versie_key(model), 0)
+        sleutel = hashlib.sha1(
+            json.dumps(
+                [self.request.path, query_params, aantallen, versie], default=str
+            ).encode()
+        ).hexdigest()
+        return f"{self.filter_options_cache_key_prefix}:{sleutel}"
+
+    def _get_gecachte_filter_options(self, filtered_queryset, view):
+        aantallen = self._get_filter_options_aantallen(view)
+        cache_key = self._filter_options_cache_key(
+            view, filtered_queryset.model, aantallen
+        )
+        filter_options = cache.get(cache_key)
+        if filter_options is None:
+            filter_options = self._get_filter_options(
+                filtered_queryset,
+                view.get_prefiltered_queryset(),
+                view.filter_options_fields,
+                aantallen=aantallen,
+            )
+            cache.set(
+                cache_key,
+                filter_options,
+                settings.PAGINATIE_FILTER_OPTIONS_CACHE_TIMEOUT,
+            )
+        return filter_options
+
+    def _get_filter_options(self, f_qs, qs, fields=[], aantallen=False):
+        """
+        Eén query voor alle velden: per veld is er een grouping set over de key,
+        value, fallback value en group kolommen. Met 'aantallen' wordt per optie
+        geteld hoeveel records ook in de gefilterde queryset zitten.
+        """
         out = {}
 
         def value_lookup(obj, key, fallback_obj, f: list | tuple):
@@ -71,6 +370,7 @@ class LimitOffsetPagination(DRFLimitOffsetPagination):
                 return obj
             return key
 
+        velden = []
         for f in fields:
             f = f if isinstance(f, (list, tuple)) else (f,)
             key = f[1] if len(f) > 1 and f[1] else f[0]
@@ -79,19 +379,124 @@ class LimitOffsetPagination(DRFLimitOffsetPagination):
                 f[3] if len(f) > 3 and f[3] else value_lookup_str
             )
             group = f[4] if len(f) > 4 and f[4] else key
-            f_dict = {
-                ll[0]: (value_lookup(ll[1], ll[0], ll[2], f), ll[3], 0)
-                for ll in qs.order_by(key)
-                .values_list(key, value_lookup_str, fallback_value_lookup_str, group)
-                .distinct(key)
-            }
-            # ff_dict = {
-            #     fl[0]: (value_lookup(fl[1], fl[0], fl[2], f), fl[3], fl[4])
-            #     for fl in f_qs.order_by(key)
-            #     .values_list(key, value_lookup_str, fallback_value_lookup_str, group)
-            #     .annotate(count=Count(key))
-            # }
-            # f_dict.update(ff_dict)
-            f_dict = {k: v for k, v in f_dict.items() if k}
+            velden.append(
+                (f, (key, value_lookup_str, fallback_value_lookup_str, group))
+            )
+        if not velden:
+            return out
+
+        kolommen = list(dict.fromkeys(k for _, lookups in velden for k in lookups))
+        # values() geeft kolommen uit joins geen alias, daarom eigen aliassen
+        aliassen = {kolom: f"_filter_option_{i}" for i, kolom in enumerate(kolommen)}
+        inner = qs.order_by().annotate(
+            **{alias: F(kolom) for kolom, alias in aliassen.items()}
+        )
+        if aantallen:
+            inner = inner.annotate(
+                _in_selectie=Case(
+                    When(pk__in=f_qs.order_by().values("pk"), then=Value(1)),
+                    default=Value(0),
+                )
+            )
+        inner = inner.values(
+            *aliassen.values(), *(["_in_selectie"] if aantallen else [])
+        )
+        json_kolommen = {
+            kolom
+            for kolom, alias in aliassen.items()
+            if isinstance(inner.query.annotations[alias].output_field, JSONField)
+        }
+
+        connection = connections[inner.db]
+
+        def quote(kolom):
+            return connection.ops.quote_name(aliassen[kolom])
+
+        inner_sql, params = inner.query.get_compiler(inner.db).as_sql()
+        grouping_sets = ", ".join(
+            "(" + ", ".join(quote(kolom) for kolom in dict.fromkeys(lookups)) + ")"
+            for _, lookups in velden
+        )
+        sql = (
+            f"SELECT {', '.join(quote(kolom) for kolom in kolommen)}, "
+            f"GROUPING({', '.join(quote(kolom) for kolom in kolommen)}), "
+            f"{'SUM(_in_selectie)' if aantallen else '0'} "
+            f"FROM ({inner_sql}) AS filter_options "
+            f"GROUP BY GROUPING SETS ({grouping_sets})"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rijen = cursor.fetchall()
+
+        def grouping(lookups):
+            # GROUPING zet een bit voor elke kolom die niet in de grouping set zit
+            return sum(
+                1 << (len(kolommen) - 1 - i)
+                for i, kolom in enumerate(kolommen)
+                if kolom not in lookups
+            )
+
+        for f, lookups in velden:
+            f_dict = {}
+            for rij in rijen:
+                if rij[len(kolommen)] != grouping(lookups):
+                    continue
+                waarden = dict(zip(kolommen, rij))
+                for kolom in json_kolommen:
+                    if isinstance(waarden[kolom], str):
+                        waarden[kolom] = json.loads(waarden[kolom])
+                key, value_lookup_str, fallback_value_lookup_str, group = lookups
+                sleutel = waarden[key]
+                if not sleutel:
+                    continue
+                aantal = int(rij[-1] or 0) + (
+                    f_dict[sleutel][2] if sleutel in f_dict else 0
+                )
+                f_dict[sleutel] = (
+                    value_lookup(
+                        waarden[value_lookup_str],
+                        sleutel,
+                        waarden[fallback_value_lookup_str],
+                        f,
+                    ),
+                    waarden[group],
+                    aantal,
+                )
             out[f[0]] = f_dict
         return out
+
+
+def filter_options_versie_key(model):
+    return f"{LimitOffsetPagination.filter_options_cache_key_prefix}_versie:{model._meta.label_lower}"
+
+
+def filter_options_ongeldig_maken(model):
+    """
+    Maakt de gecachte filter options van alle lijsten van 'model' in één keer ongeldig.
+    """
+    try:
+        cache.incr(filter_options_versie_key(model))
+    except ValueError:
+        cache.set(filter_options_versie_key(model), 1, None)
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Altijd cursor paginatie, in oplopende volgorde van 'cursor_ordering_fields[0]' en id.
+    Bedoeld voor feeds, waarbij een client met de cursor uit 'next' precies verder gaat
+    waar het gebleven was, ook als er tussendoor nieuwe rijen bij zijn gekomen.
+    """
+
+    cursor_ordering_fields = ("aangemaakt_op",)
+    default_limit = 500
+    max_limit = 1000
+    # Ook zonder nieuwe rijen krijgt de client een 'next', om later mee verder te gaan
+    cursor_altijd_volgende = True
+
+    def get_cursor_ordering_fields(self, view):
+        return self.cursor_ordering_fields
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.filter_options = {}
+        self.cursor_modus = True
+        return self._cursor_paginate_queryset(queryset, request, view)
@@ -0,0 +1,21 @@
+import json
+
+from rest_framework import renderers
+
+
+class MVTRenderer(renderers.BaseRenderer):
+    """
+    Geeft Mapbox vector tiles ongewijzigd door, foutmeldingen worden als json gerenderd.
+    """
+
+    media_type = "application/vnd.mapbox-vector-tile"
+    format = "mvt"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, memoryview)):
+            return bytes(data)
+        if data is None:
+            return b""
+        return json.dumps(data).encode("utf-8")
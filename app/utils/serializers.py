@@ -0,0 +1,79 @@
+class VeldenSerializerMixin:
+    """
+    Laat een client met query parameters bepalen welke velden worden geserialiseerd.
+
+    ./?fields=id,uuid,status
+    ./?fields=id,uuid&expand=referentie_locatie,taakopdrachten_voor_melding
+    ./?expand=taakopdrachten_voor_melding
+
+    'fields' beperkt de velden op het hoogste niveau, 'expand' voegt daar relaties aan toe.
+    Zonder 'fields' worden de standaard velden geserialiseerd: alle velden behalve de
+    'expand_velden' in de Meta van de serializer, die alleen met 'expand' meekomen.
+
+    De query parameters gelden alleen voor de serializer van de response zelf (of het
+    child van de ListSerializer bij many=True). Een geneste serializer met deze mixin
+    geeft altijd de standaard velden.
+
+    Met 'relatie_paden' in de Meta van de serializer wordt per veld aangegeven welke
+    select_related en prefetch_related paden het nodig heeft, zodat de viewset met
+    'queryset_voor_velden' alleen de relaties ophaalt die ook worden geserialiseerd.
+
+    relatie_paden = {
+        "status": (("status",), ()),
+        "onderwerpen": ((), ("onderwerpen",)),
+    }
+    """
+
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+
+    def get_fields(self):
+        velden = super().get_fields()
+        # De binding is hier bekend, bij many=True is de ListSerializer de root
+        is_hoofd_serializer = self.root is self or self.root is self.parent
+        gevraagde_velden = (
+            self.gevraagde_velden(self.context.get("request"))
+            if is_hoofd_serializer
+            else None
+        )
+        for veld in set(velden) - (gevraagde_velden or self.standaard_velden()):
+            velden.pop(veld)
+        return velden
+
+    @classmethod
+    def _query_param_lijst(cls, request, query_param):
+        return {
+            veld.strip()
+            for veld in request.query_params.get(query_param, "").split(",")
+            if veld.strip()
+        }
+
+    @classmethod
+    def standaard_velden(cls):
+        return set(cls.Meta.fields) - set(getattr(cls.Meta, "expand_velden", ()))
+
+    @classmethod
+    def gevraagde_velden(cls, request):
+        """
+        De velden volgens 'fields' en 'expand', of None zonder die query parameters.
+        """
+        if request is None or not hasattr(request, "query_params"):
+            return None
+        velden = cls._query_param_lijst(request, cls.fields_query_param)
+        expand = cls._query_param_lijst(request, cls.expand_query_param)
+        if not velden and not expand:
+            return None
+        return (velden or cls.standaard_velden()) | expand
+
+    @classmethod
+    def queryset_voor_velden(cls, queryset, request):
+        velden = cls.gevraagde_velden(request) or cls.standaard_velden()
+        select_related = []
+        prefetch_related = []
+        for veld, (select_paden, prefetch_paden) in cls.Meta.relatie_paden.items():
+            if veld in velden:
+                select_related.extend(select_paden)
+                prefetch_related.extend(prefetch_paden)
+        return queryset.select_related(*select_related).prefetch_related(
+            *prefetch_related
+        )